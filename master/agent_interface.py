@@ -7,13 +7,16 @@
 import os
 import asyncio
 import logging
+import time
 import numpy as np
-import gym
 
+from contextlib import nullcontext
 from asyncio_mqtt import Client
-from gym_robot_maze import Maze
 
-from algorithms import *
+from algorithms.registry import make_algorithm
+from algorithms.agent_cache import AgentCache
+from algorithms.training_log import TrainingLog
+from algorithms.tracing import Tracer, attach_step, split_step
 
 #-----------------------------------------------------------------------------------------------    
 # Classes
@@ -24,17 +27,48 @@ class AgentInterface():
         class to contain agent variables including: RL algorithm object, index, message queue 
         and a status flag for master status and agent coroutines
     """
-    def __init__(self, client: Client, n: int, algorithm: str, sim: bool=True):
+    #robot maze observations are the position and direction of the robot, with 4 actions
+    ALGORITHM_KWARGS = {"n_obvs": 3, "n_actions": 4}
+
+    def __init__(self, client: Client, n: int, algorithm: str, sim: bool=True, headless: bool=False, log_steps: bool=False, algorithm_kwargs: dict=None, cache: AgentCache=None, publish: bool=False, epsilon: float=None, profile: dict=None, tracer: Tracer=None):
         """
             init for agent class
 
-            algorithm is a string with the name of the RL algorithm to use
+            algorithm is a string with the name of the RL algorithm to use, made from the algorithm registry so only
+            its module (and tensorflow if it needs it) is imported
 
             client is the MQTT client used to connect to the broker
 
             n is the index number of this agent
 
             sim is True if the agent is simulated, False is the agent is a real robot
+
+            headless is True if the position of a real robot is tracked with a HeadlessRobotMaze (no pygame) rather than 
+            the gym_robot_maze env
+
+            log_steps is True if the metrics of every time step are written to the training log as well as those of
+            every episode
+
+            algorithm_kwargs is a dict of keyword arguments of the constructor of the algorithm, n_obvs and n_actions
+            default to the sizes of the robot maze (ALGORITHM_KWARGS)
+
+            cache is an AgentCache the algorithm is taken from by init_algorithm, so joining does not wait for its
+            networks to be built and its graphs traced, if None the algorithm is made by init_algorithm
+
+            publish is True if the weights of this agent are published to the cache at the end of every episode as the
+            weights of the team, which agents joining later start from (any agent for ddrqn as they share the consensus
+            weights, a chosen agent for dqn)
+
+            epsilon is the exploration rate the agent starts at if it starts from published team weights, if None it
+            starts at epsilon max as a new agent does
+
+            profile is a dict of keyword arguments of enable_profiling (e.g. {"sample_every": 100}) to profile get_action
+            and train of the algorithm, the metrics are written to saved_data/<algorithm>/agent_<n>.prom at the end of 
+            every episode, if None the algorithm is not profiled
+
+            tracer is a Tracer the spans of the sampled time steps of the agent are recorded to, the step id is passed
+            on to simulated agents with the action so they record their spans of the step under it, if None no time
+            steps are traced
         """
         self.client = client
         self.queue = asyncio.Queue()
@@ -42,16 +76,23 @@ class AgentInterface():
         self._train_flag = asyncio.Event()
         self._n = n
         self._sim = sim
+        self._headless = headless
+        self._log_steps = log_steps
+        self._cache = cache
+        self._publish = publish
+        self._tracer = tracer
         self.total_reward = 0.0
 
-        self.batch_size = 32
-
         self.alg_name = algorithm
 
-        if self.alg_name == "dqn":
-            self.algorithm = DQN(3, 4, batch_size=self.batch_size)
-        elif self.alg_name == "ddrqn":
-            self.algorithm = DDRQN(3, 4)
+        self._algorithm_kwargs = {**self.ALGORITHM_KWARGS, **(algorithm_kwargs or {})}
+        self._epsilon = epsilon
+        self._profile = profile
+
+        #algorithm is made by init_algorithm
+        self.algorithm = None
+        self._weights_version = 0
+        self.batch_size = 32
 
     #-------------------------------------------------------------------------------------------
     # Properties
@@ -69,6 +110,23 @@ class AgentInterface():
     def sim(self) -> bool:
         return self._sim
 
+    @property
+    def headless(self) -> bool:
+        return self._headless
+
+    @property
+    def log_steps(self) -> bool:
+        return self._log_steps
+
+    @property
+    def publish(self) -> bool:
+        return self._publish
+
+    @property
+    def weights_version(self) -> int:
+        #version of the team weights the agent started from, 0 if it started from new weights
+        return self._weights_version
+
     @property
     def total_reward(self) -> float:
         return self._total_reward
@@ -83,6 +141,27 @@ class AgentInterface():
     # Methods
     #-------------------------------------------------------------------------------------------
 
+    async def init_algorithm(self):
+        """
+            coroutine to make the algorithm of this agent, which must be awaited before the agent is run. The algorithm
+            is taken from the cache in a thread, as waiting for a spare to be built would block the event loop and so
+            every other agent
+        """
+        if self._cache is None:
+            self._weights_version = 0
+            self.algorithm = make_algorithm(self.alg_name, **self._algorithm_kwargs)
+        else:
+            #agent starts from the latest weights published by the team, if any
+            self.algorithm, self._weights_version = await asyncio.to_thread(self._cache.get, self.alg_name, **self._algorithm_kwargs)
+
+        if self.weights_version > 0 and self._epsilon is not None:
+            self.algorithm.epsilon = self._epsilon
+
+        if self._profile is not None:
+            self.algorithm.enable_profiling(**self._profile)
+
+        self.batch_size = getattr(self.algorithm, "batch_size", 32)
+
     async def post_to_topic(self, topic, msg, retain=False):
         """
             coroutine to publish messages to topics to an mqtt broker connected to by client
@@ -142,138 +221,192 @@ class AgentInterface():
             #get maze path
             maze_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "4x4_maze")
             #if real robot use gym env to track robot position in maze
-            env = gym.make("gym_robot_maze:RobotMaze-v1", is_render=False, n_agents=1, load_maze_path=maze_path)
+            #envs are imported here as gym is only needed to track real robots
+            if self.headless:
+                from algorithms.headless_maze import HeadlessRobotMaze
+                env = HeadlessRobotMaze(load_maze_path=maze_path, n_agents=1)
+            else:
+                import gym
+                env = gym.make("gym_robot_maze:RobotMaze-v1", is_render=False, n_agents=1, load_maze_path=maze_path)
+
+        saved_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_data", self.alg_name)
+
+        #metrics are streamed to the log as training runs so a crash only loses the last few seconds of them
+        log = TrainingLog(os.path.join(saved_path, f'agent_{self.n}.log'), agent=self.n, log_steps=self.log_steps)
 
-        all_rewards = []
+        #log is closed even if the agent is cancelled or fails part way through training
+        try:
+            logging.info("Agent %i initialised from team weights version %i", self.n, self.weights_version)
 
-        logging.info("Agent %i initialised", self.n)
+            #agent n coroutine initialised agent can start 
+            await self.post_to_topic(f'/agents/{self.n}/start', 1, retain=True)
 
-        #agent n coroutine initialised agent can start 
-        await self.post_to_topic(f'/agents/{self.n}/start', 1, retain=True)
+            #wait for agent n status to be true    
+            await self.status_flag.wait()
 
-        #wait for agent n status to be true    
-        await self.status_flag.wait()
+            #get init observation from agent
+            obv = await self.queue.get()
+            obv = obv.split(':')[1]
+            obv = self.msg_to_array(obv)
+            logging.debug("Agent %i obv = %s", self.n, obv)
 
-        #get init observation from agent
-        obv = await self.queue.get()
-        obv = obv.split(':')[1]
-        obv = self.msg_to_array(obv)
-        logging.debug("Agent %i obv = %s", self.n, obv)
+            for e in range(100):
+                if not self.sim:
+                    env.reset()
 
-        for e in range(100):
-            if not self.sim:
-                env.reset()
+                #recurrent agents start each episode from a zero LSTM state
+                self.algorithm.reset_state()
     
-            done = False
-            self.total_reward = 0.0
+                done = False
+                self.total_reward = 0.0
+                ep_losses = []
+                start_time = time.time()
     
-            for t in range(10000):
-                action = int(self.algorithm.get_action(obv))
+                for t in range(10000):
+                    step_time = time.perf_counter()
+                    loss = np.nan
 
-                if not self.sim:
-                    _, _, done, _ = env.step(action) 
-
-                #wait for agent n status to be true    
-                await self.status_flag.wait()
-
-                #send action to agent
-                await self.post_to_topic(f'/agents/{self.n}/action', action)
-
-                #get observation, reward and done from agent
-                for i in range(3):
-                    q_item = await self.queue.get()
-                    topic = q_item.split(':')[0]
-                    payload = q_item.split(':')[1]
-
-                    #each may appear in queue in any order so must be processed into correct variable
-                    if topic == f'/agents/{self.n}/obv': next_obv = self.msg_to_array(payload)
-                    elif topic == f'/agents/{self.n}/reward': reward = float(payload)
-                    elif topic == f'/agents/{self.n}/done' and self.sim: done = True if payload == "True" else False 
-
-                if self.alg_name == "dqn":
-                    self.algorithm.reward_mem.append(reward)
-                    self.algorithm.next_obv_mem.append(next_obv)
-                elif self.alg_name == "ddrqn":
-                    await self.train_flag.wait()
-
-                    loss = self.algorithm.train(obv, action, reward, next_obv) 
-                    agents[0].train_flag.clear()
-
-                    #each agent sends their updated weights to the next agent for the next update
-                    try:
-                        agents[self.n+1].algorithm.receive_comm(self.algorithm.send_comm())
-                        agents[self.n+1].train_flag.set()
-                    except:
-                        agents[0].algorithm.receive_comm(self.algorithm.send_comm())
-                        agents[0].train_flag.set()
-
-                    #agent 0 has the most up to date network and should update all other agents networks
-                    await agents[0].train_flag.wait()
+                    #id of the time step if it is sampled to be traced, otherwise None
+                    step = self._tracer.sample() if self._tracer is not None else None
+
+                    with self.span("get_action", step, episode=e, t=t):
+                        action = int(self.algorithm.get_action(obv))
+
+                    if not self.sim:
+                        _, _, done, _ = env.step(action) 
+
+                    #wait for agent n status to be true    
+                    await self.status_flag.wait()
+
+                    #send action to agent, the step id is only sent to simulated agents as robots do not strip it
+                    with self.span("publish_action", step):
+                        await self.post_to_topic(f'/agents/{self.n}/action', attach_step(f'{action}', step) if self.sim else action)
+
+                    #get observation, reward and done from agent
+                    with self.span("wait_results", step):
+                        for i in range(3):
+                            q_item = await self.queue.get()
+                            topic = q_item.split(':')[0]
+                            payload, _ = split_step(q_item.split(':')[1])
+
+                            #each may appear in queue in any order so must be processed into correct variable
+                            if topic == f'/agents/{self.n}/obv': next_obv = self.msg_to_array(payload)
+                            elif topic == f'/agents/{self.n}/reward': reward = float(payload)
+                            elif topic == f'/agents/{self.n}/done' and self.sim: done = True if payload == "True" else False 
+
+                    #experience of the action taken is stored in replay memory (a window of a sequence for ddrqn)
+                    self.algorithm.remember(reward, next_obv, done)
+
+                    if self.alg_name == "ddrqn":
+                        await self.train_flag.wait()
+
+                        #weights are passed on even if the agent cannot train yet, so the agents after it are not blocked
+                        if self.algorithm.can_train:
+                            with self.span("train", step):
+                                loss = self.algorithm.train()
+                        agents[0].train_flag.clear()
+
+                        #each agent sends their updated weights to the next agent for the next update
+                        try:
+                            agents[self.n+1].algorithm.receive_comm(self.algorithm.send_comm())
+                            agents[self.n+1].train_flag.set()
+                        except:
+                            agents[0].algorithm.receive_comm(self.algorithm.send_comm())
+                            agents[0].train_flag.set()
+
+                        #agent 0 has the most up to date network and should update all other agents networks
+                        await agents[0].train_flag.wait()
                 
-                    self.algorithm.receive_comm(agents[0].algorithm.send_comm())
+                        self.algorithm.receive_comm(agents[0].algorithm.send_comm())
 
-                logging.debug("Agent %i next_obv = %s", self.n, next_obv)
-                logging.debug("Agent %i reward = %.4f", self.n, reward)
-                logging.debug("Agent %i done = %s", self.n, done)
+                    logging.debug("Agent %i next_obv = %s", self.n, next_obv)
+                    logging.debug("Agent %i reward = %.4f", self.n, reward)
+                    logging.debug("Agent %i done = %s", self.n, done)
                 
-                obv = next_obv
-                self.total_reward += reward
+                    end = done or t >= 9999
+
+                    #dqn is not trained on the last time step of an episode
+                    if self.alg_name == "dqn" and not end and (np.size(self.algorithm.action_mem) > self.batch_size and t % 4 == 0):
+                        with self.span("train", step):
+                            loss = self.algorithm.train() 
 
-                if done:
-                    logging.info(f'Agent {self.n } completed episode {e} with total reward: {total_reward}')
-                    all_rewards.append(self.total_reward)
+                            if t % 20 == 0:
+                                self.algorithm.update_target_net()
+
+                    obv = next_obv
+                    self.total_reward += reward
+
+                    if not np.isnan(loss):
+                        ep_losses.append(float(loss))
+
+                    log.log_step(e, t, reward, loss=float(loss), epsilon=getattr(self.algorithm, "epsilon", np.nan), latency=time.perf_counter() - step_time)
+
+                    if end:
+                        #weights are published once an episode rather than every time step, as copying them is slow
+                        if self.publish and self._cache is not None:
+                            self.publish_weights()
+
+                        log.log_episode(e, t + 1, self.total_reward, loss=np.mean(ep_losses) if ep_losses else np.nan, epsilon=getattr(self.algorithm, "epsilon", np.nan), latency=time.time() - start_time)
+
+                        if self.algorithm.profiler is not None:
+                            self.algorithm.write_profile_metrics(os.path.join(saved_path, f'agent_{self.n}.prom'), labels={"agent": self.n})
+                            self.algorithm.profiler.dump_stats(os.path.join(saved_path, f'agent_{self.n}.pstats'))
+
+                    if done:
+                        logging.info(f'Agent {self.n } completed episode {e} with total reward: {self.total_reward}')
                     
-                    #if real robot set flag for real env to be reset
-                    if not self.sim:
-                        done_flag.set()
-                        #wait for user input to show real env is reset
-                        await reset_flag.wait()
-                        reset_flag.clear()
+                        #if real robot set flag for real env to be reset
+                        if not self.sim:
+                            done_flag.set()
+                            #wait for user input to show real env is reset
+                            await reset_flag.wait()
+                            reset_flag.clear()
                     
-                    break
+                        break
 
-                if t >= 9999:
-                    logging.info(f'Agent {self.n} timed out episode {e} with total reward: {total_reward}')
-                    all_rewards.append(self.total_reward)
+                    if t >= 9999:
+                        logging.info(f'Agent {self.n} timed out episode {e} with total reward: {self.total_reward}')
                     
-                    if not self.sim:
-                        self.done_flag.set()
-                        await reset_flag.wait()
-                        reset_flag.clear()
+                        if not self.sim:
+                            done_flag.set()
+                            await reset_flag.wait()
+                            reset_flag.clear()
                 
-                    break
+                        break
 
-                if self.alg_name == "dqn" and (np.size(self.algorithm.action_mem) > self.batch_size and t % 4 == 0):
-                    loss = self.algorithm.train() 
+                self.algorithm.update_parameters(e)
+        finally:
+            log.close()
 
-                    if t % 20 == 0:
-                        self.algorithm.update_target_net()
+    def span(self, name: str, step: str, **args):
+        """
+            function to record a span of a time step of this agent to the tracer, shown on the thread of this agent
 
-            self.algorithm.update_parameters(e)
+            name is the name of the span
 
-        self.save_data("saved_data/dqn", {"reward": all_rewards})
+            step is the id of the time step, if None (not sampled) nothing is recorded
 
-    def save_data(self, path: str, data: dict):
+            returns a context manager
         """
-            function to save data in a pickle file gathered during training in the directory at path
-            directory has the following structure:
+        if self._tracer is None:
+            return nullcontext()
 
-                -path
-                    -data.pkl
+        return self._tracer.span(name, step, tid=self.n, **args)
 
-            path is the path to the directory to store the data in
+    def publish_weights(self) -> int:
+        """
+            function to publish the weights of this agent to the cache as the latest weights of the team, so agents
+            joining later start from them rather than learning from scratch
 
-            data is the data to be saved
+            returns the version of the published weights
         """
-        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        if self._cache is None:
+            raise RuntimeError("Cannot publish the weights of an agent without a cache.")
 
-        #make directory if not already exists
-        if not os.path.isdir(path):
-            os.makedirs(path)
+        version = self._cache.publish(self.alg_name, self.algorithm.get_checkpoint(), **self._algorithm_kwargs)
+        logging.debug("Agent %i published team weights version %i", self.n, version)
 
-        #save parameters to pickle file
-        with open(f'{path}/data.pkl', "wb") as handle:
-            pickle.dump(data, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        return version
 
     def msg_to_array(self, msg: str) -> np.ndarray:
         """
@@ -286,7 +419,8 @@ class AgentInterface():
         msg = msg.replace('[', '')
         msg = msg.replace(']', '')
 
-        array = np.array(msg.split(' '), dtype=float)
+        #arrays are printed with padding between values of different widths
+        array = np.array(msg.split(), dtype=float)
 
         return array
 
@@ -1,26 +1,117 @@
 #!/usr/bin/env python3
 
-from algorithms.qlearning import QLearning
-from algorithms.qlearning import run_gym_q_learning_single_agent
-from algorithms.qlearning import run_gym_q_learning_multi_agent
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
 
-from algorithms.dqn import DQN
-from algorithms.dqn import run_gym_dqn_single_agent
-from algorithms.dqn import run_gym_dqn_multi_agent
+import importlib
 
-from algorithms.policy_grad import PolicyGradient
-from algorithms.policy_grad import run_gym_policy_grad_single_agent
-from algorithms.policy_grad import run_gym_policy_grad_multi_agent
+#-----------------------------------------------------------------------------------------------
+# Variables
+#-----------------------------------------------------------------------------------------------
 
-from algorithms.actor_critic import ActorCritic
-from algorithms.actor_critic import run_gym_actor_critic_single_agent
-from algorithms.actor_critic import run_gym_actor_critic_multi_agent
+#module of each name exported by the package, modules are only imported when one of their names is first used
+#so tensorflow and gym are not imported by code which does not need them (e.g. q-learning only)
+_EXPORTS = {
+    "QLearning": "algorithms.qlearning",
+    "MultiAgentQLearning": "algorithms.qlearning",
+    "ObvDiscretiser": "algorithms.qlearning",
+    "QLearningAgentGroup": "algorithms.qlearning",
+    "SparseQTable": "algorithms.sparse_q_table",
+    "run_gym_q_learning_single_agent": "algorithms.qlearning",
+    "run_gym_q_learning_multi_agent": "algorithms.qlearning",
 
-from algorithms.ddpg import DDPG
-from algorithms.ddpg import run_gym_ddpg_single_agent
+    "DQN": "algorithms.dqn",
+    "DQNAgentGroup": "algorithms.dqn",
+    "run_gym_dqn_single_agent": "algorithms.dqn",
+    "run_gym_dqn_multi_agent": "algorithms.dqn",
 
-from algorithms.ma_actor_critic import MAActorCritic
-from algorithms.ma_actor_critic import run_gym_ma_actor_critic_multi_agent
+    "PolicyGradient": "algorithms.policy_grad",
+    "run_gym_policy_grad_single_agent": "algorithms.policy_grad",
+    "run_gym_policy_grad_multi_agent": "algorithms.policy_grad",
 
-from algorithms.ddrqn import DDRQN
-from algorithms.ddrqn import run_gym_ddrqn_multi_agent
+    "ActorCritic": "algorithms.actor_critic",
+    "run_gym_actor_critic_single_agent": "algorithms.actor_critic",
+    "run_gym_actor_critic_multi_agent": "algorithms.actor_critic",
+
+    "DDPG": "algorithms.ddpg",
+    "run_gym_ddpg_single_agent": "algorithms.ddpg",
+
+    "MAActorCritic": "algorithms.ma_actor_critic",
+    "run_gym_ma_actor_critic_multi_agent": "algorithms.ma_actor_critic",
+
+    "DDRQN": "algorithms.ddrqn",
+    "run_gym_ddrqn_multi_agent": "algorithms.ddrqn",
+
+    "SequenceReplay": "algorithms.sequence_replay",
+
+    "VecEnv": "algorithms.vec_env",
+    "SubprocVecEnv": "algorithms.vec_env",
+    "ParallelAgents": "algorithms.parallel_agents",
+    "run_parallel_agents": "algorithms.parallel_agents",
+    "RolloutWorkers": "algorithms.rollouts",
+    "run_rollouts": "algorithms.rollouts",
+    "HeadlessMaze": "algorithms.headless_maze",
+    "HeadlessRobotMaze": "algorithms.headless_maze",
+
+    "grid_search": "algorithms.sweep",
+    "random_search": "algorithms.sweep",
+    "run_sweep": "algorithms.sweep",
+
+    "TrajectoryRecorder": "algorithms.trajectory",
+    "load_trajectories": "algorithms.trajectory",
+    "episode_rows": "algorithms.trajectory",
+
+    "TrainingLog": "algorithms.training_log",
+    "read_training_log": "algorithms.training_log",
+    "read_training_logs": "algorithms.training_log",
+
+    "CheckpointWriter": "algorithms.checkpoint",
+    "save_checkpoint": "algorithms.checkpoint",
+    "load_checkpoint": "algorithms.checkpoint",
+
+    "ALGORITHMS": "algorithms.registry",
+    "register_algorithm": "algorithms.registry",
+    "get_algorithm": "algorithms.registry",
+    "make_algorithm": "algorithms.registry",
+    "AgentCache": "algorithms.agent_cache",
+
+    "RLAlgorithm": "algorithms.rl_algorithm",
+    "Profiler": "algorithms.rl_algorithm",
+
+    "Tracer": "algorithms.tracing",
+    "merge_traces": "algorithms.tracing",
+    "read_trace": "algorithms.tracing",
+}
+
+#from algorithms import * imports the algorithms and their runners as the package did before it was lazy, the
+#utilities (e.g. the headless maze, which needs gym) are only imported by name
+__all__ = [
+    "QLearning", "run_gym_q_learning_single_agent", "run_gym_q_learning_multi_agent",
+    "DQN", "run_gym_dqn_single_agent", "run_gym_dqn_multi_agent",
+    "PolicyGradient", "run_gym_policy_grad_single_agent", "run_gym_policy_grad_multi_agent",
+    "ActorCritic", "run_gym_actor_critic_single_agent", "run_gym_actor_critic_multi_agent",
+    "DDPG", "run_gym_ddpg_single_agent",
+    "MAActorCritic", "run_gym_ma_actor_critic_multi_agent",
+    "DDRQN", "run_gym_ddrqn_multi_agent",
+]
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def __getattr__(name: str):
+    """
+        function to import the module of an exported name on its first use
+    """
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    #cached so later uses do not call this function
+    globals()[name] = value
+
+    return value
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
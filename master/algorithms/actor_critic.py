@@ -4,18 +4,23 @@
 # Imports
 #-----------------------------------------------------------------------------------------------
 
+import functools
 import logging
 import time
 import numpy as np
 import tensorflow as tf
 
 from algorithms.rl_algorithm import RLAlgorithm
+from algorithms.checkpoint import CheckpointWriter, is_checkpoint, load_checkpoint, save_checkpoint
+from algorithms.returns import gae
+from algorithms.rollouts import RolloutWorkers, run_rollouts
+from algorithms.trajectory import TrajectoryRecorder
 
 #-----------------------------------------------------------------------------------------------    
 # Functions
 #-----------------------------------------------------------------------------------------------
 
-def run_gym_actor_critic_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, decay: float=0.999, lr: float=0.001, lr_decay_steps: int=10000, saved_path: str=None):
+def run_gym_actor_critic_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, decay: float=0.999, lr: float=0.001, lr_decay_steps: int=10000, saved_path: str=None, recorder: TrajectoryRecorder=None):
     """
         function to run independent actor critic algorithm on a gym env
 
@@ -29,6 +34,9 @@ def run_gym_actor_critic_multi_agent(env, n_agents: int=1, render: bool=False, e
 
         time steps is the maximum number of time steps per episode
 
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
     """
     if n_agents < 1:
@@ -81,8 +89,11 @@ def run_gym_actor_critic_multi_agent(env, n_agents: int=1, render: bool=False, e
                 agents[i].rewards_mem.append(rewards[i])
                 agents[i].next_obv_mem.append(next_obvs[i])
 
-            ep_obvs.append(actions)
-            ep_actions.append(obvs)
+            if recorder is None:
+                ep_obvs.append(obvs)
+                ep_actions.append(actions)
+            else:
+                recorder.record(e, t, obvs, actions, rewards, done)
 
             obvs = next_obvs
             total_rewards += rewards
@@ -126,11 +137,12 @@ def run_gym_actor_critic_multi_agent(env, n_agents: int=1, render: bool=False, e
 
     return all_obvs, all_actions, all_rewards, all_losses, robot_paths, all_times
 
-def run_gym_actor_critic_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, decay: float=0.999, lr: float=0.001, lr_decay_steps: int=10000, saved_path: str=None):
+def run_gym_actor_critic_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, decay: float=0.999, lr: float=0.001, lr_decay_steps: int=10000, saved_path: str=None, rollout_len: int=None, lam: float=0.95, recorder: TrajectoryRecorder=None):
     """
         function to run actor critic algorithm on a gym env
 
-        env is the gym env object
+        env is the gym env object, or a RolloutWorkers whose workers each collect a trajectory in parallel for every
+        update, trained on in a single batched update with advantages from GAE
 
         n_agents is the number of agents
 
@@ -140,6 +152,14 @@ def run_gym_actor_critic_single_agent(env, render: bool=False, episodes: int=100
 
         time steps is the maximum number of time steps per episode
 
+        rollout_len is the number of time steps each rollout worker collects per update, if None each worker 
+        collects a whole episode (RolloutWorkers only)
+
+        lam is the GAE lambda parameter trading off bias and variance of the advantages (RolloutWorkers only)
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each episode in seconds
     """
     #get env variables
@@ -148,6 +168,12 @@ def run_gym_actor_critic_single_agent(env, render: bool=False, episodes: int=100
 
     agent = ActorCritic(n_obvs, n_actions, hidden_size=hidden_size, gamma=gamma, decay=decay, lr=lr, lr_decay_steps=lr_decay_steps, saved_path=saved_path)
 
+    if isinstance(env, RolloutWorkers):
+        #workers only sample actions from their copy of the network, weights are sent by run_rollouts
+        env.set_policy(functools.partial(ActorCritic, n_obvs, n_actions, hidden_size=hidden_size))
+
+        return run_rollouts(env, agent, train_fn=functools.partial(agent.train_batch, lam=lam), episodes=episodes, time_steps=time_steps, rollout_len=rollout_len, recorder=recorder)
+
     #init arrays to collect data
     all_times = []
     all_obvs = []
@@ -182,8 +208,11 @@ def run_gym_actor_critic_single_agent(env, render: bool=False, episodes: int=100
             agent.rewards_mem.append(reward)
             agent.next_obv_mem.append(next_obv)
     
-            ep_obvs.append(obv)
-            ep_actions.append(action)
+            if recorder is None:
+                ep_obvs.append(obv)
+                ep_actions.append(action)
+            else:
+                recorder.record(e, t, obv, action, reward, done)
 
             obv = next_obv
             total_reward += reward
@@ -271,11 +300,23 @@ class ActorCritic(RLAlgorithm):
 
         self.lr_decay_fn = tf.keras.optimizers.schedules.ExponentialDecay(self.lr, decay_steps=lr_decay_steps, decay_rate=self.decay)
         self.opt = tf.keras.optimizers.Adam(learning_rate=self.lr_decay_fn)
-        self.loss_fn = tf.keras.losses.Huber()
+        #critic loss is summed across the episode
+        self.loss_fn = tf.keras.losses.Huber(reduction="sum")
 
         #load a saved model (neural net) if provided
         if saved_path:
-            self.ac_net = tf.keras.models.load_model(saved_path)
+            if is_checkpoint(saved_path):
+                self.set_checkpoint(load_checkpoint(saved_path)[0])
+            else:
+                self.ac_net = tf.keras.models.load_model(saved_path)
+
+        #compile act and train steps into graphs with fixed input signatures so they are traced 
+        #once instead of being dispatched eagerly on every call
+        obv_spec = tf.TensorSpec(shape=(None, int(n_obvs)), dtype=tf.float32)
+        self.act_step = tf.function(self.act_step, input_signature=[obv_spec])
+        self.train_step = tf.function(self.train_step, input_signature=[obv_spec, tf.TensorSpec(shape=(None,), dtype=tf.int32), tf.TensorSpec(shape=(None,), dtype=tf.float32)])
+        self.value_step = tf.function(self.value_step, input_signature=[obv_spec])
+        self.update_step = tf.function(self.update_step, input_signature=[obv_spec, tf.TensorSpec(shape=(None,), dtype=tf.int32), tf.TensorSpec(shape=(None,), dtype=tf.float32), tf.TensorSpec(shape=(None,), dtype=tf.float32)])
 
     #-------------------------------------------------------------------------------------------
     # Properties
@@ -305,13 +346,32 @@ class ActorCritic(RLAlgorithm):
     # Methods
     #-------------------------------------------------------------------------------------------
 
-    def save_model(self, path: str):
+    def save_model(self, path: str, step: int=0, writer: CheckpointWriter=None):
+        """
+            function to save the model (Actor-Critic network weights) as a weights only checkpoint
+
+            path is a string of the path to the checkpoint directory where the model will be saved
+
+            step is the training step (e.g. episode) the checkpoint is taken at
+
+            writer is a CheckpointWriter to write the checkpoint on a background thread, if None the checkpoint
+            is written before returning
         """
-            function to save the tensorflow model (neural net) to a file
+        save_checkpoint(path, self.get_checkpoint(), step=step, metadata={"algorithm": type(self).__name__}, writer=writer)
 
-            path is a string of the path to the file where the model will be saved
+    def get_checkpoint(self) -> dict:
         """
-        self.ac_net.save(path)
+            function to get the arrays of the model to be saved in a checkpoint
+
+            returns a dict of the Actor-Critic network weights
+        """
+        return {"ac_net": self.ac_net.get_weights()}
+
+    def set_checkpoint(self, arrays: dict):
+        """
+            function to set the model from the arrays of a checkpoint (as returned by get_checkpoint)
+        """
+        self.ac_net.set_weights(arrays["ac_net"])
 
     def get_action(self, obv: np.ndarray) -> int:
         """
@@ -322,44 +382,52 @@ class ActorCritic(RLAlgorithm):
 
             returns the action to take
         """
-        action_probs, critic_val = self.ac_net(np.expand_dims(obv, axis=0))
-        action = np.random.choice(self.n_actions, p=action_probs.numpy()[0])
+        action = int(self.act_step(np.array([obv], dtype=np.float32))[0])
 
         self.obv_mem.append(obv)
         self.action_mem.append(action)
 
         return action
 
-    def train(self) -> tf.Tensor:
+    def act_step(self, obvs: tf.Tensor) -> tf.Tensor:
         """
-            function to train Actor-Critic network using previous episode data from replay memory
+            function to sample an action from the actor for a batch of observations, compiled into a graph on init
 
-            returns the loss of the training as a tensor
+            obvs is a float32 tensor of observations with shape [batch, n_obvs]
+
+            returns an int32 tensor of the sampled action for each observation
         """
-        returns = []
-        discounted_sum = 0
-    
-        #calculate the discounted sum of rewards
-        for reward in self.rewards_mem[::-1]:
-            discounted_sum = reward + self.gamma * discounted_sum
-            #iterated inversly therefore insert at beginning of array
-            returns.insert(0, discounted_sum)
+        action_probs, _ = self.ac_net(obvs)
+
+        return tf.random.categorical(tf.math.log(action_probs), 1, dtype=tf.int32)[:, 0]
+
+    def train_step(self, obv_batch: tf.Tensor, action_batch: tf.Tensor, reward_batch: tf.Tensor) -> tf.Tensor:
+        """
+            function to apply one gradient descent step to the actor-critic network over an episode, compiled into a graph on init
+
+            obv_batch is a float32 tensor of the episode observations with shape [time, n_obvs]
+
+            action_batch is an int32 tensor of the episode actions with shape [time]
+
+            reward_batch is a float32 tensor of the episode rewards with shape [time]
 
+            returns the loss of the step as a tensor
+        """
+        #calculate the discounted sum of rewards with a reverse scan over the episode
+        returns = tf.scan(lambda discounted_sum, reward: reward + self.gamma * discounted_sum, reward_batch, initializer=tf.constant(0.0), reverse=True)
         #normalise returns
-        returns = (returns - np.mean(returns)) / (np.std(returns) + self.eps)
+        returns = (returns - tf.reduce_mean(returns)) / (tf.math.reduce_std(returns) + self.eps)
 
         with tf.GradientTape() as tape:
-            actor_loss = 0
-            critic_loss = 0
-            for i in range(np.shape(self.obv_mem)[0]):
-                action_probs, critic_val = self.ac_net(np.expand_dims(self.obv_mem[i], axis=0))
-                #log probability of the action taken
-                action_log_prob = tf.math.log(action_probs[0, self.action_mem[i]])
-
-                advantage = returns[i] - critic_val
-                #sum losses for both actor and critic across episode
-                actor_loss += -action_log_prob * advantage
-                critic_loss += self.loss_fn(critic_val, np.expand_dims(returns[i], axis=0))
+            #single forward pass over the whole episode
+            action_probs, critic_vals = self.ac_net(obv_batch)
+            #log probability of the action taken at each step
+            action_log_probs = tf.math.log(tf.gather(action_probs, action_batch, batch_dims=1))
+
+            advantages = returns - critic_vals[:, 0]
+            #sum losses for both actor and critic across episode
+            actor_loss = tf.reduce_sum(-action_log_probs * advantages)
+            critic_loss = self.loss_fn(critic_vals, tf.expand_dims(returns, axis=1))
 
             #total loss is sum of actor and critic losses
             loss = actor_loss + critic_loss
@@ -367,6 +435,16 @@ class ActorCritic(RLAlgorithm):
         grads = tape.gradient(loss, self.ac_net.trainable_variables)
         self.opt.apply_gradients(zip(grads, self.ac_net.trainable_variables))
 
+        return loss
+
+    def train(self) -> tf.Tensor:
+        """
+            function to train Actor-Critic network using previous episode data from replay memory
+
+            returns the loss of the training as a tensor
+        """
+        loss = self.train_step(np.array(self.obv_mem, dtype=np.float32), np.array(self.action_mem, dtype=np.int32), np.array(self.rewards_mem, dtype=np.float32))
+
         #replay memory only stores a single episode 
         self.obv_mem.clear()
         self.action_mem.clear()
@@ -375,5 +453,78 @@ class ActorCritic(RLAlgorithm):
 
         return loss
 
+    def value_step(self, obvs: tf.Tensor) -> tf.Tensor:
+        """
+            function to get the critic values of a batch of observations, compiled into a graph on init
+
+            obvs is a float32 tensor of observations with shape [batch, n_obvs]
+
+            returns a float32 tensor of the value of each observation with shape [batch]
+        """
+        _, critic_vals = self.ac_net(obvs)
+
+        return critic_vals[:, 0]
+
+    def update_step(self, obv_batch: tf.Tensor, action_batch: tf.Tensor, advantages: tf.Tensor, returns: tf.Tensor) -> tf.Tensor:
+        """
+            function to apply one gradient descent step to the actor-critic network given precomputed advantages of a
+            batch of time steps, compiled into a graph on init
+
+            obv_batch is a float32 tensor of the observations with shape [batch, n_obvs]
+
+            action_batch is an int32 tensor of the actions with shape [batch]
+
+            advantages is a float32 tensor of the normalised advantages with shape [batch]
+
+            returns is a float32 tensor of the returns the critic is trained towards with shape [batch]
+
+            returns the loss of the step as a tensor
+        """
+        with tf.GradientTape() as tape:
+            #single forward pass over the whole batch
+            action_probs, critic_vals = self.ac_net(obv_batch)
+            #log probability of the action taken at each step
+            action_log_probs = tf.math.log(tf.gather(action_probs, action_batch, batch_dims=1))
+
+            #sum losses for both actor and critic across batch
+            actor_loss = tf.reduce_sum(-action_log_probs * advantages)
+            critic_loss = self.loss_fn(tf.expand_dims(returns, axis=1), critic_vals)
+
+            #total loss is sum of actor and critic losses
+            loss = actor_loss + critic_loss
+
+        grads = tape.gradient(loss, self.ac_net.trainable_variables)
+        self.opt.apply_gradients(zip(grads, self.ac_net.trainable_variables))
+
+        return loss
+
+    def train_batch(self, trajectories: list, lam: float=0.95) -> tf.Tensor:
+        """
+            function to train the Actor-Critic network on the trajectories collected by RolloutWorkers in a single update,
+            with the advantages of each trajectory from GAE bootstrapped from the value of its next observation, and of
+            each episode cut short by the time limit from the value of its last observation
+
+            trajectories is a list of trajectories (as returned by RolloutWorkers.rollout) of whole episodes or segments
+
+            lam is the GAE lambda parameter trading off bias (0, one-step TD) and variance (1, Monte Carlo)
+
+            returns the loss of the training as a tensor
+        """
+        obv_batch = np.concatenate([trajectory["obvs"] for trajectory in trajectories])
+        action_batch = np.concatenate([trajectory["actions"] for trajectory in trajectories])
+
+        truncated_obvs = np.concatenate([trajectory["truncated_obvs"] for trajectory in trajectories])
+
+        #values of every observation, of the next observation of every trajectory and of the last observation of every
+        #truncated episode in a single forward pass
+        values = self.value_step(np.concatenate((obv_batch, [trajectory["next_obv"] for trajectory in trajectories], truncated_obvs))).numpy()
+        values, bootstraps, truncated_values = np.split(values, [len(obv_batch), len(obv_batch) + len(trajectories)])
+        values = np.split(values, np.cumsum([len(trajectory["actions"]) for trajectory in trajectories])[:-1])
+        truncated_values = np.split(truncated_values, np.cumsum([len(trajectory["truncated_obvs"]) for trajectory in trajectories])[:-1])
 
+        advantages, returns = zip(*(gae(trajectory["rewards"], value, self.gamma, lam=lam, dones=trajectory["dones"], bootstrap=bootstrap, truncated=trajectory["truncated"], truncated_values=truncated_value) for trajectory, value, bootstrap, truncated_value in zip(trajectories, values, bootstraps, truncated_values)))
+        advantages = np.concatenate(advantages)
+        #normalise advantages across the batch
+        advantages = (advantages - np.mean(advantages)) / (np.std(advantages) + self.eps)
 
+        return self.update_step(obv_batch, action_batch, advantages.astype(np.float32), np.concatenate(returns).astype(np.float32))
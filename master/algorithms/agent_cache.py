@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import logging
+import threading
+
+from algorithms.registry import ALGORITHMS, make_algorithm
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class AgentCache():
+    """
+        Class to keep agents of each architecture (algorithm and constructor arguments) built and warmed up ahead of
+        time, so making an agent (e.g. when a robot joins the master) takes a spare instead of building networks and
+        tracing graphs. Spares are built and warmed up (optimizer slots created and compiled steps traced) on a
+        background thread, which replaces each spare taken. Every agent of an architecture starts from the template
+        weights of the architecture, those of the first agent built until newer weights (e.g. of the team) are published
+
+        most of the time to build an agent is tracing its compiled steps, which each agent must do for its own networks
+        (so cloning the networks of another agent would not save it) and which holds the GIL (so building on more
+        threads would not either). Joins only take a constant, small time while spares are ready, so the pool should
+        be at least the largest burst of agents joining at once (see wait_ready), and a get which finds no spare ready
+        grows the pool of its architecture by one so the next burst of the same size does not wait
+    """
+    def __init__(self, n_spares: int=2):
+        """
+            function to initialise the class and start the builder thread
+
+            n_spares is the number of agents kept ready for each architecture prepared, it should be at least the
+            number of agents expected to join at once (the pool of an architecture grows beyond it if more join)
+        """
+        if n_spares < 0:
+            raise ValueError("Number of spares cannot be negative.")
+
+        self._n_spares = n_spares
+
+        #specs, number of spares kept, spares, template weights and their versions, number of callers waiting and build
+        #errors of each architecture
+        self._specs = {}
+        self._targets = {}
+        self._spares = {}
+        self._templates = {}
+        self._versions = {}
+        self._waiting = {}
+        self._errors = {}
+
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name="agent-cache-builder", daemon=True)
+        self._thread.start()
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def n_spares(self) -> int:
+        return self._n_spares
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def prepare(self, name: str, **kwargs):
+        """
+            function to start building spares of an architecture in the background, so the first agent made is not
+            built on demand
+
+            name is the name of the algorithm in the registry
+
+            kwargs are the keyword arguments of the constructor of the algorithm (as passed to make_algorithm)
+        """
+        with self._cond:
+            self._add(name, kwargs)
+
+    def get(self, name: str, **kwargs):
+        """
+            function to make an agent by taking a spare of its architecture, waiting for one to be built if none are
+            ready, the spare is replaced in the background
+
+            name is the name of the algorithm in the registry
+
+            kwargs are the keyword arguments of the constructor of the algorithm (as passed to make_algorithm)
+
+            returns a tuple (agent, version) of the algorithm object, with the template weights of its architecture,
+            and the version of those weights (0 if none have been published), read together so weights published
+            while waiting for a spare are not given the version of older weights
+        """
+        with self._cond:
+            key = self._add(name, kwargs)
+
+            if not self._spares[key]:
+                #burst is larger than the pool, which is grown so the next burst of the same size does not wait
+                self._targets[key] += 1
+
+            self._waiting[key] += 1
+            self._cond.notify_all()
+
+            try:
+                self._cond.wait_for(lambda: self._spares[key] or key in self._errors or self._closed)
+            finally:
+                self._waiting[key] -= 1
+
+            #architecture which failed to build (e.g. invalid arguments) is not built again
+            if key in self._errors:
+                raise self._errors[key]
+
+            if not self._spares[key]:
+                raise RuntimeError("Cannot make an agent from a closed AgentCache.")
+
+            agent = self._spares[key].pop(0)
+            template = self._templates.get(key)
+            version = self._versions.get(key, 0)
+            #replacement is built for the spare taken
+            self._cond.notify_all()
+
+        if template is not None:
+            agent.set_checkpoint(template)
+
+        return agent, version
+
+    def publish(self, name: str, arrays: dict, **kwargs) -> int:
+        """
+            function to replace the template weights of an architecture, so agents made afterwards start from them
+            (e.g. the latest weights of the team, so joining agents do not learn from scratch)
+
+            name is the name of the algorithm in the registry
+
+            arrays is a dict of the arrays of the model (as returned by get_checkpoint), they must not be modified after
+            being published as they are copied onto every agent made
+
+            kwargs are the keyword arguments of the constructor of the algorithm (as passed to make_algorithm)
+
+            returns the version of the template weights, counted from 1 for the first weights published
+        """
+        with self._cond:
+            key = self._add(name, kwargs)
+
+            self._templates[key] = arrays
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+            return self._versions[key]
+
+    def version(self, name: str, **kwargs) -> int:
+        """
+            function to get the version of the template weights of an architecture
+
+            returns the version, 0 if no weights have been published
+        """
+        with self._cond:
+            return self._versions.get(self._key(name, kwargs), 0)
+
+    def ready(self, name: str, **kwargs) -> int:
+        """
+            function to get the number of spares of an architecture ready to be taken
+
+            returns the number of spares, 0 if the architecture has not been prepared
+        """
+        with self._cond:
+            return len(self._spares.get(self._key(name, kwargs), []))
+
+    def target(self, name: str, **kwargs) -> int:
+        """
+            function to get the number of spares kept for an architecture, n_spares grown by every get which found no
+            spare ready
+
+            returns the number of spares, 0 if the architecture has not been prepared
+        """
+        with self._cond:
+            return self._targets.get(self._key(name, kwargs), 0)
+
+    def wait_ready(self, timeout: float=None) -> bool:
+        """
+            function to wait until every architecture prepared has all of its spares built
+
+            timeout is the maximum number of seconds to wait, None to wait indefinitely
+
+            returns whether every architecture is ready
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._closed or all(len(self._spares[key]) >= self._targets[key] or key in self._errors for key in self._specs), timeout=timeout)
+
+    def close(self):
+        """
+            function to stop the builder thread once the agent it is building is finished and release the spares
+        """
+        with self._cond:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._cond.notify_all()
+
+        self._thread.join()
+
+        with self._cond:
+            self._spares.clear()
+
+    def _key(self, name: str, kwargs: dict) -> tuple:
+        """
+            function to get the key of an architecture, repr is used so unhashable arguments (e.g. arrays) are allowed
+        """
+        return (name, repr(sorted(kwargs.items())))
+
+    def _add(self, name: str, kwargs: dict) -> tuple:
+        """
+            function to add an architecture to be built by the builder thread, must be called holding the condition
+
+            returns the key of the architecture
+        """
+        if self._closed:
+            raise RuntimeError("Cannot make an agent from a closed AgentCache.")
+
+        if name not in ALGORITHMS:
+            raise ValueError(f'Unknown algorithm {name}, must be one of {", ".join(ALGORITHMS)}.')
+
+        key = self._key(name, kwargs)
+
+        if key not in self._specs:
+            self._specs[key] = (name, dict(kwargs))
+            self._targets[key] = self.n_spares
+            self._spares.setdefault(key, [])
+            self._waiting.setdefault(key, 0)
+            self._cond.notify_all()
+
+        return key
+
+    def _next(self):
+        """
+            function to get the key of the architecture most in need of a spare, must be called holding the condition
+
+            returns the key, None if every architecture has all of its spares
+        """
+        needed = {key: self._targets[key] + self._waiting[key] - len(self._spares[key]) for key in self._specs if key not in self._errors}
+        needed = {key: n for key, n in needed.items() if n > 0}
+
+        if not needed:
+            return None
+
+        #architectures with callers waiting are built first
+        return max(needed, key=lambda key: (self._waiting[key] > 0, needed[key]))
+
+    def _build(self, name: str, kwargs: dict):
+        """
+            function to build and warm up an agent, only called by the builder thread so keras never builds two models
+            at once
+        """
+        agent = make_algorithm(name, **kwargs)
+
+        #algorithms without compiled steps (e.g. q-learning) have nothing to warm up
+        if hasattr(agent, "warm_up"):
+            agent.warm_up()
+
+        return agent
+
+    def _run(self):
+        """
+            function run by the builder thread to keep the spares of every architecture
+        """
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._next() is not None)
+
+                if self._closed:
+                    return
+
+                key = self._next()
+                name, kwargs = self._specs[key]
+
+            try:
+                agent = self._build(name, kwargs)
+            except Exception as e:
+                logging.error("Failed to build %s agent: %s", name, e)
+
+                with self._cond:
+                    self._errors[key] = e
+                    self._cond.notify_all()
+
+                continue
+
+            with self._cond:
+                if key not in self._templates and hasattr(agent, "get_checkpoint"):
+                    self._templates[key] = agent.get_checkpoint()
+
+                self._spares[key].append(agent)
+                self._cond.notify_all()
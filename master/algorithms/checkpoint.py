@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os
+import re
+import json
+import logging
+import threading
+import time
+import numpy as np
+
+#-----------------------------------------------------------------------------------------------
+# Variables
+#-----------------------------------------------------------------------------------------------
+
+#name of the manifest file in a checkpoint directory
+MANIFEST = "manifest.json"
+#version of the checkpoint format written by save_checkpoint
+FORMAT_VERSION = 1
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def is_checkpoint(path: str) -> bool:
+    """
+        function to check whether path is a checkpoint directory (written by save_checkpoint)
+    """
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+def save_checkpoint(path: str, arrays: dict, step: int=0, metadata: dict=None, writer=None):
+    """
+        function to save a weights only checkpoint to the directory at path
+
+        path is a string of the path to the checkpoint directory, created if it does not exist
+
+        arrays is a dict of named arrays, each either a numpy array (saved as .npy so it can be memory-mapped on load)
+        or a list of numpy arrays such as the weights of a keras model (saved as .npz)
+
+        step is the training step (e.g. episode) the checkpoint was taken at
+
+        metadata is a dict of json serialisable values stored in the manifest
+
+        writer is a CheckpointWriter, if provided the checkpoint is written by its background thread and this function
+        returns once the arrays have been copied
+
+        every file is written to a temporary file and renamed into place, array files are versioned and the manifest
+        is renamed last so a reader never sees a partially written checkpoint
+    """
+    if writer is not None:
+        writer.save(path, arrays, step=step, metadata=metadata)
+        return
+
+    os.makedirs(path, exist_ok=True)
+
+    #version counts the checkpoints written to this directory
+    manifest = read_manifest(path) if is_checkpoint(path) else None
+    version = manifest["version"] + 1 if manifest else 0
+
+    files = {}
+    for name, val in arrays.items():
+        if isinstance(val, (list, tuple)):
+            files[name] = f'{name}-{version:06d}.npz'
+            _atomic_write(os.path.join(path, files[name]), lambda handle: np.savez(handle, *val))
+        else:
+            files[name] = f'{name}-{version:06d}.npy'
+            _atomic_write(os.path.join(path, files[name]), lambda handle: np.save(handle, np.asarray(val)))
+
+    new_manifest = {"format": FORMAT_VERSION, "version": version, "step": int(step), "time": time.time(), "arrays": files, "metadata": metadata or {}}
+    _atomic_write(os.path.join(path, MANIFEST), lambda handle: handle.write(json.dumps(new_manifest, indent=4).encode()))
+
+    #array files of previous versions are no longer referenced by the manifest, only the array files of this checkpoint
+    #are removed as the directory may be shared with other files (e.g. the training logs of the agents)
+    names = set(files) | set(manifest["arrays"] if manifest else [])
+    for file in os.listdir(path):
+        match = re.fullmatch(r'(.+)-\d{6}\.np[yz](\.tmp)?', file)
+
+        if match is not None and match.group(1) in names and file not in files.values():
+            try:
+                os.remove(os.path.join(path, file))
+            except OSError as e:
+                logging.warning("Unable to remove old checkpoint file %s: %s", file, e)
+
+def read_manifest(path: str) -> dict:
+    """
+        function to read the manifest of the checkpoint directory at path
+
+        returns a dict of {"format", "version", "step", "time", "arrays", "metadata"}
+    """
+    with open(os.path.join(path, MANIFEST), "r") as handle:
+        manifest = json.load(handle)
+
+    if manifest["format"] > FORMAT_VERSION:
+        raise ValueError(f'Checkpoint at {path} has format {manifest["format"]}, only formats up to {FORMAT_VERSION} can be read.')
+
+    return manifest
+
+def load_checkpoint(path: str, mmap: bool=False) -> tuple:
+    """
+        function to load a checkpoint written by save_checkpoint
+
+        path is a string of the path to the checkpoint directory
+
+        mmap determines whether numpy arrays are memory-mapped (copy-on-write) rather than read into memory,
+        so large q-tables are only paged in as states are visited
+
+        returns a tuple (arrays, manifest) where arrays is a dict of the same form as passed to save_checkpoint
+    """
+    if not is_checkpoint(path):
+        raise FileNotFoundError(f'No checkpoint manifest found in {path}.')
+
+    manifest = read_manifest(path)
+
+    arrays = {}
+    for name, file in manifest["arrays"].items():
+        file = os.path.join(path, file)
+
+        if file.endswith(".npz"):
+            with np.load(file) as data:
+                arrays[name] = [data[f'arr_{i}'] for i in range(len(data.files))]
+        else:
+            arrays[name] = np.load(file, mmap_mode="c" if mmap else None)
+
+    return arrays, manifest
+
+def _atomic_write(path: str, write_fn):
+    """
+        function to write a file atomically by writing to a temporary file then renaming it to path
+
+        write_fn is a function which writes the contents to the open (binary) file handle passed to it
+    """
+    tmp_path = f'{path}.tmp'
+
+    with open(tmp_path, "wb") as handle:
+        write_fn(handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+
+    os.replace(tmp_path, path)
+
+def _snapshot(arrays: dict) -> dict:
+    """
+        function to copy the arrays of a checkpoint so training can continue to modify them while they are written
+    """
+    return {name: [np.array(v) for v in val] if isinstance(val, (list, tuple)) else np.array(val) for name, val in arrays.items()}
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class CheckpointWriter():
+    """
+        Class to write checkpoints on a background thread so training never waits on disk I/O
+
+        save only copies the arrays, if a newer checkpoint of the same path is saved before the previous one is
+        written the previous one is skipped
+    """
+    def __init__(self):
+        """
+            function to initialise the class and start the writer thread
+        """
+        self._pending = {}
+        self._busy = False
+        self._closed = False
+        self._error = None
+        self._n_written = 0
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def n_written(self) -> int:
+        #number of checkpoints written
+        return self._n_written
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def save(self, path: str, arrays: dict, step: int=0, metadata: dict=None):
+        """
+            function to snapshot the arrays and queue the checkpoint to be written (same arguments as save_checkpoint)
+        """
+        snapshot = _snapshot(arrays)
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Cannot save a checkpoint with a closed CheckpointWriter.")
+
+            self._pending[path] = (snapshot, step, metadata)
+            self._cond.notify_all()
+
+    def flush(self):
+        """
+            function to wait until all queued checkpoints are written, raises the last error of the writer thread if any
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending and not self._busy)
+
+            error, self._error = self._error, None
+
+        if error is not None:
+            raise error
+
+    def close(self):
+        """
+            function to write all queued checkpoints and stop the writer thread
+        """
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+
+            self._thread.join()
+
+    def _run(self):
+        """
+            function run by the writer thread to write queued checkpoints
+        """
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+
+                if not self._pending:
+                    return
+
+                path, (arrays, step, metadata) = self._pending.popitem()
+                self._busy = True
+
+            try:
+                save_checkpoint(path, arrays, step=step, metadata=metadata)
+                self._n_written += 1
+            except Exception as e:
+                logging.error("Failed to write checkpoint to %s: %s", path, e)
+                self._error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
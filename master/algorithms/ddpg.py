@@ -4,18 +4,21 @@
 # Imports
 #-----------------------------------------------------------------------------------------------
 
+import numbers
 import numpy as np
 import tensorflow as tf
 import logging
 import time
 
 from algorithms.rl_algorithm import RLAlgorithm
+from algorithms.checkpoint import CheckpointWriter, is_checkpoint, load_checkpoint, save_checkpoint
+from algorithms.trajectory import TrajectoryRecorder
 
 #-----------------------------------------------------------------------------------------------    
 # Functions
 #-----------------------------------------------------------------------------------------------
 
-def run_gym_ddpg_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=256, gamma: float=0.99, lr: float=0.001, decay: float=0.9, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, saved_path: str=None):
+def run_gym_ddpg_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=256, gamma: float=0.99, lr: float=0.001, decay: float=0.9, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, tau: float=1.0, saved_path: str=None, recorder: TrajectoryRecorder=None):
     """
         function to run ddpg algorithm on a gym env
 
@@ -29,13 +32,19 @@ def run_gym_ddpg_single_agent(env, render: bool=False, episodes: int=100, time_s
 
         time steps is the maximum number of time steps per episode
 
+        tau is the target network update rate, if less than 1 the target network is softly updated after every training
+        step instead of being copied from the actor and critic networks every 10 time steps
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
     """
     #get env variables
     n_actions = int(np.squeeze(env.action_space.shape)) #number of actions
     n_obvs = np.squeeze(env.observation_space.shape)
 
-    agent = DDPG(n_obvs, n_actions, env.action_space.high, env.action_space.low, hidden_size=hidden_size, gamma=gamma, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, mem_size=mem_size, batch_size=batch_size, saved_path=saved_path)
+    agent = DDPG(n_obvs, n_actions, env.action_space.high, env.action_space.low, hidden_size=hidden_size, gamma=gamma, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, mem_size=mem_size, batch_size=batch_size, tau=tau, saved_path=saved_path)
 
     #init arrays to collect data
     all_times = []
@@ -72,8 +81,11 @@ def run_gym_ddpg_single_agent(env, render: bool=False, episodes: int=100, time_s
             agent.rewards_mem.append(reward)
             agent.next_obv_mem.append(next_obv)
     
-            ep_obvs.append(obv)
-            ep_actions.append(action)
+            if recorder is None:
+                ep_obvs.append(obv)
+                ep_actions.append(action)
+            else:
+                recorder.record(e, t, obv, action, reward, done)
 
             obv = next_obv
             total_reward += reward
@@ -109,11 +121,11 @@ def run_gym_ddpg_single_agent(env, render: bool=False, episodes: int=100, time_s
             if env.unwrapped.spec.id[0:5] == "maze-" and env.is_game_over():
                 sys.exit(0)
 
-            if np.size(agent.action_mem) > batch_size:
+            if len(agent.action_mem) > batch_size:
                 loss = agent.train()
                 all_losses.append(loss)
 
-                if t % 10 == 0:
+                if t % 10 == 0 or tau < 1.0:
                     agent.update_target_net()
 
     return all_obvs, all_actions, all_rewards, all_losses, robot_paths, all_times
@@ -126,7 +138,7 @@ class DDPG(RLAlgorithm):
     """
         Class to contain the PolicyNetwork and all parameters
     """
-    def __init__(self, n_obvs: int, n_actions: int, action_high: np.ndarray, action_low: np.ndarray, hidden_size: int=256, gamma: float=0.99, lr: float=0.001, decay: float=0.9, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, saved_path: str=None):
+    def __init__(self, n_obvs: int, n_actions: int, action_high: np.ndarray, action_low: np.ndarray, hidden_size: int=256, gamma: float=0.99, lr: float=0.001, decay: float=0.9, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, tau: float=1.0, saved_path: str=None):
         """
             function to initialise the class
 
@@ -143,12 +155,15 @@ class DDPG(RLAlgorithm):
 
             lr_decay_steps is an int which is the number of time steps to decay the learning rate
 
+            tau is the fraction of the actor and critic weights mixed into the target networks on each update (1.0 copies the weights)
+
             saved_path is a string of the path to the saved Actor-Critic network if one is being loaded
         """
         self.gamma = gamma
         self.lr = lr
         self.decay = decay
         self.n_actions = n_actions
+        self.tau = tau
         #Ornstein-Uhlenbeck noise generator
         self.noise = OrnsteinUhlenbeckNoise(mean=np.zeros(1), std_deviation=0.2 * np.ones(1))
 
@@ -159,7 +174,7 @@ class DDPG(RLAlgorithm):
         self._rewards_mem = []
         self._next_obv_mem = []
 
-        k_init = tf.random_uniform_initializer(minval=-0.003, maxval=0.003)
+        k_init = tf.keras.initializers.RandomUniform(minval=-0.003, maxval=0.003)
 
         #init actor network
         actor_inputs = tf.keras.layers.Input(shape=(n_obvs,))
@@ -183,19 +198,29 @@ class DDPG(RLAlgorithm):
         self.actor_opt = tf.keras.optimizers.Adam(learning_rate=self.lr_decay_fn)
         self.critic_opt = tf.keras.optimizers.Adam(learning_rate=self.lr_decay_fn)
 
-        #init target nets
-        self.actor_target = tf.keras.Model(inputs=actor_inputs, outputs=actor)
+        #init target nets, cloned so they have their own variables rather than sharing the layers of the actor and critic
+        self.actor_target = tf.keras.models.clone_model(self.actor_net)
         self.actor_target.set_weights(self.actor_net.get_weights())
-        self.critic_target = tf.keras.Model(inputs=[obv_input, action_input], outputs=critic)
+        self.critic_target = tf.keras.models.clone_model(self.critic_net)
         self.critic_target.set_weights(self.critic_net.get_weights())
 
         #load a saved model (neural net) if provided
         if saved_path:
-            self.actor_net = tf.keras.models.load_model(f'{saved_path}/actor_net')
-            self.actor_target = tf.keras.models.load_model(f'{saved_path}/actor_net')
-
-            self.critic_net = tf.keras.models.load_model(f'{saved_path}/critic_net')
-            self.critic_target = tf.keras.models.load_model(f'{saved_path}/critic_net')
+            if is_checkpoint(saved_path):
+                self.set_checkpoint(load_checkpoint(saved_path)[0])
+            else:
+                self.actor_net = tf.keras.models.load_model(f'{saved_path}/actor_net')
+                self.actor_target = tf.keras.models.load_model(f'{saved_path}/actor_net')
+
+                self.critic_net = tf.keras.models.load_model(f'{saved_path}/critic_net')
+                self.critic_target = tf.keras.models.load_model(f'{saved_path}/critic_net')
+
+        #compile act and train steps into graphs with fixed input signatures so they are traced 
+        #once instead of being dispatched eagerly on every call
+        obv_spec = tf.TensorSpec(shape=(None, int(n_obvs)), dtype=tf.float32)
+        self.act_step = tf.function(self.act_step, input_signature=[obv_spec])
+        self.train_step = tf.function(self.train_step, input_signature=[obv_spec, tf.TensorSpec(shape=(None, n_actions), dtype=tf.float32), tf.TensorSpec(shape=(None,), dtype=tf.float32), obv_spec])
+        self.target_update_step = tf.function(self.target_update_step, input_signature=[tf.TensorSpec(shape=(), dtype=tf.float32)])
     
     #-------------------------------------------------------------------------------------------
     # Properties
@@ -209,6 +234,22 @@ class DDPG(RLAlgorithm):
     def mem_size(self) -> int:
         return self._mem_size
 
+    @property
+    def tau(self) -> float:
+        #tau is the fraction of the actor and critic weights mixed into the target network on each update
+        return self._tau
+
+    @tau.setter
+    def tau(self, val: float):
+        #ints are accepted as sweeps pass json numbers through (e.g. tau=1 for hard updates)
+        if not isinstance(val, numbers.Real) or isinstance(val, bool):
+            raise TypeError("tau (target network update rate) must be a real number")
+
+        if val <= 0 or val > 1:
+            raise ValueError("tau (target network update rate) must have a value between 0 (exclusive) and 1 (inclusive).")
+
+        self._tau = float(val)
+
     @property
     def obv_mem(self) -> list:
         return self._obv_mem
@@ -229,14 +270,36 @@ class DDPG(RLAlgorithm):
     # Methods
     #-------------------------------------------------------------------------------------------
 
-    def save_model(self, path: str):
+    def save_model(self, path: str, step: int=0, writer: CheckpointWriter=None):
         """
-            function to save the tensorflow model (neural net) to a file
+            function to save the model (actor and critic network weights) as a weights only checkpoint
+
+            path is a string of the path to the checkpoint directory where the model will be saved
+
+            step is the training step (e.g. episode) the checkpoint is taken at
 
-            path is a string of the path to the file where the model will be saved
+            writer is a CheckpointWriter to write the checkpoint on a background thread, if None the checkpoint
+            is written before returning
         """
-        self.actor_net.save(f'{path}/actor_net')
-        self.critic_net.save(f'{path}/critic_net')
+        save_checkpoint(path, self.get_checkpoint(), step=step, metadata={"algorithm": type(self).__name__}, writer=writer)
+
+    def get_checkpoint(self) -> dict:
+        """
+            function to get the arrays of the model to be saved in a checkpoint
+
+            returns a dict of the actor and critic network weights
+        """
+        return {"actor_net": self.actor_net.get_weights(), "critic_net": self.critic_net.get_weights()}
+
+    def set_checkpoint(self, arrays: dict):
+        """
+            function to set the model from the arrays of a checkpoint (as returned by get_checkpoint)
+        """
+        self.actor_net.set_weights(arrays["actor_net"])
+        self.actor_target.set_weights(arrays["actor_net"])
+
+        self.critic_net.set_weights(arrays["critic_net"])
+        self.critic_target.set_weights(arrays["critic_net"])
 
     def get_action(self, obv: np.ndarray) -> float:
         """
@@ -247,7 +310,7 @@ class DDPG(RLAlgorithm):
 
             returns the action to take
         """
-        action = self.actor_net(np.expand_dims(obv, axis=0)).numpy()[0]            
+        action = self.act_step(np.array([obv], dtype=np.float32)).numpy()[0]
         #add noise for exploration
         action += self.noise()
 
@@ -255,26 +318,34 @@ class DDPG(RLAlgorithm):
 
         return action
 
-    def train(self) -> tf.Tensor:
+    def act_step(self, obvs: tf.Tensor) -> tf.Tensor:
         """
-            function to train Policy network using previous episode data from replay memory
+            function to get the deterministic action of the actor for a batch of observations, compiled into a graph on init
 
-            batch size is the number of experiences to train the Q-network with
+            obvs is a float32 tensor of observations with shape [batch, n_obvs]
 
-            returns the loss of the training as a tensor
+            returns a float32 tensor of actions with shape [batch, n_actions]
         """
-        indices = np.random.choice(range(np.size(self.action_mem)), size=self.batch_size)
+        return self.actor_net(obvs, training=False)
 
-        #samples of each piece of data from a random step in replay memory
-        obv_batch = np.array([self.obv_mem[i] for i in indices])
-        action_batch = np.array([[self.action_mem[i]] for i in indices], dtype=np.float32)
-        reward_batch = np.array([self.rewards_mem[i] for i in indices], dtype=np.float32)
-        next_obv_batch = np.array([self.next_obv_mem[i] for i in indices])
+    def train_step(self, obv_batch: tf.Tensor, action_batch: tf.Tensor, reward_batch: tf.Tensor, next_obv_batch: tf.Tensor) -> tf.Tensor:
+        """
+            function to apply one gradient descent step to the critic and then the actor network, compiled into a graph on init
+
+            obv_batch is a float32 tensor of observations with shape [batch, n_obvs]
 
-        actor_targets = self.actor_target(next_obv_batch)
-        critic_targets = self.critic_target([next_obv_batch, actor_targets])
+            action_batch is a float32 tensor of the actions taken with shape [batch, n_actions]
+
+            reward_batch is a float32 tensor of the rewards received with shape [batch]
+
+            next_obv_batch is a float32 tensor of the next observations with shape [batch, n_obvs]
+
+            returns the sum of the actor and critic losses as a tensor
+        """
+        actor_targets = self.actor_target(next_obv_batch, training=False)
+        critic_targets = self.critic_target([next_obv_batch, actor_targets], training=False)
         #calculate expected reward for each sample
-        critic_targets = reward_batch + self.gamma * critic_targets
+        critic_targets = tf.expand_dims(reward_batch, axis=1) + self.gamma * critic_targets
 
         #backpropagation for critic network
         with tf.GradientTape() as tape:
@@ -293,20 +364,52 @@ class DDPG(RLAlgorithm):
         actor_grads = tape.gradient(actor_loss, self.actor_net.trainable_variables)
         self.actor_opt.apply_gradients(zip(actor_grads, self.actor_net.trainable_variables))
 
-        if np.size(self.action_mem) > self.mem_size:
+        return actor_loss + critic_loss
+
+    def train(self) -> tf.Tensor:
+        """
+            function to train Policy network using previous episode data from replay memory
+
+            batch size is the number of experiences to train the Q-network with
+
+            returns the loss of the training as a tensor
+        """
+        indices = np.random.choice(range(len(self.action_mem)), size=self.batch_size)
+
+        #samples of each piece of data from a random step in replay memory
+        obv_batch = np.array([self.obv_mem[i] for i in indices], dtype=np.float32)
+        action_batch = np.array([self.action_mem[i] for i in indices], dtype=np.float32).reshape(-1, self.n_actions)
+        reward_batch = np.array([self.rewards_mem[i] for i in indices], dtype=np.float32)
+        next_obv_batch = np.array([self.next_obv_mem[i] for i in indices], dtype=np.float32)
+
+        loss = self.train_step(obv_batch, action_batch, reward_batch, next_obv_batch)
+
+        if len(self.action_mem) > self.mem_size:
             self.action_mem.pop(0)
             self.obv_mem.pop(0)
             self.rewards_mem.pop(0)
             self.next_obv_mem.pop(0)
 
-        return actor_loss + critic_loss
+        return loss
 
-    def update_target_net(self):
+    def target_update_step(self, tau: tf.Tensor):
         """
-            function to update the weights of the target network
+            function to move the target network variables towards the actor and critic variables in place
+            (target = tau * online + (1 - tau) * target), compiled so no weights are copied to the host
+
+            tau is a scalar tensor of the fraction of the actor and critic weights mixed into the target networks
         """
-        self.actor_target.set_weights(self.actor_net.get_weights())
-        self.critic_target.set_weights(self.critic_net.get_weights())
+        for target_net, net in ((self.actor_target, self.actor_net), (self.critic_target, self.critic_net)):
+            for target_var, var in zip(target_net.variables, net.variables):
+                target_var.assign(tau * var + (1.0 - tau) * target_var)
+
+    def update_target_net(self, tau: float=None):
+        """
+            function to update the weights of the target networks
+
+            tau is the fraction of the actor and critic weights mixed into the target networks, if None the tau property is used
+        """
+        self.target_update_step(tf.constant(self.tau if tau is None else tau, dtype=tf.float32))
 
 class OrnsteinUhlenbeckNoise():
     """
@@ -10,12 +10,13 @@ import logging
 import time
 
 from algorithms.dqn import DQN
+from algorithms.trajectory import TrajectoryRecorder
 
 #-----------------------------------------------------------------------------------------------    
 # Functions
 #-----------------------------------------------------------------------------------------------
 
-def run_gym_ddrqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, saved_path: str=None):
+def run_gym_ddrqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=16, seq_len: int=16, burn_in: int=8, tau: float=0.01, saved_path: str=None, recorder: TrajectoryRecorder=None):
     """
         function to run ddrqn algorithm on a gym env
 
@@ -29,6 +30,14 @@ def run_gym_ddrqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes
 
         time steps is the maximum number of time steps per episode
 
+        mem_size, batch_size, seq_len and burn_in are the replay memory capacity, number of windows per training batch and
+        number of trained and warm up time steps of each window
+
+        tau is the fraction of the Q-network weights mixed into the target network after every training step
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
     """
     if n_agents < 1:
@@ -40,7 +49,11 @@ def run_gym_ddrqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes
     n_actions = env.action_space.n #number of actions
     n_obvs = np.squeeze(env.observation_space.shape)
 
-    agents = [DDRQN(n_obvs, n_actions, hidden_size=hidden_size, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, saved_path=saved_path) for i in range(n_agents)]
+    agents = [DDRQN(n_obvs, n_actions, hidden_size=hidden_size, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, mem_size=mem_size, batch_size=batch_size, seq_len=seq_len, burn_in=burn_in, tau=tau, saved_path=saved_path) for i in range(n_agents)]
+
+    #agents start with the same weights so they can act with one call of a shared network
+    for i in range(1, n_agents):
+        agents[i].receive_comm(agents[0].send_comm())
 
     #init arrays to collect data
     all_times = []
@@ -58,6 +71,9 @@ def run_gym_ddrqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes
 
     for e in range(episodes): 
         obvs = env.reset()
+
+        for i in range(n_agents):
+            agents[i].reset_state()
         
         start_time = time.time()
         ep_obvs = []
@@ -70,27 +86,33 @@ def run_gym_ddrqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes
             if render:
                 env.render()
 
-            actions = np.zeros(n_agents, dtype=int)
-
-            for i in range(n_agents):
-                actions[i] = agents[i].get_action(obvs[i])
+            #all agents act with a single call of the shared network
+            actions = DDRQN.get_actions(agents, np.asarray(obvs))
 
             next_obvs, rewards, done, _ = env.step(actions)
 
             for i in range(n_agents):
-                loss = agents[i].train(obvs[i], actions[i], rewards[i], next_obvs[i])
-                ep_losses.append(loss)
+                agents[i].remember(rewards[i], next_obvs[i], done)
 
-                #each agent sends their updated weights to the next agent for the next update
-                j = (i + 1) % (n_agents - 1)
-                agents[j].receive_comm(agents[i].send_comm())
+            #agents are trained on batches of windows of experiences from replay memory every 4 time steps
+            if agents[0].can_train and t % 4 == 0:
+                for i in range(n_agents):
+                    loss = agents[i].train()
+                    ep_losses.append(loss)
 
-            for i in range(n_agents):
-                #agent 0 has the most up to date network and should update all other agents networks
-                agents[i].receive_comm(agents[0].send_comm())
+                    #each agent sends their updated weights to the next agent for the next update
+                    j = (i + 1) % (n_agents - 1)
+                    agents[j].receive_comm(agents[i].send_comm())
+
+                for i in range(n_agents):
+                    #agent 0 has the most up to date network and should update all other agents networks
+                    agents[i].receive_comm(agents[0].send_comm())
 
-            ep_obvs.append(actions)
-            ep_actions.append(obvs)
+            if recorder is None:
+                ep_obvs.append(obvs)
+                ep_actions.append(actions)
+            else:
+                recorder.record(e, t, obvs, actions, rewards, done)
 
             obvs = next_obvs
             total_rewards += rewards
@@ -141,7 +163,7 @@ class DDRQN(DQN):
     """
         Class to contain the QNetwork and all parameters with methods to train network and get actions
     """
-    def __init__(self, n_obvs: int, n_actions: int, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, saved_path: str=None):
+    def __init__(self, n_obvs: int, n_actions: int, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=16, seq_len: int=16, burn_in: int=8, tau: float=0.01, saved_path: str=None):
         """
             function to initialise the class
 
@@ -162,12 +184,22 @@ class DDRQN(DQN):
 
             lr_decay_steps is the number of time steps to decay the learning rate
 
+            mem_size is the maximum capacity of the experience replay memory
+
+            batch_size is the number of windows of experiences in each training batch
+
+            seq_len is the number of consecutive time steps of each window which are trained on
+
+            burn_in is the number of time steps before these used to warm up the LSTM state
+
+            tau is the fraction of the Q-network weights mixed into the target network after every training step
+
             saved_path is the path to the saved Q-network if on is being loaded
         """
         #provide previous action as an input as well as observation
         n_inputs = n_obvs + 1
 
-        super(DDRQN, self).__init__(n_inputs, n_actions, hidden_size=hidden_size, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, batch_size=1, DRQN=True, saved_path=saved_path)
+        super(DDRQN, self).__init__(n_inputs, n_actions, hidden_size=hidden_size, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, mem_size=mem_size, batch_size=batch_size, DRQN=True, seq_len=seq_len, burn_in=burn_in, tau=tau, saved_path=saved_path)
         #init agent actions to random action
         self.prev_action = np.random.choice(self.n_actions)
 
@@ -200,49 +232,70 @@ class DDRQN(DQN):
         #feed previous action to the q-net alongside observations
         obv = np.concatenate((obv, [self.prev_action]), axis=0)
 
-        #take random action with probability epsilon (explore rate)
-        if np.random.uniform(0, 1) < self.epsilon:
-            action = np.random.choice(self.n_actions)
-        else:
-            #calculate Q-values using Q-network
-            values = self.q_net(np.expand_dims(obv, axis=(0, 1)))
-            #policy is greedy
-            action = np.argmax(values)
+        #LSTM state is advanced by one step and stored with the experience
+        return super(DDRQN, self).get_action(obv)
 
-        return action
+    @staticmethod
+    def get_actions(agents: list, obvs: np.ndarray) -> np.ndarray:
+        """
+            function to get the actions of a team of agents with the same Q-network weights (as after receive_comm) 
+            using an epsilon-greedy policy, with one call of the network advancing the LSTM state of every agent by one step
+
+            agents is a list of DDRQN agents
 
-    def train(self, obv: np.ndarray, action: int, reward: float, next_obv: np.ndarray) -> float: 
+            obvs is an array of shape [n_agents, n_obvs] of each agent's current observation
+
+            returns an int array of shape [n_agents] of the action each agent should take
         """
-            function to train agent by applying gradient descent to the net
+        #feed previous action of each agent to the q-net alongside its observation
+        obvs = np.concatenate((obvs, [[agent.prev_action] for agent in agents]), axis=1).astype(np.float32)
+
+        #LSTM states of all agents are batched
+        prev_h = np.concatenate([agent.state[0] for agent in agents])
+        prev_c = np.concatenate([agent.state[1] for agent in agents])
 
-            obv is the observation from the environment
+        greedy_actions, h, c = agents[0].recurrent_act_step(obvs, prev_h, prev_c)
+        greedy_actions, h, c = greedy_actions.numpy(), h.numpy(), c.numpy()
 
-            action is the action taken by the agent
+        #take random action with probability epsilon (explore rate)
+        explore = np.random.uniform(0, 1, size=len(agents)) < np.array([agent.epsilon for agent in agents])
+        actions = np.where(explore, np.random.randint(agents[0].n_actions, size=len(agents)), greedy_actions)
+
+        for i, agent in enumerate(agents):
+            agent._state = (h[i:i + 1], c[i:i + 1])
+            agent._pending = (obvs[i], int(actions[i]), (prev_h[i:i + 1], prev_c[i:i + 1]))
 
-            reward is the reward provided by the environment after taking action in current state
+        return actions
 
-            next_obv is the observation after taking action in the current state
+    def remember(self, reward: float, next_obv: np.ndarray, done: bool=False):
         """
-        #feed other agent actions to the q-net alongside observations
-        obv = np.concatenate((obv, [self.prev_action]), axis=0)
+            function to store the outcome of the last action (from get_action) in replay memory
+
+            reward is the reward provided by the environment after taking the last action
+
+            next_obv is the observation after taking the last action
+
+            done is whether the episode ended after taking the last action
+        """
+        action = self._pending[1]
+
         #previous action is current action for next observation
         next_obv = np.concatenate((next_obv, [action]), axis=0)
+        super(DDRQN, self).remember(reward, next_obv, done)
 
-        target = self.target_net(np.expand_dims(next_obv, axis=(0, 1)))
-        #calculate expected reward
-        target = reward + self.gamma * np.max(target)
+        #add action to memory (must be done after storing so previous action is fed with the observation)
+        self.prev_action = int(action)
 
-        with tf.GradientTape() as tape:
-            values = self.q_net(np.expand_dims(obv, axis=(0, 1)))
-            #calculate Q-values based on action taken for each step
-            value = tf.reduce_sum(values[0, action])
-            loss = self.loss_fn([target], [value])
+    def train(self) -> tf.Tensor: 
+        """
+            function to train agent by applying gradient descent to the net over a batch of windows of experiences
 
-        grads = tape.gradient(loss, self.q_net.trainable_variables)
-        self.opt.apply_gradients(zip(grads, self.q_net.trainable_variables))
+            returns the loss of the training as a tensor
+        """
+        loss = super(DDRQN, self).train()
 
-        #add action to memory (must be done after training so previous action can be used in training)
-        self.prev_action = int(action)
+        #target network is softly updated after every training step
+        self.update_target_net()
 
         return loss
 
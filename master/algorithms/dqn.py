@@ -4,18 +4,26 @@
 # Imports
 #-----------------------------------------------------------------------------------------------
 
+import os
+import functools
+import numbers
 import numpy as np
 import tensorflow as tf
 import logging
 import time
 
 from algorithms.rl_algorithm import RLAlgorithm
+from algorithms.sequence_replay import SequenceReplay
+from algorithms.checkpoint import CheckpointWriter, is_checkpoint, load_checkpoint, save_checkpoint
+from algorithms.vec_env import VecEnv
+from algorithms.parallel_agents import ParallelAgents, run_parallel_agents
+from algorithms.trajectory import TrajectoryRecorder
 
 #-----------------------------------------------------------------------------------------------    
 # Functions
 #-----------------------------------------------------------------------------------------------
 
-def run_gym_dqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, recurrent: bool=False, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, saved_path: str=None):
+def run_gym_dqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, recurrent: bool=False, seq_len: int=16, burn_in: int=8, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, tau: float=1.0, saved_path: str=None, n_workers: int=0, recorder: TrajectoryRecorder=None):
     """
         function to run independent dqn algorithm on a gym env
 
@@ -29,6 +37,17 @@ def run_gym_dqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes:
 
         time steps is the maximum number of time steps per episode
 
+        seq_len and burn_in are the number of trained and warm up time steps of each window of experiences (recurrent only)
+
+        tau is the target network update rate, if less than 1 the target network is softly updated after every training
+        step instead of being copied from the Q-network every 20 time steps
+
+        n_workers is the number of worker processes the agents are split between and trained in, in parallel with
+        each other, if 0 the agents are trained in this process
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
     """
     if n_agents < 1:
@@ -40,7 +59,17 @@ def run_gym_dqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes:
     n_actions = env.action_space.n #number of actions
     n_obvs = np.squeeze(env.observation_space.shape)
 
-    agents = [DQN(n_obvs, n_actions, hidden_size=hidden_size, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, mem_size=mem_size, batch_size=batch_size, DRQN=recurrent, saved_path=saved_path) for i in range(n_agents)]
+    if n_workers:
+        n_workers = min(n_workers, n_agents)
+        #cores are shared between the workers so they do not compete for tensorflow threads
+        n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+        group_fn = functools.partial(DQNAgentGroup, n_obvs=int(n_obvs), n_actions=n_actions, n_threads=n_threads, hidden_size=hidden_size, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, mem_size=mem_size, batch_size=batch_size, DRQN=recurrent, seq_len=seq_len, burn_in=burn_in, tau=tau, saved_path=saved_path)
+
+        #workers are spawned as tensorflow is not safe to fork once its runtime has started
+        with ParallelAgents(group_fn, n_agents, env.observation_space, n_workers=n_workers, start_method="spawn") as agents:
+            return run_parallel_agents(env, agents, render=render, episodes=episodes, time_steps=time_steps, recorder=recorder)
+
+    agents = [DQN(n_obvs, n_actions, hidden_size=hidden_size, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, mem_size=mem_size, batch_size=batch_size, DRQN=recurrent, seq_len=seq_len, burn_in=burn_in, tau=tau, saved_path=saved_path) for i in range(n_agents)]
 
     #init arrays to collect data
     all_times = []
@@ -58,6 +87,9 @@ def run_gym_dqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes:
 
     for e in range(episodes): 
         obvs = env.reset()
+
+        for i in range(n_agents):
+            agents[i].reset_state()
         
         start_time = time.time()
         ep_obvs = []
@@ -78,11 +110,13 @@ def run_gym_dqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes:
             next_obvs, rewards, done, _ = env.step(actions)
 
             for i in range(n_agents):
-                agents[i].reward_mem.append(rewards[i])
-                agents[i].next_obv_mem.append(next_obvs[i])
+                agents[i].remember(rewards[i], next_obvs[i], done)
 
-            ep_obvs.append(actions)
-            ep_actions.append(obvs)
+            if recorder is None:
+                ep_obvs.append(obvs)
+                ep_actions.append(actions)
+            else:
+                recorder.record(e, t, obvs, actions, rewards, done)
 
             obvs = next_obvs
             total_rewards += rewards
@@ -118,13 +152,13 @@ def run_gym_dqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes:
             if env.unwrapped.spec.id[0:5] == "maze-" and env.is_game_over():
                 sys.exit(0)
 
-            if np.size(agents[0].action_mem) > batch_size and t % 4 == 0:
+            if agents[0].can_train and t % 4 == 0:
                 losses  = []
                 for i in range(n_agents):
                     loss = agents[i].train()
                     losses.append(loss)
 
-                    if t % 20 == 0:
+                    if t % 20 == 0 or tau < 1.0:
                         agents[i].update_target_net()
 
                 ep_losses.append(losses)
@@ -135,11 +169,12 @@ def run_gym_dqn_multi_agent(env, n_agents: int=1, render: bool=False, episodes:
 
     return all_obvs, all_actions, all_rewards, all_losses, robot_paths, all_times
 
-def run_gym_dqn_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, recurrent: bool=False, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, saved_path: str=None):
+def run_gym_dqn_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, recurrent: bool=False, seq_len: int=16, burn_in: int=8, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, tau: float=1.0, saved_path: str=None, recorder: TrajectoryRecorder=None):
     """
         function to run dqn algorithm on a gym env
 
-        env is the gym env object
+        env is the gym env object, or a VecEnv of copies of the env whose actions are chosen and experiences stored 
+        as a batch each time step (not recurrent)
 
         n_agents is the number of agents
 
@@ -149,6 +184,14 @@ def run_gym_dqn_single_agent(env, render: bool=False, episodes: int=100, time_st
 
         time steps is the maximum number of time steps per episode
 
+        seq_len and burn_in are the number of trained and warm up time steps of each window of experiences (recurrent only)
+
+        tau is the target network update rate, if less than 1 the target network is softly updated after every training
+        step instead of being copied from the Q-network every 20 time steps
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
     """
     batch_size = 32
@@ -157,7 +200,13 @@ def run_gym_dqn_single_agent(env, render: bool=False, episodes: int=100, time_st
     n_actions = env.action_space.n #number of actions
     n_obvs = np.squeeze(env.observation_space.shape)
 
-    agent = DQN(n_obvs, n_actions, hidden_size=hidden_size, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, mem_size=mem_size, batch_size=batch_size, DRQN=recurrent, saved_path=saved_path)
+    if isinstance(env, VecEnv) and recurrent:
+        raise ValueError("DRQN keeps a single LSTM state and sequence of experiences so cannot be run on a VecEnv.")
+
+    agent = DQN(n_obvs, n_actions, hidden_size=hidden_size, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, mem_size=mem_size, batch_size=batch_size, DRQN=recurrent, seq_len=seq_len, burn_in=burn_in, tau=tau, saved_path=saved_path)
+
+    if isinstance(env, VecEnv):
+        return run_vec_env_dqn(env, agent, render=render, episodes=episodes, time_steps=time_steps, recorder=recorder)
 
     #init arrays to collect data
     all_times = []
@@ -175,6 +224,7 @@ def run_gym_dqn_single_agent(env, render: bool=False, episodes: int=100, time_st
 
     for e in range(episodes): 
         obv = env.reset()
+        agent.reset_state()
 
         start_time = time.time()
         ep_obvs = []
@@ -190,11 +240,13 @@ def run_gym_dqn_single_agent(env, render: bool=False, episodes: int=100, time_st
     
             next_obv, reward, done, _ = env.step(action)
     
-            agent.reward_mem.append(reward)
-            agent.next_obv_mem.append(next_obv)
+            agent.remember(reward, next_obv, done)
     
-            ep_obvs.append(obv)
-            ep_actions.append(action)
+            if recorder is None:
+                ep_obvs.append(obv)
+                ep_actions.append(action)
+            else:
+                recorder.record(e, t, obv, action, reward, done)
 
             obv = next_obv
             total_reward += reward
@@ -230,26 +282,144 @@ def run_gym_dqn_single_agent(env, render: bool=False, episodes: int=100, time_st
             if env.unwrapped.spec.id[0:5] == "maze-" and env.is_game_over():
                 sys.exit(0)
 
-            if np.size(agent.action_mem) > batch_size and t % 4 == 0:
+            if agent.can_train and t % 4 == 0:
                 loss = agent.train()
                 all_losses.append(loss)
 
-                if t % 20 == 0:
+                if t % 20 == 0 or tau < 1.0:
                     agent.update_target_net()
 
         agent.update_parameters(e)
 
     return all_obvs, all_actions, all_rewards, all_losses, robot_paths, all_times
 
+def run_vec_env_dqn(env: VecEnv, agent, render: bool=False, episodes: int=100, time_steps: int=10000, recorder: TrajectoryRecorder=None):
+    """
+        function to run dqn algorithm on a VecEnv, the actions of every env are chosen with a single call of the 
+        Q-network and the experiences of every env are stored in replay memory together each time step
+
+        env is the VecEnv, episodes of each of its envs are ended after time_steps time steps
+
+        agent is the DQN agent (not recurrent)
+
+        render determines whether to render the first env
+
+        episodes is the number of episodes to simulate, counted across all envs
+
+        time steps is the maximum number of time steps per episode
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
+        returns obvs, actions, rewards and losses of all episodes in the order they ended and time of each epsiode in seconds
+    """
+    env.time_limit = time_steps
+
+    #init arrays to collect data
+    all_times = []
+    all_obvs = []
+    all_actions = []
+    all_rewards = []
+    all_losses = []
+
+    #robot-maze env can save the path taken by the agents each episode
+    robot_paths = []
+
+    #data of the current episode of each env
+    ep_obvs = [[] for i in range(env.n_envs)]
+    ep_actions = [[] for i in range(env.n_envs)]
+    total_rewards = np.zeros(env.n_envs)
+    start_times = np.full(env.n_envs, time.time())
+    ep_lengths = np.zeros(env.n_envs, dtype=int)
+    #episodes of different envs overlap so they are recorded with indexes in the order they started
+    ep_indexes = np.arange(env.n_envs)
+
+    obvs = env.reset()
+    e = 0
+    n_steps = 0
+
+    while e < episodes:
+        if render:
+            env.render()
+
+        actions = agent.get_batch_actions(obvs)
+
+        #observations are copied as those of a SubprocVecEnv are overwritten by the next step
+        obvs = np.copy(obvs)
+
+        next_obvs, rewards, dones, infos = env.step(actions)
+
+        for i in range(env.n_envs):
+            if recorder is None:
+                ep_obvs[i].append(obvs[i])
+                ep_actions[i].append(actions[i])
+            else:
+                recorder.record(ep_indexes[i], ep_lengths[i], obvs[i], actions[i], rewards[i], dones[i] and not infos[i]["timeout"])
+
+        ep_lengths += 1
+
+        #finished envs have already been reset so the last observation of their episode is stored instead
+        last_obvs = next_obvs.copy()
+        for i in np.flatnonzero(dones):
+            last_obvs[i] = infos[i]["terminal_observation"]
+
+        agent.remember_batch(rewards, last_obvs, dones)
+
+        total_rewards += rewards
+
+        for i in np.flatnonzero(dones):
+            if infos[i]["timeout"]:
+                logging.info("Episode %u timed out, with total reward = %f", e, total_rewards[i])
+            else:
+                logging.info("Episode %u completed, after %u time steps, with total reward = %f", e, ep_lengths[i] - 1, total_rewards[i])
+
+            all_times.append(round((time.time() - start_times[i]), 3))
+            all_obvs.append(ep_obvs[i])
+            all_actions.append(ep_actions[i])
+            all_rewards.append(total_rewards[i])
+
+            if "robot_path" in infos[i]:
+                robot_paths.append(infos[i]["robot_path"])
+
+            ep_obvs[i] = []
+            ep_actions[i] = []
+            total_rewards[i] = 0
+            start_times[i] = time.time()
+            ep_lengths[i] = 0
+            ep_indexes[i] = np.max(ep_indexes) + 1
+
+            agent.update_parameters(e)
+            e += 1
+
+        #agent is trained once every 4 experiences and the target network updated every 20, the same rate per 
+        #experience as run_gym_dqn_single_agent regardless of the number of envs
+        prev_steps = n_steps
+        n_steps += env.n_envs
+
+        if agent.can_train:
+            for k in range(n_steps // 4 - prev_steps // 4):
+                loss = agent.train()
+                all_losses.append(loss)
+
+                if agent.tau < 1.0:
+                    agent.update_target_net()
+
+            if agent.tau >= 1.0 and n_steps // 20 > prev_steps // 20:
+                agent.update_target_net()
+
+        obvs = next_obvs
+
+    return all_obvs, all_actions, all_rewards, all_losses, robot_paths, all_times
+
 #-----------------------------------------------------------------------------------------------    
 # Classes
 #-----------------------------------------------------------------------------------------------
 
-class DQN():
+class DQN(RLAlgorithm):
     """
         Class to contain the QNetwork and all parameters with methods to train network and get actions
     """
-    def __init__(self, n_obvs: int, n_actions: int, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, DRQN: bool=False, saved_path: str=None):
+    def __init__(self, n_obvs: int, n_actions: int, hidden_size: int=128, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.00025, decay: float=0.999, lr_decay_steps: int=10000, mem_size: int=10000, batch_size: int=32, DRQN: bool=False, seq_len: int=16, burn_in: int=8, tau: float=1.0, saved_path: str=None):
         """
             function to initialise the class
 
@@ -274,6 +444,12 @@ class DQN():
 
             DRQN uses a long short-term memory (LSTM) in place of the first layer of the neural net if true
 
+            seq_len is the number of consecutive time steps of each window of experiences DRQN is trained on
+
+            burn_in is the number of time steps before each window used to warm up the LSTM state (DRQN only)
+
+            tau is the fraction of the Q-network weights mixed into the target network on each update (1.0 copies the weights)
+
             saved_path is the path to the saved Q-network if one is being loaded
         """
         self.gamma = gamma
@@ -281,6 +457,7 @@ class DQN():
         self.decay = decay
         self.n_actions = n_actions
         self.epsilon = epsilon_max
+        self.tau = tau
 
         self._epsilon_max = epsilon_max
         self._epsilon_min = epsilon_min
@@ -291,16 +468,32 @@ class DQN():
         self._next_obv_mem = []
         self._batch_size = batch_size
         self._DRQN = DRQN
+        self._hidden_size = hidden_size
+        #LSTM state carried between the steps of an episode when acting (DRQN only)
+        self._state = None
+        #observation, action and LSTM state of the last step, stored in replay memory once the reward is known
+        self._pending = None
+
+        if self.DRQN:
+            #DRQN is trained on windows of consecutive experiences rather than single transitions
+            self.replay = SequenceReplay(mem_size, int(n_obvs), hidden_size, seq_len, burn_in=burn_in)
+            self.reset_state()
         
         #init network
         inputs = tf.keras.layers.Input(shape=(None, n_obvs,))
         #DRQN uses LSTM (long short term memory) in place of input layer
         if self.DRQN:
-            common = tf.keras.layers.LSTM(hidden_size)(inputs)
+            #initial state is an input and the Q-values of every time step and the final state are outputs, so training 
+            #windows can start from a stored state and acting can advance the state one step at a time
+            h_input = tf.keras.layers.Input(shape=(hidden_size,))
+            c_input = tf.keras.layers.Input(shape=(hidden_size,))
+            common, h, c = tf.keras.layers.LSTM(hidden_size, return_sequences=True, return_state=True)(inputs, initial_state=[h_input, c_input])
+            q_vals = tf.keras.layers.Dense(n_actions, activation="linear")(common)
+            self.q_net = tf.keras.Model(inputs=[inputs, h_input, c_input], outputs=[q_vals, h, c])
         else:
             common = tf.keras.layers.Dense(hidden_size, activation="relu")(inputs)
-        q_vals = tf.keras.layers.Dense(n_actions, activation="linear")(common)
-        self.q_net = tf.keras.Model(inputs=inputs, outputs=q_vals)
+            q_vals = tf.keras.layers.Dense(n_actions, activation="linear")(common)
+            self.q_net = tf.keras.Model(inputs=inputs, outputs=q_vals)
     
         self.lr_decay_fn = tf.keras.optimizers.schedules.ExponentialDecay(self.lr, decay_steps=lr_decay_steps, decay_rate=self.decay)
         self.opt = tf.keras.optimizers.Adam(learning_rate=self.lr_decay_fn)
@@ -309,13 +502,36 @@ class DQN():
         #target network to calculate target Q-values
         #back propagation and gardient calculations are not performed on this network intead it 
         #is updated with the weights from the Q-network at set intervals
-        self.target_net = tf.keras.Model(inputs=inputs, outputs=q_vals)
+        #the network is cloned so it has its own variables rather than sharing the layers of the Q-network
+        self.target_net = tf.keras.models.clone_model(self.q_net)
         self.target_net.set_weights(self.q_net.get_weights())
 
         #load a saved model (neural net) if provided
         if saved_path:
-            self.q_net = tf.keras.models.load_model(saved_path)
-            self.target_net = tf.keras.models.load_model(saved_path)
+            if is_checkpoint(saved_path):
+                self.set_checkpoint(load_checkpoint(saved_path)[0])
+            else:
+                self.q_net = tf.keras.models.load_model(saved_path)
+                self.target_net = tf.keras.models.load_model(saved_path)
+
+        if self.DRQN:
+            #LSTM layer and Q-value layer of the Q-network, used to step the LSTM cell directly when acting
+            self._lstm = next(layer for layer in self.q_net.layers if isinstance(layer, tf.keras.layers.LSTM))
+            self._q_head = self.q_net.layers[-1]
+
+        #compile act and train steps into graphs with fixed input signatures so they are traced 
+        #once instead of being dispatched eagerly on every call
+        obv_spec = tf.TensorSpec(shape=(None, int(n_obvs)), dtype=tf.float32)
+        self.act_step = tf.function(self.act_step, input_signature=[obv_spec])
+        self.train_step = tf.function(self.train_step, input_signature=[obv_spec, tf.TensorSpec(shape=(None,), dtype=tf.int32), tf.TensorSpec(shape=(None,), dtype=tf.float32), obv_spec])
+        self.target_update_step = tf.function(self.target_update_step, input_signature=[tf.TensorSpec(shape=(), dtype=tf.float32)])
+
+        if self.DRQN:
+            seq_spec = tf.TensorSpec(shape=(None, None, int(n_obvs)), dtype=tf.float32)
+            steps_spec = tf.TensorSpec(shape=(None, None), dtype=tf.float32)
+            state_spec = tf.TensorSpec(shape=(None, hidden_size), dtype=tf.float32)
+            self.recurrent_act_step = tf.function(self.recurrent_act_step, input_signature=[obv_spec, state_spec, state_spec])
+            self.sequence_train_step = tf.function(self.sequence_train_step, input_signature=[seq_spec, tf.TensorSpec(shape=(None, None), dtype=tf.int32), steps_spec, seq_spec, steps_spec, steps_spec, state_spec, state_spec])
 
     #-------------------------------------------------------------------------------------------
     # Properties
@@ -343,6 +559,22 @@ class DQN():
     def epsilon_min(self) -> float:
         return self._epsilon_min
 
+    @property
+    def tau(self) -> float:
+        #tau is the fraction of the online network weights mixed into the target network on each update
+        return self._tau
+
+    @tau.setter
+    def tau(self, val: float):
+        #ints are accepted as sweeps pass json numbers through (e.g. tau=1 for hard updates)
+        if not isinstance(val, numbers.Real) or isinstance(val, bool):
+            raise TypeError("tau (target network update rate) must be a real number")
+
+        if val <= 0 or val > 1:
+            raise ValueError("tau (target network update rate) must have a value between 0 (exclusive) and 1 (inclusive).")
+
+        self._tau = float(val)
+
     @property
     def mem_size(self) -> int:
         return self._mem_size
@@ -371,17 +603,54 @@ class DQN():
     def DRQN(self) -> bool:
         return self._DRQN
 
+    @property
+    def hidden_size(self) -> int:
+        return self._hidden_size
+
+    @property
+    def state(self) -> tuple:
+        #(h, c) LSTM state after the observations of the current episode (DRQN only)
+        return self._state
+
+    @property
+    def can_train(self) -> bool:
+        #whether enough experiences are held in replay memory to sample a training batch
+        if self.DRQN:
+            return self.replay.size >= self.replay.window_len
+
+        return np.size(self.action_mem) > self.batch_size
+
     #-------------------------------------------------------------------------------------------
     # Methods
     #-------------------------------------------------------------------------------------------
 
-    def save_model(self, path: str):
+    def save_model(self, path: str, step: int=0, writer: CheckpointWriter=None):
+        """
+            function to save the model (Q-network weights) as a weights only checkpoint
+
+            path is a string of the path to the checkpoint directory where the model will be saved
+
+            step is the training step (e.g. episode) the checkpoint is taken at
+
+            writer is a CheckpointWriter to write the checkpoint on a background thread, if None the checkpoint
+            is written before returning
+        """
+        save_checkpoint(path, self.get_checkpoint(), step=step, metadata={"algorithm": type(self).__name__}, writer=writer)
+
+    def get_checkpoint(self) -> dict:
+        """
+            function to get the arrays of the model to be saved in a checkpoint
+
+            returns a dict of the Q-network weights
         """
-            function to save the tensorflow model (neural net) to a file
+        return {"q_net": self.q_net.get_weights()}
 
-            path is a string of the path to the file where the model will be saved
+    def set_checkpoint(self, arrays: dict):
+        """
+            function to set the model from the arrays of a checkpoint (as returned by get_checkpoint)
         """
-        self.q_net.save(path)
+        self.q_net.set_weights(arrays["q_net"])
+        self.target_net.set_weights(arrays["q_net"])
 
     def get_action(self, obv: np.ndarray) -> int:
         """
@@ -391,20 +660,101 @@ class DQN():
 
             returns the action to take
         """
+        if self.DRQN:
+            #state is advanced every step, even when exploring, so it summarises the whole episode so far
+            prev_state = self.state
+            greedy_action, h, c = self.recurrent_act_step(np.array([obv], dtype=np.float32), *prev_state)
+            self._state = (h.numpy(), c.numpy())
+
         #take random action with probability epsilon (explore rate)
         if np.random.uniform(0, 1) < self.epsilon:
             action = np.random.choice(self.n_actions)
+        elif self.DRQN:
+            action = int(greedy_action[0])
         else:
-            #calculate Q-values using Q-network
-            values = self.q_net(np.expand_dims(obv, axis=(0, 1)), training=False)
             #policy is greedy
-            action = np.argmax(values)
+            action = int(self.act_step(np.array([obv], dtype=np.float32))[0])
 
-        self.obv_mem.append(obv)
-        self.action_mem.append(action)
+        if self.DRQN:
+            self._pending = (obv, action, prev_state)
+        else:
+            self.obv_mem.append(obv)
+            self.action_mem.append(action)
 
         return action
 
+    def get_batch_actions(self, obvs: np.ndarray) -> np.ndarray:
+        """
+            function to get the actions of a batch of observations (e.g. one per env of a VecEnv) using an epsilon-greedy 
+            policy with a single call of the Q-network (not DRQN)
+
+            obvs is an array of the current observations with shape [batch, n_obvs]
+
+            returns an int array of shape [batch] of the actions to take
+        """
+        if self.DRQN:
+            raise ValueError("DRQN keeps a single LSTM state so cannot get the actions of a batch of observations.")
+
+        #observations are copied as they are kept in replay memory
+        obvs = np.array(obvs, dtype=np.float32)
+        actions = self.act_step(obvs).numpy()
+
+        #take random action with probability epsilon (explore rate) independently for each observation
+        explore = np.random.uniform(0, 1, size=len(actions)) < self.epsilon
+        actions[explore] = np.random.randint(self.n_actions, size=np.count_nonzero(explore))
+
+        self.obv_mem.extend(obvs)
+        self.action_mem.extend(actions)
+
+        return actions
+
+    def remember_batch(self, rewards: np.ndarray, next_obvs: np.ndarray, dones: np.ndarray=None):
+        """
+            function to store the outcomes of the last batch of actions (from get_batch_actions) in replay memory
+
+            rewards is an array of the rewards provided by the environment with shape [batch]
+
+            next_obvs is an array of the observations after taking the actions with shape [batch, n_obvs]
+
+            dones is an array of whether each episode ended after taking the actions with shape [batch]
+        """
+        self.reward_mem.extend(np.asarray(rewards, dtype=np.float32))
+        self.next_obv_mem.extend(np.asarray(next_obvs, dtype=np.float32))
+
+        #ensure memories stay within mem size limit, a whole batch of experiences may be added each step
+        excess = len(self.action_mem) - self.mem_size
+        if excess > 0:
+            del self.action_mem[:excess]
+            del self.obv_mem[:excess]
+            del self.reward_mem[:excess]
+            del self.next_obv_mem[:excess]
+
+    def remember(self, reward: float, next_obv: np.ndarray, done: bool=False):
+        """
+            function to store the outcome of the last action (from get_action) in replay memory
+
+            reward is the reward provided by the environment after taking the last action
+
+            next_obv is the observation after taking the last action
+
+            done is whether the episode ended after taking the last action
+        """
+        if self.DRQN:
+            obv, action, state = self._pending
+            self.replay.add(obv, action, reward, next_obv, done, state)
+        else:
+            self.reward_mem.append(reward)
+            self.next_obv_mem.append(next_obv)
+
+    def reset_state(self):
+        """
+            function to reset the LSTM state at the start of an episode (DRQN only, has no effect otherwise)
+        """
+        if self.DRQN:
+            zeros = np.zeros((1, self.hidden_size), dtype=np.float32)
+            self._state = (zeros, zeros)
+            self.replay.end_episode()
+
     def update_parameters(self, n_t: int):
         """
             function to reduce value of epsilon such that it is epsilon max at n_t = 0 and epsilon min at n_t = n_max
@@ -415,39 +765,132 @@ class DQN():
         """
         self.epsilon *= self.decay ** (n_t + 1)
 
-    def train(self) -> tf.Tensor:
+    def act_step(self, obvs: tf.Tensor) -> tf.Tensor:
         """
-            function to train Q-network using experiences from replay memory
+            function to get the greedy action for a batch of observations, compiled into a graph on init
 
-            returns the loss of the training as a tensor
+            obvs is a float32 tensor of observations with shape [batch, n_obvs]
+
+            returns an int32 tensor of the action with the highest Q-value for each observation
         """
-        #recurrent network input has different array shape
-        axis = (0, 1) if self.DRQN else 2
+        values = self._q_values(self.q_net, obvs)
 
-        indices = np.random.choice(range(np.size(self.action_mem)), size=self.batch_size)
+        return tf.argmax(values, axis=1, output_type=tf.int32)
 
-        #samples of each piece of data from a random step in replay memory
-        obv_batch = np.array([self.obv_mem[i] for i in indices])
-        action_batch = np.array([self.action_mem[i] for i in indices], dtype=int)
-        reward_batch = np.array([self.reward_mem[i] for i in indices], dtype=np.float32)
-        next_obv_batch = np.array([self.next_obv_mem[i] for i in indices])
+    def recurrent_act_step(self, obvs: tf.Tensor, h: tf.Tensor, c: tf.Tensor) -> tuple:
+        """
+            function to advance the LSTM state by one time step and get the greedy action for a batch of observations, 
+            compiled into a graph on init (DRQN only)
+
+            obvs is a float32 tensor of observations with shape [batch, n_obvs]
+
+            h and c are float32 tensors of the LSTM state before the observations with shape [batch, hidden_size]
+
+            returns a tuple (actions, h, c) of the int32 greedy actions and the LSTM state after the observations
+        """
+        #a single step of the LSTM cell is applied so the cost is independent of the length of the episode
+        outputs, (h, c) = self._lstm.cell(obvs, [h, c], training=False)
+        values = self._q_head(outputs)
+
+        return tf.argmax(values, axis=1, output_type=tf.int32), h, c
+
+    def train_step(self, obv_batch: tf.Tensor, action_batch: tf.Tensor, reward_batch: tf.Tensor, next_obv_batch: tf.Tensor) -> tf.Tensor:
+        """
+            function to apply one gradient descent step to the Q-network, compiled into a graph on init
+
+            obv_batch is a float32 tensor of observations with shape [batch, n_obvs]
+
+            action_batch is an int32 tensor of the actions taken with shape [batch]
+
+            reward_batch is a float32 tensor of the rewards received with shape [batch]
 
-        targets = self.target_net(np.expand_dims(next_obv_batch, axis=0))
+            next_obv_batch is a float32 tensor of the next observations with shape [batch, n_obvs]
+
+            returns the loss of the step as a tensor
+        """
+        targets = self._q_values(self.target_net, next_obv_batch)
         #calculate expected reward for each sample
-        targets = reward_batch + self.gamma * np.max(targets, axis=axis)
+        targets = reward_batch + self.gamma * tf.reduce_max(targets, axis=1)
 
         #one hot encoding of actions to apply to Q-values
-        action_masks = np.eye(self.n_actions)[action_batch.reshape(-1)]
+        action_masks = tf.one_hot(action_batch, self.n_actions)
 
         with tf.GradientTape() as tape:
-            values = self.q_net(np.expand_dims(obv_batch, axis=0))
+            values = self._q_values(self.q_net, obv_batch, training=True)
             #calculate Q-values based on action taken for each step
-            values = tf.reduce_sum(values * action_masks, axis=axis)
+            values = tf.reduce_sum(values * action_masks, axis=1)
             loss = self.loss_fn(targets, values)
 
         grads = tape.gradient(loss, self.q_net.trainable_variables)
         self.opt.apply_gradients(zip(grads, self.q_net.trainable_variables))
 
+        return loss
+
+    def sequence_train_step(self, obv_seqs: tf.Tensor, action_seqs: tf.Tensor, reward_seqs: tf.Tensor, next_obv_seqs: tf.Tensor, done_seqs: tf.Tensor, mask: tf.Tensor, h: tf.Tensor, c: tf.Tensor) -> tf.Tensor:
+        """
+            function to apply one gradient descent step to the Q-network with back propagation through time over a batch 
+            of windows of consecutive experiences, compiled into a graph on init (DRQN only)
+
+            obv_seqs and next_obv_seqs are float32 tensors of the observations and next observations with shape 
+            [batch, time, n_obvs]
+
+            action_seqs is an int32 tensor of the actions taken with shape [batch, time]
+
+            reward_seqs, done_seqs and mask are float32 tensors with shape [batch, time] of the rewards received, 
+            whether the episode ended and whether each time step is trained on
+
+            h and c are float32 tensors of the stored LSTM state at the start of each window with shape [batch, hidden_size]
+
+            returns the loss of the step as a tensor
+        """
+        burn_in = self.replay.burn_in
+
+        #burn in warms up the stored state without gradients
+        if burn_in > 0:
+            _, h_start, c_start = self.q_net([obv_seqs[:, :burn_in], h, c], training=False)
+        else:
+            h_start, c_start = h, c
+
+        #target network state at each step must include the observation before the next observation
+        _, target_h, target_c = self.target_net([obv_seqs[:, :burn_in + 1], h, c], training=False)
+        targets, _, _ = self.target_net([next_obv_seqs[:, burn_in:], target_h, target_c], training=False)
+        targets = reward_seqs[:, burn_in:] + self.gamma * (1.0 - done_seqs[:, burn_in:]) * tf.reduce_max(targets, axis=2)
+
+        action_masks = tf.one_hot(action_seqs[:, burn_in:], self.n_actions)
+        mask = mask[:, burn_in:]
+
+        with tf.GradientTape() as tape:
+            values, _, _ = self.q_net([obv_seqs[:, burn_in:], h_start, c_start], training=True)
+            values = tf.reduce_sum(values * action_masks, axis=2)
+            #time steps after the end of the episode a window started in are not trained on
+            losses = tf.keras.losses.huber(tf.expand_dims(targets, axis=2), tf.expand_dims(values, axis=2))
+            loss = tf.reduce_sum(losses * mask) / tf.maximum(tf.reduce_sum(mask), 1.0)
+
+        grads = tape.gradient(loss, self.q_net.trainable_variables)
+        self.opt.apply_gradients(zip(grads, self.q_net.trainable_variables))
+
+        return loss
+
+    def train(self) -> tf.Tensor:
+        """
+            function to train Q-network using experiences from replay memory
+
+            returns the loss of the training as a tensor
+        """
+        if self.DRQN:
+            #batch of windows of consecutive experiences is trained on with back propagation through time
+            return self.sequence_train_step(*self.replay.sample(self.batch_size))
+
+        indices = np.random.choice(range(np.size(self.action_mem)), size=self.batch_size)
+
+        #samples of each piece of data from a random step in replay memory
+        obv_batch = np.array([self.obv_mem[i] for i in indices], dtype=np.float32)
+        action_batch = np.array([self.action_mem[i] for i in indices], dtype=np.int32)
+        reward_batch = np.array([self.reward_mem[i] for i in indices], dtype=np.float32)
+        next_obv_batch = np.array([self.next_obv_mem[i] for i in indices], dtype=np.float32)
+
+        loss = self.train_step(obv_batch, action_batch, reward_batch, next_obv_batch)
+
         #ensure memories stay within mem size limit
         if np.size(self.action_mem) > self.mem_size:
             self.action_mem.pop(0)
@@ -457,11 +900,140 @@ class DQN():
             
         return loss
 
-    def update_target_net(self):
+    def _q_values(self, net: tf.keras.Model, obvs: tf.Tensor, training: bool=False) -> tf.Tensor:
+        """
+            function to get the Q-values of a batch of observations from the Q-network or target network
+
+            each observation is fed to the network as a sequence of length 1 (from a zero LSTM state for DRQN)
+
+            returns a tensor of Q-values with shape [batch, n_actions]
+        """
+        obvs = tf.expand_dims(obvs, axis=1)
+
+        if self.DRQN:
+            zeros = tf.zeros((tf.shape(obvs)[0], self.hidden_size))
+            return net([obvs, zeros, zeros], training=training)[0][:, 0]
+
+        return tf.reshape(net(obvs, training=training), (-1, self.n_actions))
+
+    def target_update_step(self, tau: tf.Tensor):
+        """
+            function to move the target network variables towards the Q-network variables in place
+            (target = tau * online + (1 - tau) * target), compiled so no weights are copied to the host
+
+            tau is a scalar tensor of the fraction of the Q-network weights mixed into the target network
+        """
+        for target_var, var in zip(self.target_net.variables, self.q_net.variables):
+            target_var.assign(tau * var + (1.0 - tau) * target_var)
+
+    def update_target_net(self, tau: float=None):
         """
             function to update the weights of the target network
+
+            tau is the fraction of the Q-network weights mixed into the target network, if None the tau property is used
         """
-        self.target_net.set_weights(self.q_net.get_weights())
+        self.target_update_step(tf.constant(self.tau if tau is None else tau, dtype=tf.float32))
+
+    def warm_up(self):
+        """
+            function to run every compiled step once on zeros and then restore the weights and reset the optimizer, so
+            the graphs are traced and instantiated and the optimizer slots created before the agent first acts or
+            trains, without changing what it learns
+        """
+        weights = self.q_net.get_weights()
+        target_weights = self.target_net.get_weights()
+
+        n_obvs = int(self.q_net.inputs[0].shape[-1])
+        obvs = np.zeros((1, n_obvs), dtype=np.float32)
+        self.act_step(obvs)
+        self.target_update_step(tf.constant(0.0, dtype=tf.float32))
+
+        if self.DRQN:
+            state = np.zeros((1, self.hidden_size), dtype=np.float32)
+            seqs = np.zeros((1, self.replay.window_len, n_obvs), dtype=np.float32)
+            steps = np.ones((1, self.replay.window_len), dtype=np.float32)
+            self.recurrent_act_step(obvs, state, state)
+            self.sequence_train_step(seqs, steps.astype(np.int32), steps, seqs, steps, steps, state, state)
+        else:
+            self.train_step(obvs, np.zeros(1, dtype=np.int32), np.zeros(1, dtype=np.float32), obvs)
+
+        self.q_net.set_weights(weights)
+        self.target_net.set_weights(target_weights)
+
+        #optimizer slots and step count are kept but zeroed, so the learning rate schedule starts again, variables is
+        #a method of the legacy keras optimizers and a property of keras 3 ones
+        variables = self.opt.variables() if callable(self.opt.variables) else self.opt.variables
+        for var in variables:
+            var.assign(tf.zeros_like(var))
+
+class DQNAgentGroup():
+    """
+        Class of the group of independent DQN agents trained by one worker of a ParallelAgents
+    """
+    def __init__(self, start: int, stop: int, n_obvs: int, n_actions: int, n_threads: int=None, **kwargs):
+        """
+            function to initialise the class
 
+            start and stop are the range of indexes of the agents of the group
 
+            n_threads is the number of threads tensorflow uses for each op, if None the tensorflow default (one per
+            core) is used, it must be set before tensorflow runs any op in the process
 
+            the remaining arguments are as for DQN
+        """
+        if n_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(n_threads)
+
+        self.agents = [DQN(n_obvs, n_actions, **kwargs) for i in range(stop - start)]
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def reset(self, obvs: np.ndarray) -> np.ndarray:
+        """
+            function to start an episode
+
+            obvs is an array of the initial observation of each agent of the group
+
+            returns an int array of the first action of each agent of the group
+        """
+        for agent in self.agents:
+            agent.reset_state()
+
+        #observations are copied as they are kept in replay memory
+        return np.array([agent.get_action(obv) for agent, obv in zip(self.agents, np.array(obvs))])
+
+    def step(self, t: int, rewards: np.ndarray, next_obvs: np.ndarray, done: bool, end: bool) -> tuple:
+        """
+            function to store the last transition of every agent of the group, train every agent every 4 time steps
+            and get its next action
+
+            returns a tuple (actions, losses) of an int array of the next action of each agent (None if end) and an
+            array of the loss of each agent (None if not trained)
+        """
+        next_obvs = np.array(next_obvs)
+
+        for agent, reward, next_obv in zip(self.agents, rewards, next_obvs):
+            agent.remember(float(reward), next_obv, done)
+
+        if end:
+            return None, None
+
+        losses = None
+        if self.agents[0].can_train and t % 4 == 0:
+            losses = np.array([float(agent.train()) for agent in self.agents])
+
+            for agent in self.agents:
+                if t % 20 == 0 or agent.tau < 1.0:
+                    agent.update_target_net()
+
+        return np.array([agent.get_action(obv) for agent, obv in zip(self.agents, next_obvs)]), losses
+
+    def update_parameters(self, e: int):
+        """
+            function to update the exploration rate of every agent of the group at the end of episode e
+        """
+        for agent in self.agents:
+            agent.update_parameters(e)
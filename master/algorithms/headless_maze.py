@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os
+import numpy as np
+
+from types import SimpleNamespace
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class HeadlessMaze():
+    """
+        Class of a maze env simulated with numpy only (no pygame), for training without rendering
+
+        mazes are loaded from the same files as gym-maze (a .npy array of the wall bitmask of each cell, indexed [x, y],
+        where the bits N=1, E=2, S=4 and W=8 are set if the wall on that side of the cell is open). Whether each
+        direction is open from each cell and where each portal teleports to are precomputed on init, so a step of
+        every robot is a few array lookups
+
+        the env follows the contract of the multi-agent gym-maze env: robots start at the entrance (0, 0), the episode
+        is done once any robot reaches the goal (the opposite corner), each robot receives a reward of 1 at the goal,
+        -1/(cells) for hitting a wall and -0.1/(cells) otherwise. Observations are the [x, y] cell of each robot
+
+        the env has the attributes of a gym env used by the runners (action_space, observation_space, spec and
+        unwrapped) but gym is only imported when the spaces are first used, so the env can be stepped without gym
+    """
+    ACTION = ["N", "S", "E", "W"]
+    #change in [x, y] of a move in each direction of ACTION
+    MOVES = np.array([[0, -1], [0, 1], [1, 0], [-1, 0]], dtype=np.int64)
+    #wall bitmask of each direction of ACTION
+    WALL_BITS = np.array([0x1, 0x4, 0x2, 0x8], dtype=np.int64)
+    #index in ACTION of the opposite of each direction of ACTION
+    OPPOSITE = np.array([1, 0, 3, 2])
+
+    def __init__(self, load_maze_path: str=None, maze_cells: np.ndarray=None, n_agents: int=1, portals: list=None, is_render: bool=False):
+        """
+            function to initialise the class
+
+            load_maze_path is the path to a maze file saved by gym-maze (the .npy extension may be omitted)
+
+            maze_cells is an int array of the wall bitmask of each cell with shape [width, height], used instead of
+            load_maze_path
+
+            n_agents is the number of robots in the maze
+
+            portals is a list of pairs of [x, y] cells, a robot moving into one cell of a pair is moved to the other
+
+            is_render must be False, it is included so the arguments match the rendered maze envs
+        """
+        if is_render:
+            raise ValueError("HeadlessMaze cannot be rendered, use the gym-maze env to render the maze.")
+
+        if n_agents < 1:
+            raise ValueError("Cannot have less than 1 agent.")
+
+        if maze_cells is None:
+            if load_maze_path is None:
+                raise ValueError("One of load_maze_path or maze_cells must be provided.")
+
+            maze_cells = self.load_maze(load_maze_path)
+
+        maze_cells = np.asarray(maze_cells, dtype=np.int64)
+
+        if maze_cells.ndim != 2:
+            raise ValueError("maze_cells must have shape [width, height].")
+
+        self._maze_size = maze_cells.shape
+        self._n_agents = n_agents
+        self._goal = np.array(self.maze_size, dtype=np.int64) - 1
+
+        #a direction is open if the wall is open on either side and the neighbouring cell is inside the maze
+        x, y = np.meshgrid(np.arange(self.maze_size[0]), np.arange(self.maze_size[1]), indexing="ij")
+        next_x = x[:, :, None] + self.MOVES[:, 0]
+        next_y = y[:, :, None] + self.MOVES[:, 1]
+        inside = (next_x >= 0) & (next_x < self.maze_size[0]) & (next_y >= 0) & (next_y < self.maze_size[1])
+        neighbours = maze_cells[np.clip(next_x, 0, self.maze_size[0] - 1), np.clip(next_y, 0, self.maze_size[1] - 1)]
+        self._walls = inside & (((maze_cells[:, :, None] & self.WALL_BITS) != 0) | ((neighbours & self.WALL_BITS[self.OPPOSITE]) != 0))
+
+        #cell each cell teleports to, every cell maps onto itself apart from portals
+        self._portals = np.stack([x, y], axis=2)
+        for cells in portals or []:
+            (x0, y0), (x1, y1) = cells
+            self._portals[x0, y0] = (x1, y1)
+            self._portals[x1, y1] = (x0, y0)
+
+        #bounds of the observation of each robot
+        self._obv_low = np.zeros(2, dtype=np.int64)
+        self._obv_high = self.goal
+        self._action_space = None
+        self._observation_space = None
+        #runners check the id of the env spec
+        self.spec = SimpleNamespace(id="HeadlessMaze-v0")
+
+        self._robots = np.zeros((self.n_agents, 2), dtype=np.int64)
+        #penalty of a step of each robot which moved and did not move (hit a wall)
+        self._rewards = np.array([-1.0, -0.1]) / (self.maze_size[0] * self.maze_size[1])
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def maze_size(self) -> tuple:
+        return self._maze_size
+
+    @property
+    def n_agents(self) -> int:
+        return self._n_agents
+
+    @property
+    def goal(self) -> np.ndarray:
+        return self._goal
+
+    @property
+    def walls(self) -> np.ndarray:
+        #bool array with shape [width, height, 4] which is True where each direction of ACTION is open from each cell
+        return self._walls
+
+    @property
+    def robots(self) -> np.ndarray:
+        return self._robots
+
+    @property
+    def action_space(self):
+        if self._action_space is None:
+            from gym import spaces
+            self._action_space = spaces.Discrete(len(self.ACTION))
+
+        return self._action_space
+
+    @property
+    def observation_space(self):
+        if self._observation_space is None:
+            from gym import spaces
+            self._observation_space = spaces.Box(self._obv_low, self._obv_high, dtype=np.int64)
+
+        return self._observation_space
+
+    @property
+    def unwrapped(self):
+        #env is not wrapped, included as runners check the spec of the unwrapped env
+        return self
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def load_maze(path: str) -> np.ndarray:
+        """
+            function to load the wall bitmask of each cell of a maze saved by gym-maze
+
+            path is the path to the maze file, with or without the .npy extension
+
+            returns an int array of shape [width, height]
+        """
+        if not os.path.isfile(path) and os.path.isfile(path + ".npy"):
+            path += ".npy"
+
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f'Cannot find maze file {path}.')
+
+        return np.load(path, allow_pickle=False)
+
+    def reset(self) -> np.ndarray:
+        """
+            function to move every robot back to the entrance
+
+            returns the observation, with shape [2] for a single robot or [n_agents, 2] for multiple robots
+        """
+        self._robots = np.zeros((self.n_agents, 2), dtype=np.int64)
+
+        return self._obv()
+
+    def step(self, actions) -> tuple:
+        """
+            function to move every robot one cell
+
+            actions is the action of each robot as an index of ACTION or a direction in ACTION, a single action for a
+            single robot or an array of shape [n_agents] for multiple robots
+
+            returns a tuple (obv, reward, done, info), where obv has shape [2] and reward is a float for a single robot
+            or obv has shape [n_agents, 2] and reward has shape [n_agents] for multiple robots
+        """
+        actions = self._actions(actions)
+        moved = self.walls[self.robots[:, 0], self.robots[:, 1], actions]
+
+        return self._move(actions, moved, ~moved)
+
+    def render(self, mode: str="human"):
+        """
+            function to render the maze, nothing is rendered as the env is headless
+        """
+        pass
+
+    def close(self):
+        """
+            function to close the env, there is nothing to close as the env is headless
+        """
+        pass
+
+    def _actions(self, actions) -> np.ndarray:
+        """
+            function to convert the actions passed to step to an int array of shape [n_agents] of indices of ACTION
+        """
+        actions = np.reshape(actions, self.n_agents)
+        if actions.dtype.kind in "US":
+            actions = np.array([self.ACTION.index(action) for action in actions])
+
+        return actions
+
+    def _move(self, directions: np.ndarray, moved: np.ndarray, hit: np.ndarray) -> tuple:
+        """
+            function to move the robots and get the result of the step
+
+            directions is an int array of shape [n_agents] of the direction (index of HeadlessMaze.ACTION) of each robot
+
+            moved is a bool array of shape [n_agents] which is True where the robot moves a cell in its direction
+
+            hit is a bool array of shape [n_agents] which is True where the robot hit a wall
+
+            returns a tuple (obv, reward, done, info) as returned by step
+        """
+        robots = self.robots + self.MOVES[directions] * moved[:, None]
+        #only robots which moved into a portal are teleported (not robots left on a portal cell by a teleport)
+        robots = np.where(moved[:, None], self._portals[robots[:, 0], robots[:, 1]], robots)
+
+        at_goal = np.all(robots == self.goal, axis=1)
+        rewards = np.where(at_goal, 1.0, self._rewards[(~hit).astype(np.int64)])
+
+        self._robots = robots
+
+        if self.n_agents == 1:
+            return self._obv(), float(rewards[0]), bool(at_goal[0]), {}
+
+        return self._obv(), rewards, bool(np.any(at_goal)), {}
+
+    def _obv(self) -> np.ndarray:
+        """
+            function to get the observation of the robots, the robots array is replaced rather than changed in place 
+            by every step so it is not copied
+
+            returns the observation, with shape [2] for a single robot or [n_agents, 2] for multiple robots
+        """
+        return self.robots[0] if self.n_agents == 1 else self.robots
+
+class HeadlessRobotMaze(HeadlessMaze):
+    """
+        Class of a robot maze env simulated with numpy only (no pygame), used in place of gym_robot_maze RobotMaze-v1
+        to simulate the robots of the master without rendering
+
+        mazes, rewards and the done rule are those of HeadlessMaze, but robots face a direction and act as the real 
+        robots (c_agent) do: move forward one cell, turn right, turn around or turn left. Robots start at the entrance
+        facing south (into the maze) and hit a wall if they move forward into one. Observations are the [x, y] cell and
+        direction (index of DIRECTIONS) of each robot
+
+        the env has the observation and action sizes of RobotMaze-v1 (n_obvs=3, n_actions=4) but has not been checked
+        against it, the actions are those of c_agent while the start direction, the rewards (of gym-maze) and the
+        done rule may differ from RobotMaze-v1, so agents trained on one should not be expected to score the same on
+        the other
+    """
+    ACTION = ["F", "R", "B", "L"]
+    #directions a robot can face, clockwise so an action turns the robot by its index in ACTION
+    DIRECTIONS = ["N", "E", "S", "W"]
+    #index in HeadlessMaze.ACTION of the move of each direction of DIRECTIONS
+    DIRECTION_MOVES = np.array([0, 2, 1, 3])
+
+    def __init__(self, load_maze_path: str=None, maze_cells: np.ndarray=None, n_agents: int=1, portals: list=None, is_render: bool=False):
+        """
+            function to initialise the class, arguments are those of HeadlessMaze
+        """
+        super(HeadlessRobotMaze, self).__init__(load_maze_path=load_maze_path, maze_cells=maze_cells, n_agents=n_agents, portals=portals, is_render=is_render)
+
+        self._obv_low = np.zeros(3, dtype=np.int64)
+        self._obv_high = np.append(self.goal, len(self.DIRECTIONS) - 1)
+        self.spec = SimpleNamespace(id="HeadlessRobotMaze-v0")
+
+        self._headings = np.full(self.n_agents, self.DIRECTIONS.index("S"), dtype=np.int64)
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def headings(self) -> np.ndarray:
+        #direction (index of DIRECTIONS) each robot is facing
+        return self._headings
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def reset(self) -> np.ndarray:
+        """
+            function to move every robot back to the entrance facing south
+
+            returns the observation, with shape [3] for a single robot or [n_agents, 3] for multiple robots
+        """
+        self._headings = np.full(self.n_agents, self.DIRECTIONS.index("S"), dtype=np.int64)
+
+        return super(HeadlessRobotMaze, self).reset()
+
+    def step(self, actions) -> tuple:
+        """
+            function to turn or move forward every robot
+
+            actions is the action of each robot as an index of ACTION or an action in ACTION, a single action for a
+            single robot or an array of shape [n_agents] for multiple robots
+
+            returns a tuple (obv, reward, done, info), where obv has shape [3] and reward is a float for a single robot
+            or obv has shape [n_agents, 3] and reward has shape [n_agents] for multiple robots
+        """
+        actions = self._actions(actions)
+
+        self._headings = (self.headings + actions) % len(self.DIRECTIONS)
+        directions = self.DIRECTION_MOVES[self.headings]
+
+        #only robots moving forward can move or hit a wall
+        forward = actions == 0
+        open_ = self.walls[self.robots[:, 0], self.robots[:, 1], directions]
+
+        return self._move(directions, forward & open_, forward & ~open_)
+
+    def _obv(self) -> np.ndarray:
+        """
+            function to get the observation of the robots, their cell and direction
+
+            returns the observation, with shape [3] for a single robot or [n_agents, 3] for multiple robots
+        """
+        obvs = np.concatenate((self.robots, self.headings[:, None]), axis=1)
+
+        return obvs[0] if self.n_agents == 1 else obvs
@@ -10,12 +10,15 @@ import logging
 import time
 
 from algorithms.rl_algorithm import RLAlgorithm
+from algorithms.checkpoint import CheckpointWriter, is_checkpoint, load_checkpoint, save_checkpoint
+from algorithms.returns import discounted_returns
+from algorithms.trajectory import TrajectoryRecorder
 
 #-----------------------------------------------------------------------------------------------    
 # Functions
 #-----------------------------------------------------------------------------------------------
 
-def run_gym_ma_actor_critic_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, decay: float=0.9, lr: float=0.0001, lr_decay_steps: int=10000, saved_path: str=None):
+def run_gym_ma_actor_critic_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, decay: float=0.9, lr: float=0.0001, lr_decay_steps: int=10000, saved_path: str=None, recorder: TrajectoryRecorder=None):
     """
         function to run multi-agent actor critic algorithm on a gym env
 
@@ -29,6 +32,9 @@ def run_gym_ma_actor_critic_multi_agent(env, n_agents: int=1, render: bool=False
 
         time steps is the maximum number of time steps per episode
 
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
     """
     if n_agents < 1:
@@ -94,8 +100,11 @@ def run_gym_ma_actor_critic_multi_agent(env, n_agents: int=1, render: bool=False
             for i in range(1, n_agents - 1):
                 agents[0].receive_comm(agents[i].send_comm())
 
-            ep_obvs.append(actions)
-            ep_actions.append(obvs)
+            if recorder is None:
+                ep_obvs.append(obvs)
+                ep_actions.append(actions)
+            else:
+                recorder.record(e, t, obvs, actions, rewards, done)
 
             obvs = next_obvs
             total_rewards += rewards
@@ -210,10 +219,23 @@ class MAActorCritic(RLAlgorithm):
 
         #load a saved model (neural net) if provided
         if saved_path:
-            self.actor_net = tf.keras.models.load_model(f'{saved_path}/actor')
+            if is_checkpoint(saved_path):
+                self.set_checkpoint(load_checkpoint(saved_path)[0])
+            else:
+                self.actor_net = tf.keras.models.load_model(f'{saved_path}/actor')
+
+                if self.master:
+                    self.critic_net = tf.keras.models.load_model(f'{saved_path}/critic')
 
-            if self.master:
-                self.critic_net = tf.keras.models.load_model(f'{saved_path}/critic')
+        #compile act and train steps into graphs with fixed input signatures so they are traced 
+        #once instead of being dispatched eagerly on every call
+        obv_spec = tf.TensorSpec(shape=(None, int(n_obvs)), dtype=tf.float32)
+        vals_spec = tf.TensorSpec(shape=(None,), dtype=tf.float32)
+        self.act_step = tf.function(self.act_step, input_signature=[obv_spec])
+        self.train_step = tf.function(self.train_step, input_signature=[obv_spec, tf.TensorSpec(shape=(None,), dtype=tf.int32), vals_spec, vals_spec])
+
+        if self.master:
+            self.critic_step = tf.function(self.critic_step, input_signature=[obv_spec, vals_spec])
 
     #-------------------------------------------------------------------------------------------
     # Properties
@@ -251,16 +273,41 @@ class MAActorCritic(RLAlgorithm):
     # Methods
     #-------------------------------------------------------------------------------------------
 
-    def save_model(self, path: str):
+    def save_model(self, path: str, step: int=0, writer: CheckpointWriter=None):
+        """
+            function to save the model (actor and, for the master, critic network weights) as a weights only checkpoint
+
+            path is a string of the path to the checkpoint directory where the model will be saved
+
+            step is the training step (e.g. episode) the checkpoint is taken at
+
+            writer is a CheckpointWriter to write the checkpoint on a background thread, if None the checkpoint
+            is written before returning
+        """
+        save_checkpoint(path, self.get_checkpoint(), step=step, metadata={"algorithm": type(self).__name__}, writer=writer)
+
+    def get_checkpoint(self) -> dict:
         """
-            function to save the tensorflow model (neural net) to a file
+            function to get the arrays of the model to be saved in a checkpoint
 
-            path is a string of the path to the file where the model will be saved
+            returns a dict of the actor network weights and, for the master, the critic network weights
         """
-        self.actor_net.save(f'{path}/actor')
+        arrays = {"actor_net": self.actor_net.get_weights()}
 
+        #only master contains the global critic net
         if self.master:
-            self.critic_net.save(f'{path}/critic')
+            arrays["critic_net"] = self.critic_net.get_weights()
+
+        return arrays
+
+    def set_checkpoint(self, arrays: dict):
+        """
+            function to set the model from the arrays of a checkpoint (as returned by get_checkpoint)
+        """
+        self.actor_net.set_weights(arrays["actor_net"])
+
+        if self.master and "critic_net" in arrays:
+            self.critic_net.set_weights(arrays["critic_net"])
 
     def get_action(self, obv: np.ndarray) -> int:
         """
@@ -271,8 +318,7 @@ class MAActorCritic(RLAlgorithm):
 
             returns the action to take
         """
-        action_probs = self.actor_net(np.expand_dims(obv, axis=0))
-        action = np.random.choice(self.n_actions, p=action_probs.numpy()[0])
+        action = int(self.act_step(np.array([obv], dtype=np.float32))[0])
 
         if self.master:
             self.action_mem.append([action])
@@ -281,78 +327,99 @@ class MAActorCritic(RLAlgorithm):
 
         return action
 
+    def act_step(self, obvs: tf.Tensor) -> tf.Tensor:
+        """
+            function to sample an action from the actor for a batch of observations, compiled into a graph on init
+
+            obvs is a float32 tensor of observations with shape [batch, n_obvs]
+
+            returns an int32 tensor of the sampled action for each observation
+        """
+        action_probs = self.actor_net(obvs)
+
+        return tf.random.categorical(tf.math.log(action_probs), 1, dtype=tf.int32)[:, 0]
+
+    def critic_step(self, obv_batch: tf.Tensor, returns: tf.Tensor) -> tuple:
+        """
+            function to apply one gradient descent step to the global critic network, compiled into a graph on init
+            (master only)
+
+            obv_batch is a float32 tensor of the episode observations with shape [time, n_obvs]
+
+            returns is a float32 tensor of the discounted returns with shape [time]
+
+            returns a tuple (values, loss) where values is a float32 tensor of the critic values with shape [time]
+        """
+        with tf.GradientTape() as tape:
+            values = tf.squeeze(self.critic_net(obv_batch), axis=1)
+            critic_loss = self.loss_fn(values, returns)
+
+        c_grads = tape.gradient(critic_loss, self.critic_net.trainable_variables)
+        self.c_opt.apply_gradients(zip(c_grads, self.critic_net.trainable_variables))
+
+        return values, critic_loss
+
+    def train_step(self, obv_batch: tf.Tensor, action_batch: tf.Tensor, returns: tf.Tensor, values: tf.Tensor) -> tf.Tensor:
+        """
+            function to apply one gradient descent step to the actor network, compiled into a graph on init
+
+            obv_batch is a float32 tensor of the episode observations with shape [time, n_obvs]
+
+            action_batch is an int32 tensor of the episode actions with shape [time]
+
+            returns is a float32 tensor of the normalised discounted returns with shape [time]
+
+            values is a float32 tensor of the global critic values with shape [time]
+
+            returns the actor loss as a tensor
+        """
+        with tf.GradientTape() as tape:
+            action_probs = self.actor_net(obv_batch)
+            #log probability of the action taken at each step
+            action_log_probs = tf.math.log(tf.gather(action_probs, action_batch, batch_dims=1))
+            advantages = returns - values
+            #sum losses across episode
+            actor_loss = tf.reduce_sum(-action_log_probs * advantages)
+
+        a_grads = tape.gradient(actor_loss, self.actor_net.trainable_variables)
+        self.a_opt.apply_gradients(zip(a_grads, self.actor_net.trainable_variables))
+
+        return actor_loss
+
     def train(self):
         """
             function to train Actor-Critic network using previous episode data from replay memory
 
             returns the loss of the training as a tensor
         """
-        returns = []
-        discounted_sum = 0
-
         #master agent has a different replay memory structure as it must hold data for all agents not only itself
         if self.master:
             #samples of each piece of data of this agent
-            obv_batch = np.array([self.obv_mem[i][0] for i in range(np.shape(self.obv_mem)[0])])
-            action_batch = np.array([self.action_mem[i][0] for i in range(np.shape(self.action_mem)[0])])
+            obv_batch = np.array([self.obv_mem[i][0] for i in range(np.shape(self.obv_mem)[0])], dtype=np.float32)
+            action_batch = np.array([self.action_mem[i][0] for i in range(np.shape(self.action_mem)[0])], dtype=np.int32)
 
-            #samples of obvs and actions of all agents flattened for input to critic array
-            all_obv_batches = np.array([np.concatenate(self.obv_mem[i], axis=0) for i in range(np.shape(self.obv_mem)[0])])
-            all_action_batches = np.array([self.action_mem[i] for i in range(np.shape(self.action_mem)[0])])
+            #calculate the discounted sum of the master's own rewards (first of each time step), the other agents
+            #calculate the returns of their own rewards when they train
+            returns = discounted_returns(np.array([reward[0] for reward in self.reward_mem], dtype=np.float64), self.gamma)
 
-            c_returns = []
-            avg_discounted_sum = 0
-
-            #calculate the discounted sum of rewards
-            for reward in self.reward_mem[::-1]:
-                avg_reward = np.average(reward)
-                avg_discounted_sum = avg_reward + self.gamma * avg_discounted_sum
-                discounted_sum = reward[0] + self.gamma * discounted_sum
-                #iterated inversly therefore insert at beginning of array
-                c_returns.insert(0, avg_discounted_sum)
-                returns.insert(0, discounted_sum)
-
-            #normalise returns
-            c_returns = (returns - np.mean(returns)) / (np.std(returns) + self.eps)
-            
             #backpropagation for critic network
             #only the master agent need calculate the update for the critic net as all updates would be the same
-            with tf.GradientTape() as tape:
-                self.values = self.critic_net(all_obv_batches, all_action_batches)
-                critic_loss = self.loss_fn(self.values, returns)
-
-            c_grads = tape.gradient(critic_loss, self.critic_net.trainable_variables)
-            self.c_opt.apply_gradients(zip(c_grads, self.critic_net.trainable_variables))
+            self.values, critic_loss = self.critic_step(obv_batch, returns.astype(np.float32))
 
         else:
             #samples of each piece of data of this agent
-            obv_batch = np.array([self.obv_mem[i] for i in range(np.shape(self.obv_mem)[0])])
-            action_batch = np.array([self.action_mem[i] for i in range(np.shape(self.action_mem)[0])])
+            obv_batch = np.array([self.obv_mem[i] for i in range(np.shape(self.obv_mem)[0])], dtype=np.float32)
+            action_batch = np.array([self.action_mem[i] for i in range(np.shape(self.action_mem)[0])], dtype=np.int32)
 
             #calculate the discounted sum of rewards
-            for reward in self.reward_mem[::-1]:
-                discounted_sum = reward + self.gamma * discounted_sum
-                #iterated inversly therefore insert at beginning of array
-                returns.insert(0, discounted_sum)
+            returns = discounted_returns(self.reward_mem, self.gamma)
 
         #normalise returns
         returns = (returns - np.mean(returns)) / (np.std(returns) + self.eps)
 
         #backpropagation for actor network
-        with tf.GradientTape() as tape:
-            #actor networks should be updated using the updated critic net
-            action_probs = self.actor_net(obv_batch)
-
-            actor_loss = 0
-            for i in range(np.shape(action_probs)[0]):
-                #log probability of the action taken
-                action_log_prob = tf.math.log(action_probs[i, action_batch[i]])
-                advantage = returns[i] - self.values[i]
-                #sum losses for both actor and critic across episode
-                actor_loss += -action_log_prob * advantage
-
-        a_grads = tape.gradient(actor_loss, self.actor_net.trainable_variables)
-        self.a_opt.apply_gradients(zip(a_grads, self.actor_net.trainable_variables))
+        #actor networks should be updated using the updated critic net
+        actor_loss = self.train_step(obv_batch, action_batch, returns.astype(np.float32), self.values)
 
         #replay memory only stores a single episode 
         self.obv_mem.clear()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os, sys
+import logging
+import time
+import numpy as np
+import cloudpickle
+
+from algorithms.workers import WorkerPool, run_worker, attach_arrays
+from algorithms.trajectory import TrajectoryRecorder
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def run_parallel_agents(env, agents, render: bool=False, episodes: int=100, time_steps: int=10000, recorder: TrajectoryRecorder=None):
+    """
+        function to run independent agents on a gym env, with the agents trained by the worker processes of a
+        ParallelAgents so the env loop only steps the env
+
+        env is the gym env object
+
+        agents is the ParallelAgents object
+
+        render determines whether to render the env
+
+        episodes is the number of episodes to simulate
+
+        time steps is the maximum number of time steps per episode
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
+        returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
+    """
+    #init arrays to collect data
+    all_times = []
+    all_obvs = []
+    all_actions = []
+    all_rewards = []
+    all_losses = []
+
+    #robot-maze env can save the path taken by the agents each episode
+    robot_paths = []
+
+    #render env if enabled
+    if render:
+        env.render()
+
+    for e in range(episodes):
+        obvs = env.reset()
+        #actions are copied out of shared memory as they are overwritten by the next step
+        actions = np.copy(agents.reset(obvs))
+
+        start_time = time.time()
+        ep_obvs = []
+        ep_actions = []
+        ep_losses = []
+        total_rewards = np.zeros(agents.n_agents)
+
+        for t in range(time_steps):
+            if render:
+                env.render()
+
+            next_obvs, rewards, done, info = env.step(actions)
+            end = done or t >= (time_steps - 1)
+
+            if recorder is None:
+                ep_obvs.append(np.copy(obvs))
+                ep_actions.append(actions)
+            else:
+                recorder.record(e, t, obvs, actions, rewards, done)
+
+            #workers train on the transition and choose the next actions while the env waits
+            next_actions, losses = agents.step(t, rewards, next_obvs, done, end)
+
+            if losses is not None:
+                ep_losses.append(np.copy(losses))
+
+            obvs = next_obvs
+            actions = np.copy(next_actions)
+            total_rewards += rewards
+
+            if end:
+                if done:
+                    logging.info("Episode %u completed, after %u time steps, with total reward = %s", e, t, str(total_rewards))
+                else:
+                    logging.info("Episode %u timed out, with total reward = %s", e, str(total_rewards))
+
+                ep_time = round((time.time() - start_time), 3)
+                all_times.append(ep_time)
+                all_obvs.append(ep_obvs)
+                all_actions.append(ep_actions)
+                all_rewards.append(total_rewards)
+
+                if ep_losses:
+                    all_losses.append(ep_losses)
+
+                if "robot_path" in info:
+                    robot_paths.append(info["robot_path"])
+
+                break
+
+            if env.unwrapped.spec.id[0:5] == "maze-" and env.is_game_over():
+                sys.exit(0)
+
+        agents.update_parameters(e)
+
+    return all_obvs, all_actions, all_rewards, all_losses, robot_paths, all_times
+
+def _worker(remote, group_fn: bytes, start: int, stop: int, shm_name: str, layout: dict):
+    """
+        function run by each worker process of a ParallelAgents, creates the group of agents from start to stop and
+        steps them on commands received from remote, reading transitions from and writing actions and losses to the
+        shared memory block
+
+        remote is the worker end of the pipe to the ParallelAgents
+
+        group_fn is the function which creates the group of agents, pickled with cloudpickle
+
+        shm_name and layout are the name and layout of the shared memory block
+    """
+    def serve(stack):
+        arrays = attach_arrays(stack, shm_name, layout, start, stop)
+        group = cloudpickle.loads(group_fn)(start, stop)
+
+        remote.send(None)
+
+        while True:
+            cmd, data = remote.recv()
+
+            if cmd == "reset":
+                arrays["actions"][:] = group.reset(arrays["obvs"])
+                remote.send(None)
+            elif cmd == "step":
+                t, done, end = data
+                actions, losses = group.step(t, arrays["rewards"], arrays["obvs"], done, end)
+
+                if actions is not None:
+                    arrays["actions"][:] = actions
+
+                arrays["losses"][:] = np.nan if losses is None else losses
+                remote.send(losses is not None)
+            elif cmd == "update_parameters":
+                group.update_parameters(data)
+                remote.send(None)
+            elif cmd == "close":
+                break
+
+    #every group explores independently
+    run_worker(remote, f'Worker of agents {start} to {stop - 1}', serve, reseed=True)
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class ParallelAgents(WorkerPool):
+    """
+        Class to train independent agents in worker processes, with the agents split into groups (one per worker) so
+        the learning of independent agents is spread over every core rather than run serially alongside the env
+
+        observations, rewards, actions and losses of every agent are exchanged through a single shared memory block,
+        so each time step only a short command is sent to each worker. A group of agents is any object with the
+        methods:
+            reset(obvs) -> actions, called at the start of each episode
+            step(t, rewards, next_obvs, done, end) -> (actions, losses), called after each time step t to store and
+                train on the transition, returning the next actions (None if end) and the loss of each agent (None
+                if not trained)
+            update_parameters(e), called at the end of each episode e
+        where obvs, rewards, actions and losses have a leading [n_agents] dimension of the agents of the group. Arrays
+        passed to the group are views of shared memory which are overwritten by the next step
+    """
+    def __init__(self, group_fn, n_agents: int, observation_space, n_workers: int=None, start_method: str=None):
+        """
+            function to initialise the class
+
+            group_fn is a function which returns a group of agents given (start, stop), the range of indexes of the
+            agents of the group, e.g. functools.partial(DQNAgentGroup, n_obvs, n_actions), it is pickled with
+            cloudpickle so can be a lambda
+
+            n_agents is the number of agents
+
+            observation_space is the observation space of each agent
+
+            n_workers is the number of worker processes, if None there is one per core (or per agent if fewer)
+
+            start_method is the multiprocessing start method of the workers (e.g. "fork" or "spawn"), if None the
+            default of the platform is used
+        """
+        if n_agents < 1:
+            raise ValueError("Cannot have less than 1 agent.")
+
+        self._n_agents = n_agents
+        n_workers = min(self.n_agents, n_workers or os.cpu_count() or 1)
+
+        if n_workers < 1:
+            raise ValueError("ParallelAgents must have at least 1 worker.")
+
+        super(ParallelAgents, self).__init__()
+
+        #spaces without a dtype (e.g. in older versions of gym) hold floats
+        layout = self.create_arrays({
+            "obvs": ((n_agents,) + tuple(observation_space.shape), getattr(observation_space, "dtype", None) or np.float32),
+            "rewards": ((n_agents,), np.float64),
+            "actions": ((n_agents,), np.int64),
+            "losses": ((n_agents,), np.float32),
+        })
+
+        group_fn = cloudpickle.dumps(group_fn)
+
+        #each worker trains a contiguous slice of the agents
+        bounds = np.linspace(0, self.n_agents, n_workers + 1).astype(int)
+
+        try:
+            self.start_workers(_worker, [(group_fn, int(start), int(stop), self._shm.name, layout) for start, stop in zip(bounds[:-1], bounds[1:])], start_method=start_method)
+
+            #wait for every group of agents to be created
+            for remote in self._remotes:
+                self._recv(remote)
+        except Exception:
+            self.close()
+            raise
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def n_agents(self) -> int:
+        return self._n_agents
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def reset(self, obvs: np.ndarray) -> np.ndarray:
+        """
+            function to start an episode of every agent
+
+            obvs is an array of the initial observation of each agent with shape [n_agents, ...]
+
+            returns a view of the first action of each agent with shape [n_agents] in shared memory
+        """
+        self._arrays["obvs"][:] = obvs
+
+        self._broadcast(("reset", None))
+
+        return self._arrays["actions"]
+
+    def step(self, t: int, rewards: np.ndarray, next_obvs: np.ndarray, done: bool, end: bool) -> tuple:
+        """
+            function to pass the outcome of the last actions to every agent, each group of agents stores and trains
+            on its transitions and chooses its next actions in parallel
+
+            t is the time step of the episode
+
+            rewards is an array of the reward of each agent with shape [n_agents]
+
+            next_obvs is an array of the observation of each agent after taking the actions with shape [n_agents, ...]
+
+            done is whether the episode is done (the env reached a terminal state)
+
+            end is whether this is the last time step of the episode (done or timed out), no actions are chosen if so
+
+            returns a tuple (actions, losses) of views of the next action of each agent with shape [n_agents] and the
+            loss of each agent with shape [n_agents] (or None if no agent was trained) in shared memory
+        """
+        self._arrays["rewards"][:] = rewards
+        self._arrays["obvs"][:] = next_obvs
+
+        trained = self._broadcast(("step", (int(t), bool(done), bool(end))))
+
+        return self._arrays["actions"], self._arrays["losses"] if any(trained) else None
+
+    def update_parameters(self, e: int):
+        """
+            function to update the parameters (e.g. exploration rate) of every agent at the end of episode e
+        """
+        self._broadcast(("update_parameters", e))
@@ -4,18 +4,23 @@
 # Imports
 #-----------------------------------------------------------------------------------------------
 
+import functools
 import numpy as np
 import tensorflow as tf
 import logging
 import time
 
 from algorithms.rl_algorithm import RLAlgorithm
+from algorithms.checkpoint import CheckpointWriter, is_checkpoint, load_checkpoint, save_checkpoint
+from algorithms.returns import discounted_returns
+from algorithms.rollouts import RolloutWorkers, run_rollouts
+from algorithms.trajectory import TrajectoryRecorder
 
 #-----------------------------------------------------------------------------------------------    
 # Functions
 #-----------------------------------------------------------------------------------------------
 
-def run_gym_policy_grad_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, lr: float=0.001, decay: float=0.999, lr_decay_steps: int=10000, saved_path: str=None):
+def run_gym_policy_grad_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, lr: float=0.001, decay: float=0.999, lr_decay_steps: int=10000, saved_path: str=None, recorder: TrajectoryRecorder=None):
     """
         function to run independent policy gradient algorithm on a gym env
 
@@ -29,6 +34,9 @@ def run_gym_policy_grad_multi_agent(env, n_agents: int=1, render: bool=False, ep
 
         time steps is the maximum number of time steps per episode
 
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
     """
     if n_agents < 1:
@@ -80,8 +88,11 @@ def run_gym_policy_grad_multi_agent(env, n_agents: int=1, render: bool=False, ep
             for i in range(n_agents):
                 agents[i].rewards_mem.append(rewards[i])
 
-            ep_obvs.append(actions)
-            ep_actions.append(obvs)
+            if recorder is None:
+                ep_obvs.append(obvs)
+                ep_actions.append(actions)
+            else:
+                recorder.record(e, t, obvs, actions, rewards, done)
 
             obvs = next_obvs
             total_rewards += rewards
@@ -124,11 +135,12 @@ def run_gym_policy_grad_multi_agent(env, n_agents: int=1, render: bool=False, ep
 
     return all_obvs, all_actions, all_rewards, all_losses, robot_paths, all_times
 
-def run_gym_policy_grad_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, lr: float=0.001, decay: float=0.999, lr_decay_steps: int=10000, saved_path: str=None):
+def run_gym_policy_grad_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, hidden_size: int=128, gamma: float=0.99, lr: float=0.001, decay: float=0.999, lr_decay_steps: int=10000, saved_path: str=None, recorder: TrajectoryRecorder=None):
     """
         function to run policy gradient algorithm on a gym env
 
-        env is the gym env object
+        env is the gym env object, or a RolloutWorkers whose workers each collect an episode in parallel for every
+        update, trained on in a single batched update
 
         n_agents is the number of agents
 
@@ -138,6 +150,9 @@ def run_gym_policy_grad_single_agent(env, render: bool=False, episodes: int=100,
 
         time steps is the maximum number of time steps per episode
 
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
     """
     #get env variables
@@ -146,6 +161,12 @@ def run_gym_policy_grad_single_agent(env, render: bool=False, episodes: int=100,
 
     agent = PolicyGradient(n_obvs, n_actions, hidden_size=hidden_size, gamma=gamma, lr=lr, decay=decay, lr_decay_steps=lr_decay_steps, saved_path=saved_path)
 
+    if isinstance(env, RolloutWorkers):
+        #workers only sample actions from their copy of the policy network, weights are sent by run_rollouts
+        env.set_policy(functools.partial(PolicyGradient, n_obvs, n_actions, hidden_size=hidden_size))
+
+        return run_rollouts(env, agent, episodes=episodes, time_steps=time_steps, recorder=recorder)
+
     #init arrays to collect data
     all_times = []
     all_obvs = []
@@ -179,8 +200,11 @@ def run_gym_policy_grad_single_agent(env, render: bool=False, episodes: int=100,
     
             agent.rewards_mem.append(reward)
     
-            ep_obvs.append(obv)
-            ep_actions.append(action)
+            if recorder is None:
+                ep_obvs.append(obv)
+                ep_actions.append(action)
+            else:
+                recorder.record(e, t, obv, action, reward, done)
 
             obv = next_obv
             total_reward += reward
@@ -269,7 +293,17 @@ class PolicyGradient(RLAlgorithm):
 
         #load a saved model (neural net) if provided
         if saved_path:
-            self.policy_net = tf.keras.models.load_model(saved_path)
+            if is_checkpoint(saved_path):
+                self.set_checkpoint(load_checkpoint(saved_path)[0])
+            else:
+                self.policy_net = tf.keras.models.load_model(saved_path)
+
+        #compile act and train steps into graphs with fixed input signatures so they are traced 
+        #once instead of being dispatched eagerly on every call
+        obv_spec = tf.TensorSpec(shape=(None, int(n_obvs)), dtype=tf.float32)
+        self.act_step = tf.function(self.act_step, input_signature=[obv_spec])
+        self.train_step = tf.function(self.train_step, input_signature=[obv_spec, tf.TensorSpec(shape=(None,), dtype=tf.int32), tf.TensorSpec(shape=(None,), dtype=tf.float32)])
+        self.update_step = tf.function(self.update_step, input_signature=[obv_spec, tf.TensorSpec(shape=(None,), dtype=tf.int32), tf.TensorSpec(shape=(None,), dtype=tf.float32)])
 
     #-------------------------------------------------------------------------------------------
     # Properties
@@ -295,13 +329,32 @@ class PolicyGradient(RLAlgorithm):
     # Methods
     #-------------------------------------------------------------------------------------------
 
-    def save_model(self, path: str):
+    def save_model(self, path: str, step: int=0, writer: CheckpointWriter=None):
+        """
+            function to save the model (policy network weights) as a weights only checkpoint
+
+            path is a string of the path to the checkpoint directory where the model will be saved
+
+            step is the training step (e.g. episode) the checkpoint is taken at
+
+            writer is a CheckpointWriter to write the checkpoint on a background thread, if None the checkpoint
+            is written before returning
+        """
+        save_checkpoint(path, self.get_checkpoint(), step=step, metadata={"algorithm": type(self).__name__}, writer=writer)
+
+    def get_checkpoint(self) -> dict:
+        """
+            function to get the arrays of the model to be saved in a checkpoint
+
+            returns a dict of the policy network weights
         """
-            function to save the tensorflow model (neural net) to a file
+        return {"policy_net": self.policy_net.get_weights()}
 
-            path is a string of the path to the file where the model will be saved
+    def set_checkpoint(self, arrays: dict):
+        """
+            function to set the model from the arrays of a checkpoint (as returned by get_checkpoint)
         """
-        self.policy_net.save(path)
+        self.policy_net.set_weights(arrays["policy_net"])
 
     def get_action(self, obv: np.ndarray) -> int:
         """
@@ -312,43 +365,77 @@ class PolicyGradient(RLAlgorithm):
 
             returns the action to take
         """
-        action_probs = self.policy_net(np.expand_dims(obv, axis=0))
-        action = np.random.choice(self.n_actions, p=action_probs.numpy()[0])
+        action = int(self.act_step(np.array([obv], dtype=np.float32))[0])
 
         self.obv_mem.append(obv)
         self.action_mem.append(action)
 
         return action
 
-    def train(self) -> float:
+    def act_step(self, obvs: tf.Tensor) -> tf.Tensor:
         """
-            function to train Policy network using previous episode data from replay memory
+            function to sample an action from the policy for a batch of observations, compiled into a graph on init
 
-            returns the loss of the training as a tensor
+            obvs is a float32 tensor of observations with shape [batch, n_obvs]
+
+            returns an int32 tensor of the sampled action for each observation
         """
-        returns = []
-        discounted_sum = 0
+        action_probs = self.policy_net(obvs)
 
-        #calculate the discounted sum of rewards
-        for reward in self.rewards_mem[::-1]:
-            discounted_sum = reward + self.gamma * discounted_sum
-            #iterated inversly therefore insert at beginning of array
-            returns.insert(0, discounted_sum)
+        return tf.random.categorical(tf.math.log(action_probs), 1, dtype=tf.int32)[:, 0]
 
+    def train_step(self, obv_batch: tf.Tensor, action_batch: tf.Tensor, reward_batch: tf.Tensor) -> tf.Tensor:
+        """
+            function to apply one gradient descent step to the policy network over an episode, compiled into a graph on init
+
+            obv_batch is a float32 tensor of the episode observations with shape [time, n_obvs]
+
+            action_batch is an int32 tensor of the episode actions with shape [time]
+
+            reward_batch is a float32 tensor of the episode rewards with shape [time]
+
+            returns the loss of the step as a tensor
+        """
+        #calculate the discounted sum of rewards with a reverse scan over the episode
+        returns = tf.scan(lambda discounted_sum, reward: reward + self.gamma * discounted_sum, reward_batch, initializer=tf.constant(0.0), reverse=True)
         #normalise returns
-        returns = (returns - np.mean(returns)) / (np.std(returns) + self.eps)
+        returns = (returns - tf.reduce_mean(returns)) / (tf.math.reduce_std(returns) + self.eps)
+
+        return self.update_step(obv_batch, action_batch, returns)
+
+    def update_step(self, obv_batch: tf.Tensor, action_batch: tf.Tensor, returns: tf.Tensor) -> tf.Tensor:
+        """
+            function to apply one gradient descent step to the policy network given the normalised returns of a batch
+            of time steps, compiled into a graph on init
+
+            obv_batch is a float32 tensor of the observations with shape [batch, n_obvs]
+
+            action_batch is an int32 tensor of the actions with shape [batch]
 
+            returns is a float32 tensor of the normalised discounted returns with shape [batch]
+
+            returns the loss of the step as a tensor
+        """
         with tf.GradientTape() as tape:
-            loss = 0
-            for i in range(np.shape(self.obv_mem)[0]):
-                action_probs = self.policy_net(np.expand_dims(self.obv_mem[i], axis=0))
-                action_log_prob = tf.math.log(action_probs[0, self.action_mem[i]])
-                #sum loss across episode
-                loss += -action_log_prob * returns[i]
+            #single forward pass over the whole batch
+            action_probs = self.policy_net(obv_batch)
+            action_log_probs = tf.math.log(tf.gather(action_probs, action_batch, batch_dims=1))
+            #sum loss across batch
+            loss = tf.reduce_sum(-action_log_probs * returns)
 
         grads = tape.gradient(loss, self.policy_net.trainable_variables)
         self.opt.apply_gradients(zip(grads, self.policy_net.trainable_variables))
 
+        return loss
+
+    def train(self) -> float:
+        """
+            function to train Policy network using previous episode data from replay memory
+
+            returns the loss of the training as a tensor
+        """
+        loss = self.train_step(np.array(self.obv_mem, dtype=np.float32), np.array(self.action_mem, dtype=np.int32), np.array(self.rewards_mem, dtype=np.float32))
+
         #replay memory only stores a single episode 
         self.obv_mem.clear()
         self.action_mem.clear()
@@ -356,4 +443,20 @@ class PolicyGradient(RLAlgorithm):
 
         return loss
 
+    def train_batch(self, trajectories: list) -> tf.Tensor:
+        """
+            function to train the policy network on the episodes collected by RolloutWorkers in a single update
+
+            trajectories is a list of trajectories (as returned by RolloutWorkers.rollout) of whole episodes
+
+            returns the loss of the training as a tensor
+        """
+        #returns of each trajectory are not carried across the episode boundaries within it
+        returns = np.concatenate([discounted_returns(trajectory["rewards"], self.gamma, dones=trajectory["dones"]) for trajectory in trajectories])
+        #normalise returns across the batch
+        returns = (returns - np.mean(returns)) / (np.std(returns) + self.eps)
+
+        obv_batch = np.concatenate([trajectory["obvs"] for trajectory in trajectories])
+        action_batch = np.concatenate([trajectory["actions"] for trajectory in trajectories])
 
+        return self.update_step(obv_batch, action_batch, returns.astype(np.float32))
@@ -5,17 +5,23 @@
 #-----------------------------------------------------------------------------------------------
 
 import sys, os, pickle
+import functools
 import logging
 import time
 import numpy as np
 
 from algorithms.rl_algorithm import RLAlgorithm
+from algorithms.checkpoint import CheckpointWriter, is_checkpoint, load_checkpoint, save_checkpoint
+from algorithms.sparse_q_table import SparseQTable
+from algorithms.vec_env import VecEnv
+from algorithms.parallel_agents import ParallelAgents, run_parallel_agents
+from algorithms.trajectory import TrajectoryRecorder
 
 #-----------------------------------------------------------------------------------------------    
 # Functions
 #-----------------------------------------------------------------------------------------------
     
-def run_gym_q_learning_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.7, decay: float=0.999, saved_path: str=None):
+def run_gym_q_learning_multi_agent(env, n_agents: int=1, render: bool=False, episodes: int=100, time_steps: int=10000, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.7, decay: float=0.999, saved_path: str=None, sparse: bool=False, n_workers: int=0, recorder: TrajectoryRecorder=None):
     """
         function to run independent q-learning algorithm on a gym env
 
@@ -29,6 +35,15 @@ def run_gym_q_learning_multi_agent(env, n_agents: int=1, render: bool=False, epi
 
         time steps is the maximum number of time steps per episode
 
+        sparse determines whether a sparse q-table (only storing visited states) is used, allowing observation
+        spaces too large for a dense q-table
+
+        n_workers is the number of worker processes the agents are split between and trained in, in parallel with
+        each other, if 0 the agents are trained in this process
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents and time of each epsiode in seconds
     """
     if n_agents < 1:
@@ -38,13 +53,28 @@ def run_gym_q_learning_multi_agent(env, n_agents: int=1, render: bool=False, epi
 
     #get env variables
     n_actions = env.action_space.n #number of actions
-    #value range limited to -1000 to 1000 as maximum memory may be reach
-    #any env with memory requirement larger than this for observation space cannot be used with this implementation of qlearning
-    low = np.clip(env.observation_space.low, -1000, 1000) #minimum values of observation space
-    high = np.clip(env.observation_space.high, -1000, 1000) #maximum values of observation space
-    n_states = np.prod(high - low + 1, dtype=int) #number of discretised states
+    low = env.observation_space.low #minimum values of observation space
+    high = env.observation_space.high #maximum values of observation space
+
+    if not sparse:
+        #value range limited to -1000 to 1000 as maximum memory of a dense q-table may be reached
+        #any env with memory requirement larger than this for observation space should use a sparse q-table
+        low = np.clip(low, -1000, 1000)
+        high = np.clip(high, -1000, 1000)
+
+    discretiser = ObvDiscretiser(low, high)
+    n_states = discretiser.n_states #number of discretised states
+
+    if n_workers:
+        group_fn = functools.partial(QLearningAgentGroup, discretiser=discretiser, n_actions=n_actions, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, saved_path=saved_path, sparse=sparse)
+
+        with ParallelAgents(group_fn, n_agents, env.observation_space, n_workers=n_workers) as agents:
+            all_obvs, all_actions, all_rewards, _, robot_paths, all_times = run_parallel_agents(env, agents, render=render, episodes=episodes, time_steps=time_steps, recorder=recorder)
 
-    agents = [QLearning(n_states, n_actions, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, saved_path=saved_path) for i in range(n_agents)]
+        return all_obvs, all_actions, all_rewards, robot_paths, all_times
+
+    #q-tables of all agents are held in a single array so each step is vectorised across agents
+    agents = MultiAgentQLearning(n_agents, n_states, n_actions, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, saved_path=saved_path, sparse=sparse)
 
     #init arrays to collect data
     all_times = []
@@ -61,12 +91,8 @@ def run_gym_q_learning_multi_agent(env, n_agents: int=1, render: bool=False, epi
 
     for e in range(episodes): 
         obvs = env.reset()
-        
-        states = np.zeros(n_agents, dtype=int)
-        next_states = np.zeros(n_agents, dtype=int)
-
-        for i in range(n_agents):
-            states[i] = agents[i].index_obv(obvs[i], low, high)
+        #index observations of all agents at once
+        states = discretiser.index(obvs)
 
         start_time = time.time()
         ep_obvs = []
@@ -78,20 +104,19 @@ def run_gym_q_learning_multi_agent(env, n_agents: int=1, render: bool=False, epi
             if render:
                 env.render()
 
-            actions = np.zeros(n_agents, dtype=int)
-
-            for i in range(n_agents):
-                actions[i] = agents[i].get_action(states[i])
+            actions = agents.get_action(states)
 
             next_obvs, rewards, done, info = env.step(actions)
 
-            for i in range(n_agents):
-                next_states[i] = agents[i].index_obv(next_obvs[i], low, high)
+            next_states = discretiser.index(next_obvs)
 
-                agents[i].train(states[i], actions[i], rewards[i], next_states[i])
+            agents.train(states, actions, rewards, next_states)
 
-            ep_obvs.append(actions)
-            ep_actions.append(obvs)
+            if recorder is None:
+                ep_obvs.append(obvs)
+                ep_actions.append(actions)
+            else:
+                recorder.record(e, t, obvs, actions, rewards, done)
 
             obvs = next_obvs
             states = next_states
@@ -128,16 +153,16 @@ def run_gym_q_learning_multi_agent(env, n_agents: int=1, render: bool=False, epi
             if env.unwrapped.spec.id[0:5] == "maze-" and env.is_game_over():
                 sys.exit(0)
 
-        for i in range(n_agents):
-            agents[i].update_parameters(e)
+        agents.update_parameters(e)
 
     return all_obvs, all_actions, all_rewards, robot_paths, all_times
 
-def run_gym_q_learning_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.7, decay: float=0.999, saved_path: str=None):
+def run_gym_q_learning_single_agent(env, render: bool=False, episodes: int=100, time_steps: int=10000, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.7, decay: float=0.999, saved_path: str=None, sparse: bool=False, recorder: TrajectoryRecorder=None):
     """
         function to run independent q-learning algorithm on a gym env
 
-        env is the gym env object
+        env is the gym env object, or a VecEnv of copies of the env whose actions are chosen and q-table updated 
+        as a batch each time step
 
         n_agents is the number of agents
 
@@ -147,17 +172,32 @@ def run_gym_q_learning_single_agent(env, render: bool=False, episodes: int=100,
 
         time steps is the maximum number of time steps per episode
 
+        sparse determines whether a sparse q-table (only storing visited states) is used, allowing observation
+        spaces too large for a dense q-table
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
         returns obvs, actions, rewards and losses of all agents
     """
     #get env variables
     n_actions = env.action_space.n #number of actions
-    #value range limited to -1000 to 1000 as maximum memory may be reach
-    #any env with memory requirement larger than this for observation space cannot be used with this implementation of qlearning
-    low = np.clip(env.observation_space.low, -1000, 1000) #minimum values of observation space
-    high = np.clip(env.observation_space.high, -1000, 1000) #maximum values of observation space
-    n_states = round(np.prod(high - low + 1)) #number of discretised states
+    low = env.observation_space.low #minimum values of observation space
+    high = env.observation_space.high #maximum values of observation space
+
+    if not sparse:
+        #value range limited to -1000 to 1000 as maximum memory of a dense q-table may be reached
+        #any env with memory requirement larger than this for observation space should use a sparse q-table
+        low = np.clip(low, -1000, 1000)
+        high = np.clip(high, -1000, 1000)
+
+    discretiser = ObvDiscretiser(low, high)
+    n_states = discretiser.n_states #number of discretised states
+
+    agent = QLearning(n_states, n_actions, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, saved_path=saved_path, sparse=sparse)
 
-    agent = QLearning(n_states, n_actions, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, saved_path=saved_path)
+    if isinstance(env, VecEnv):
+        return run_vec_env_q_learning(env, agent, discretiser, render=render, episodes=episodes, time_steps=time_steps, recorder=recorder)
 
     #init arrays to collect data
     all_times = []
@@ -174,7 +214,7 @@ def run_gym_q_learning_single_agent(env, render: bool=False, episodes: int=100,
 
     for e in range(episodes): 
         obv = env.reset()
-        state = agent.index_obv(obv, low, high)
+        state = discretiser.index(obv)
 
         ep_obvs = []
         ep_actions = []
@@ -188,12 +228,15 @@ def run_gym_q_learning_single_agent(env, render: bool=False, episodes: int=100,
             action = agent.get_action(state)
 
             next_obv, reward, done, _ = env.step(action)
-            next_state = agent.index_obv(next_obv, low, high)
+            next_state = discretiser.index(next_obv)
 
             agent.train(state, action, reward, next_state)
 
-            ep_obvs.append(obv)
-            ep_actions.append(action)
+            if recorder is None:
+                ep_obvs.append(obv)
+                ep_actions.append(action)
+            else:
+                recorder.record(e, t, obv, action, reward, done)
 
             obv = next_obv
             state = next_state
@@ -230,6 +273,110 @@ def run_gym_q_learning_single_agent(env, render: bool=False, episodes: int=100,
 
     return all_obvs, all_actions, all_rewards, robot_paths, all_times
 
+def run_vec_env_q_learning(env: VecEnv, agent, discretiser, render: bool=False, episodes: int=100, time_steps: int=10000, recorder: TrajectoryRecorder=None):
+    """
+        function to run q-learning algorithm on a VecEnv, the actions of every env are chosen and the q-table is 
+        updated with the experiences of every env at once each time step
+
+        env is the VecEnv, episodes of each of its envs are ended after time_steps time steps
+
+        agent is the QLearning agent
+
+        discretiser is the ObvDiscretiser of the env observations
+
+        render determines whether to render the first env
+
+        episodes is the number of episodes to simulate, counted across all envs
+
+        time steps is the maximum number of time steps per episode
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
+        returns obvs, actions, rewards of all episodes in the order they ended and time of each epsiode in seconds
+    """
+    env.time_limit = time_steps
+
+    #init arrays to collect data
+    all_times = []
+    all_obvs = []
+    all_actions = []
+    all_rewards = []
+
+    #robot-maze env can save the path taken by the agents each episode
+    robot_paths = []
+
+    #data of the current episode of each env
+    ep_obvs = [[] for i in range(env.n_envs)]
+    ep_actions = [[] for i in range(env.n_envs)]
+    total_rewards = np.zeros(env.n_envs)
+    start_times = np.full(env.n_envs, time.time())
+    ep_lengths = np.zeros(env.n_envs, dtype=int)
+    #episodes of different envs overlap so they are recorded with indexes in the order they started
+    ep_indexes = np.arange(env.n_envs)
+
+    obvs = env.reset()
+    states = discretiser.index(obvs)
+    e = 0
+
+    while e < episodes:
+        if render:
+            env.render()
+
+        actions = agent.get_batch_actions(states)
+
+        #observations are copied as those of a SubprocVecEnv are overwritten by the next step
+        obvs = np.copy(obvs)
+
+        next_obvs, rewards, dones, infos = env.step(actions)
+
+        for i in range(env.n_envs):
+            if recorder is None:
+                ep_obvs[i].append(obvs[i])
+                ep_actions[i].append(actions[i])
+            else:
+                recorder.record(ep_indexes[i], ep_lengths[i], obvs[i], actions[i], rewards[i], dones[i] and not infos[i]["timeout"])
+
+        ep_lengths += 1
+
+        #finished envs have already been reset so the last state of their episode is trained on instead
+        last_obvs = next_obvs.copy()
+        for i in np.flatnonzero(dones):
+            last_obvs[i] = infos[i]["terminal_observation"]
+
+        agent.train_batch(states, actions, rewards, discretiser.index(last_obvs))
+
+        total_rewards += rewards
+
+        for i in np.flatnonzero(dones):
+            if infos[i]["timeout"]:
+                logging.info("Episode %u timed out, with total reward = %f", e, total_rewards[i])
+            else:
+                logging.info("Episode %u completed, after %u time steps, with total reward = %f", e, ep_lengths[i] - 1, total_rewards[i])
+
+            all_times.append(round((time.time() - start_times[i]), 3))
+            all_obvs.append(ep_obvs[i])
+            all_actions.append(ep_actions[i])
+            all_rewards.append(total_rewards[i])
+
+            if "robot_path" in infos[i]:
+                robot_paths.append(infos[i]["robot_path"])
+
+            ep_obvs[i] = []
+            ep_actions[i] = []
+            total_rewards[i] = 0
+            start_times[i] = time.time()
+            ep_lengths[i] = 0
+            ep_indexes[i] = np.max(ep_indexes) + 1
+
+            agent.update_parameters(e)
+            e += 1
+
+        obvs = next_obvs
+        states = discretiser.index(obvs)
+
+    return all_obvs, all_actions, all_rewards, robot_paths, all_times
+
 #-----------------------------------------------------------------------------------------------    
 # Classes
 #-----------------------------------------------------------------------------------------------
@@ -238,7 +385,7 @@ class QLearning(RLAlgorithm):
     """
         Class to contain Q-table and all parameters with methods to update Q-table and get actions
     """
-    def __init__(self, n_states: int, n_actions: int, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.7, decay: float=0.999, saved_path: str=None):
+    def __init__(self, n_states: int, n_actions: int, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.7, decay: float=0.999, saved_path: str=None, sparse: bool=False):
         """
             function to initalise the QLearning class
 
@@ -257,6 +404,9 @@ class QLearning(RLAlgorithm):
             lr_decay is the rate at which the learning rate will decay exponentially
 
             saved_path 
+
+            sparse determines whether a SparseQTable is used, memory is then proportional to the number of
+            visited states rather than n_states
         """
         self.gamma = gamma
         self.lr = lr
@@ -266,11 +416,19 @@ class QLearning(RLAlgorithm):
 
         self._epsilon_max = epsilon_max 
         self._epsilon_min = epsilon_min
-        self._q_table = np.zeros((n_states, self.n_actions))
+
+        if sparse:
+            self._q_table = SparseQTable(self._q_table_shape(n_states))
+        else:
+            self._q_table = np.zeros(self._q_table_shape(n_states))
 
         #load a saved model (q-table) if provided
         if saved_path:
-            if os.path.isfile(saved_path):
+            if is_checkpoint(saved_path):
+                #q-table is memory-mapped so only the pages of visited states are read from disk
+                self.set_checkpoint(load_checkpoint(saved_path, mmap=True)[0])
+            elif os.path.isfile(saved_path):
+                #q-table pickled by previous versions
                 with open(saved_path, "rb") as handle:
                     self._q_table = pickle.load(handle)
             else:
@@ -310,24 +468,56 @@ class QLearning(RLAlgorithm):
     # Methods
     #-------------------------------------------------------------------------------------------
 
-    def save_model(self, path: str):
+    def save_model(self, path: str, step: int=0, writer: CheckpointWriter=None):
+        """
+            function to save the model (q-table) as a weights only checkpoint
+
+            path is a string of the path to the checkpoint directory where the model will be saved
+
+            step is the training step (e.g. episode) the checkpoint is taken at
+
+            writer is a CheckpointWriter to write the checkpoint on a background thread, if None the checkpoint
+            is written before returning
         """
-            function to save the model (q-table) to a file
+        save_checkpoint(path, self.get_checkpoint(), step=step, metadata={"algorithm": type(self).__name__}, writer=writer)
 
-            path is a string of the path to the file where the model will be saved
+    def get_checkpoint(self) -> dict:
         """
-        with open(path, "wb") as handle:
-            pickle.dump(self.q_table, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            function to get the arrays of the model to be saved in a checkpoint
+
+            returns a dict of the q-table array, or the compact arrays of a SparseQTable
+        """
+        if isinstance(self.q_table, SparseQTable):
+            return {f'q_table_{name}': val for name, val in self.q_table.to_arrays().items()}
+
+        return {"q_table": self.q_table}
+
+    def set_checkpoint(self, arrays: dict):
+        """
+            function to set the model from the arrays of a checkpoint (as returned by get_checkpoint)
+        """
+        if "q_table" in arrays:
+            self._q_table = arrays["q_table"]
+        else:
+            self._q_table = SparseQTable.from_arrays(arrays["q_table_shape"], arrays["q_table_keys"], arrays["q_table_values"])
+
+    def _q_table_shape(self, n_states: int) -> tuple:
+        """
+            function to get the shape of a new q-table
+
+            returns a tuple of the shape [n_states, n_actions]
+        """
+        return (n_states, self.n_actions)
 
     def get_action(self, obv_i: int):
         """
             function to get the action based on the current observation using an epsilon-greedy policy
 
-            obv_i is the current observation of the state indexed for the q_table (done using index_obv function)
+            obv_i is the current observation of the state indexed for the q_table (done using ObvDiscretiser.index)
 
             returns the action to take as an int
 
-            Note: index_obv function should be done outside of this class to prevent performance issues
+            Note: indexing should be done outside of this class to prevent performance issues
         """
         #take random action with probability epsilon (explore rate)
         if np.random.uniform(0, 1) < self.epsilon:
@@ -338,6 +528,46 @@ class QLearning(RLAlgorithm):
 
         return action
 
+    def get_batch_actions(self, obv_is: np.ndarray) -> np.ndarray:
+        """
+            function to get the actions of a batch of observations (e.g. one per env of a VecEnv) using an epsilon-greedy 
+            policy with a single gather from the q-table
+
+            obv_is is an int array of shape [batch] of the current observations indexed for the q_table
+
+            returns an int array of shape [batch] of the actions to take
+        """
+        obv_is = np.asarray(obv_is)
+        actions = np.argmax(self.q_table[obv_is], axis=1)
+
+        #take random action with probability epsilon (explore rate) independently for each observation
+        explore = np.random.uniform(0, 1, size=len(obv_is)) < self.epsilon
+        actions[explore] = np.random.randint(self.n_actions, size=np.count_nonzero(explore))
+
+        return actions
+
+    def train_batch(self, obv_is: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_obv_is: np.ndarray):
+        """
+            function to train agent by applying the q-value update rule to the q-table for a batch of experiences at once
+
+            obv_is is an int array of shape [batch] of the indexed observations from the environment
+
+            actions is an int array of shape [batch] of the actions taken
+
+            rewards is an array of shape [batch] of the rewards provided by the environment
+
+            next_obv_is is an int array of shape [batch] of the indexed observations after taking the actions
+
+            Note: every update is calculated from the q-table before the batch, if the same state and action appear
+            more than once in a batch only one of their updates is applied
+        """
+        obv_is = np.asarray(obv_is)
+        actions = np.asarray(actions, dtype=int)
+
+        targets = np.asarray(rewards) + self.gamma * np.max(self.q_table[np.asarray(next_obv_is)], axis=1)
+
+        self.q_table[obv_is, actions] += self.lr * (targets - self.q_table[obv_is, actions])
+
     def update_parameters(self, n_t: int):
         """
             function to reduce value of learning parameters decaying exponentially at the rate of the decay property
@@ -351,47 +581,300 @@ class QLearning(RLAlgorithm):
         """
             function to train agent by applying the q-value update rule to the q-table
 
-            obv_i is the observation from the environment indexed for the q_table (done using index_obv function)
+            obv_i is the observation from the environment indexed for the q_table (done using ObvDiscretiser.index)
 
             action is the action taken by the agent
 
             reward is the reward provided by the environment after taking action in current state
 
-            next_obv_i is the observation after taking action in the current state indexed for the q_table (done using the index_obv function)
+            next_obv_i is the observation after taking action in the current state indexed for the q_table (done using ObvDiscretiser.index)
 
-            Note: index_obv function should be done outside of this class to prevent performance issues
+            Note: indexing should be done outside of this class to prevent performance issues
         """
         #ensure action is an int for indexing q-table
         action = int(action)
 
         self.q_table[obv_i, action] += self.lr * (reward + (self.gamma * np.max(self.q_table[next_obv_i])) - self.q_table[obv_i, action])
 
-    def index_obv(self, obv: np.ndarray, low: np.ndarray, high: np.ndarray) -> int:
+class MultiAgentQLearning(QLearning):
+    """
+        Class to contain the Q-tables of independent Q-learning agents in a single array with methods to 
+        update the Q-tables and get actions of all agents at once
+    """
+    def __init__(self, n_agents: int, n_states: int, n_actions: int, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.7, decay: float=0.999, saved_path: str=None, sparse: bool=False):
         """
-            function to turn the observations from the environment into an index for the q-table (int)
-    
-            obv is the observation to be indexed
+            function to initalise the MultiAgentQLearning class
+
+            n_agents is the number of independent agents
+
+            n_states is the number of discrete (discretised if continuous) states in the environment
+
+            n_actions is the number of discrete actions (q learning will only perform with discrete action space)
+
+            gamma is a float which is the discount factor of future rewards
+
+            epsilon max is the maximum exploration rate of the agents
+
+            epsilon min is the minimum exploration rate of the agents
 
-            low is an array of the lowest values for each observation dimension (e.g. for 4 dimensions 
-            with the lowest value of each being 0 an array of [0, 0, 0, 0] should be passed to this 
-            function. If using openai gym env this array is equivalent to env.observation_space.low)
+            lr is the learning rate of the agents
 
-            high is an array of the highest values for each observation dimension (same as for low, 
-            except the highest values should be included. If using openai gym env this array is 
-            equivalent to env.observation_space.high)
+            decay is the rate at which the learning rate and exploration rate will decay exponentially
 
-            returns the index as an int
+            saved_path is the path to a saved q-table of shape [n_agents, n_states, n_actions], or of 
+            shape [n_states, n_actions] to initialise every agent from the same q-table
 
-            Note: this function should not be called inside of the QLearning class for performance
+            sparse determines whether a SparseQTable is used, memory is then proportional to the number of
+            states visited by each agent rather than n_agents * n_states
         """
-        index = 0
+        if n_agents < 1:
+            raise ValueError("Cannot have less than 1 agent.")
 
-        #loop through observation array inversly
-        for i in range((np.size(obv) - 1), -1, -1):
-            #scale so that each array element's value is increased exponentially
-            scaler = (high[i + 1] + 1 - low[i + 1]) if i != (np.size(obv) - 1) else 1
-            index += (obv[i] - low[i]) * scaler
+        #set before the q-table of all agents is allocated by the QLearning init (see _q_table_shape)
+        self._n_agents = n_agents
+        #index of each agent's q-table used to gather/scatter all agents at once
+        self._agent_indexes = np.arange(n_agents)
+
+        super(MultiAgentQLearning, self).__init__(n_states, n_actions, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, saved_path=saved_path, sparse=sparse)
+
+        #a saved q-table of a single agent initialises every agent
+        if isinstance(self._q_table, SparseQTable):
+            if len(self._q_table.shape) == 2:
+                #visited states of the q-table are copied to every agent, keyed by agent * n_states + state
+                arrays = self._q_table.to_arrays()
+                keys = (self._agent_indexes[:, None] * n_states + arrays["keys"]).reshape(-1)
+                self._q_table = SparseQTable.from_arrays((n_agents, n_states, n_actions), keys, np.tile(arrays["values"], (n_agents, 1)))
+
+        elif np.ndim(self._q_table) == 2:
+            #q-table of shape [n_agents, n_states, n_actions]
+            self._q_table = np.tile(self._q_table, (n_agents, 1, 1))
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def n_agents(self) -> int:
+        return self._n_agents
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def get_action(self, obv_is: np.ndarray) -> np.ndarray:
+        """
+            function to get the actions of all agents based on their current observations using an epsilon-greedy policy
+
+            obv_is is an int array of shape [n_agents] of each agent's current observation indexed for the q_table 
+            (done using an ObvDiscretiser)
+
+            returns an int array of shape [n_agents] of the action each agent should take
+        """
+        #greedy action of every agent from a single gather of each agent's q-values
+        actions = np.argmax(self.q_table[self._agent_indexes, obv_is], axis=1)
+
+        #take random action with probability epsilon (explore rate)
+        explore = np.random.uniform(0, 1, size=self.n_agents) < self.epsilon
+        actions[explore] = np.random.randint(self.n_actions, size=np.count_nonzero(explore))
+
+        return actions
+
+    def train(self, obv_is: np.ndarray, actions: np.ndarray, rewards: np.ndarray, next_obv_is: np.ndarray):
+        """
+            function to train all agents by applying the q-value update rule to their q-tables
+
+            obv_is is an int array of shape [n_agents] of the indexed observations from the environment
+
+            actions is an int array of shape [n_agents] of the actions taken by the agents
+
+            rewards is an array of shape [n_agents] of the rewards provided by the environment
+
+            next_obv_is is an int array of shape [n_agents] of the indexed observations after taking the actions
+        """
+        actions = np.asarray(actions, dtype=int)
+
+        targets = np.asarray(rewards) + self.gamma * np.max(self.q_table[self._agent_indexes, next_obv_is], axis=1)
+
+        #single scatter of the update into every agent's q-table
+        self.q_table[self._agent_indexes, obv_is, actions] += self.lr * (targets - self.q_table[self._agent_indexes, obv_is, actions])
+
+    def slice_agents(self, start: int, stop: int):
+        """
+            function to keep only the q-tables of the agents from start to stop of a saved q-table of more agents,
+            e.g. the agents trained by one worker of a ParallelAgents
+        """
+        if stop - start != self.n_agents:
+            raise ValueError(f'Slice of {stop - start} agents does not match the {self.n_agents} agents.')
+
+        if isinstance(self._q_table, SparseQTable):
+            #keep the visited states of the agents in the slice, keyed relative to the first agent of the slice
+            arrays = self._q_table.to_arrays()
+            n_states = self._q_table.shape[1]
+            keep = (arrays["keys"] >= start * n_states) & (arrays["keys"] < stop * n_states)
+            self._q_table = SparseQTable.from_arrays((self.n_agents,) + tuple(self._q_table.shape[1:]), arrays["keys"][keep] - start * n_states, arrays["values"][keep])
+        else:
+            self._q_table = self._q_table[start:stop]
+
+    def _q_table_shape(self, n_states: int) -> tuple:
+        """
+            function to get the shape of a new q-table, the q-tables of all agents are allocated as one array
+
+            returns a tuple of the shape [n_agents, n_states, n_actions]
+        """
+        return (self.n_agents, n_states, self.n_actions)
+
+class QLearningAgentGroup():
+    """
+        Class of the group of independent Q-learning agents trained by one worker of a ParallelAgents
+    """
+    def __init__(self, start: int, stop: int, discretiser, n_actions: int, gamma: float=0.99, epsilon_max: float=1.0, epsilon_min: float=0.01, lr: float=0.7, decay: float=0.999, saved_path: str=None, sparse: bool=False):
+        """
+            function to initialise the class
+
+            start and stop are the range of indexes of the agents of the group
+
+            discretiser is the ObvDiscretiser of the observations of the env
+
+            the remaining arguments are as for MultiAgentQLearning, a saved q-table of every agent is sliced to the
+            agents of the group
+        """
+        self.discretiser = discretiser
+        self.agents = MultiAgentQLearning(stop - start, discretiser.n_states, n_actions, gamma=gamma, epsilon_max=epsilon_max, epsilon_min=epsilon_min, lr=lr, decay=decay, saved_path=saved_path, sparse=sparse)
+
+        if self.agents.q_table.shape[0] != stop - start:
+            self.agents.slice_agents(start, stop)
+
+        self._states = None
+        self._actions = None
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def reset(self, obvs: np.ndarray) -> np.ndarray:
+        """
+            function to start an episode
+
+            obvs is an array of the initial observation of each agent of the group
+
+            returns an int array of the first action of each agent of the group
+        """
+        self._states = self.discretiser.index(obvs)
+        self._actions = self.agents.get_action(self._states)
+
+        return self._actions
+
+    def step(self, t: int, rewards: np.ndarray, next_obvs: np.ndarray, done: bool, end: bool) -> tuple:
+        """
+            function to train every agent of the group on its last transition and get its next action
+
+            returns a tuple (actions, losses) of an int array of the next action of each agent (None if end) and None
+            as q-learning has no loss
+        """
+        next_states = self.discretiser.index(next_obvs)
+
+        self.agents.train(self._states, self._actions, rewards, next_states)
+        self._states = next_states
+
+        if end:
+            return None, None
+
+        self._actions = self.agents.get_action(self._states)
+
+        return self._actions, None
+
+    def update_parameters(self, e: int):
+        """
+            function to update the learning parameters of every agent of the group at the end of episode e
+        """
+        self.agents.update_parameters(e)
+
+class ObvDiscretiser():
+    """
+        Class to map discrete observations onto unique q-table indexes
+
+        strides of each observation dimension are precomputed once from the observation bounds, such that indexing
+        is a single dot product (the same mapping as np.ravel_multi_index in C order)
+    """
+    def __init__(self, low: np.ndarray, high: np.ndarray):
+        """
+            function to initialise the class
+
+            low is an array of the lowest values for each observation dimension (equivalent to 
+            env.observation_space.low for an openai gym env)
+
+            high is an array of the highest values for each observation dimension (equivalent to 
+            env.observation_space.high for an openai gym env)
+        """
+        low = np.asarray(low, dtype=np.float64).reshape(-1)
+        high = np.asarray(high, dtype=np.float64).reshape(-1)
+
+        if np.shape(low) != np.shape(high):
+            raise ValueError("low and high must have the same number of dimensions.")
+
+        #unbounded observation spaces cannot be indexed (gym uses inf or the largest float for these)
+        if not (np.all(np.abs(low) < 2 ** 61) and np.all(np.abs(high) < 2 ** 61)):
+            raise ValueError("low and high must be finite and within the range of int64 in every dimension.")
+
+        self._low = low.astype(np.int64)
+        self._high = high.astype(np.int64)
+
+        #number of discrete values in each observation dimension
+        self._dims = self.high - self.low + 1
+
+        if np.any(self.dims < 1):
+            raise ValueError("high must be greater than or equal to low in every dimension.")
+
+        if np.prod(self.dims.astype(np.float64)) >= 2 ** 63:
+            raise ValueError("observation space has too many states to be indexed by an int64.")
+
+        #stride of each dimension is the product of the sizes of all following dimensions
+        self._strides = np.append(np.cumprod(self.dims[::-1])[-2::-1], 1)
+        self._n_states = int(np.prod(self.dims))
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._low
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._high
+
+    @property
+    def dims(self) -> np.ndarray:
+        return self._dims
+
+    @property
+    def strides(self) -> np.ndarray:
+        return self._strides
+
+    @property
+    def n_states(self) -> int:
+        return self._n_states
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def index(self, obvs: np.ndarray):
+        """
+            function to turn observations from the environment into indexes for the q-table
+
+            obvs is either a single observation with shape [obs_dim] or a batch of observations (e.g. one
+            per agent) with shape [n_agents, obs_dim]
+
+            returns the index as an int for a single observation or an int array of shape [n_agents] for a batch
+        """
+        coords = np.asarray(obvs).astype(np.int64) - self.low
 
-        return int(index)
+        #observations outside of the bounds would map onto the index of another state
+        if np.any((coords < 0) | (coords >= self.dims)):
+            raise ValueError(f'Observation {obvs} is outside of the observation bounds.')
 
+        indexes = coords @ self.strides
 
+        return int(indexes) if np.ndim(indexes) == 0 else indexes
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import importlib
+
+#-----------------------------------------------------------------------------------------------
+# Variables
+#-----------------------------------------------------------------------------------------------
+
+#module, class and required constructor arguments of each algorithm by name, modules are only imported when an
+#algorithm is first used so those which do not need tensorflow (e.g. q_learning) start without importing it
+ALGORITHMS = {
+    "q_learning": {"module": "algorithms.qlearning", "class": "QLearning", "args": ("n_states", "n_actions")},
+    "multi_agent_q_learning": {"module": "algorithms.qlearning", "class": "MultiAgentQLearning", "args": ("n_agents", "n_states", "n_actions")},
+    "dqn": {"module": "algorithms.dqn", "class": "DQN", "args": ("n_obvs", "n_actions")},
+    "ddrqn": {"module": "algorithms.ddrqn", "class": "DDRQN", "args": ("n_obvs", "n_actions")},
+    "policy_grad": {"module": "algorithms.policy_grad", "class": "PolicyGradient", "args": ("n_obvs", "n_actions")},
+    "actor_critic": {"module": "algorithms.actor_critic", "class": "ActorCritic", "args": ("n_obvs", "n_actions")},
+    "ddpg": {"module": "algorithms.ddpg", "class": "DDPG", "args": ("n_obvs", "n_actions", "action_high", "action_low")},
+    "ma_actor_critic": {"module": "algorithms.ma_actor_critic", "class": "MAActorCritic", "args": ("n_obvs", "n_actions")},
+}
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def register_algorithm(name: str, module: str, class_name: str, args: tuple):
+    """
+        function to add an algorithm to the registry, replacing any algorithm of the same name
+
+        name is the name the algorithm is made by
+
+        module is the name of the module of the algorithm, only imported when the algorithm is first used
+
+        class_name is the name of the class of the algorithm in module
+
+        args is a tuple of the names of the constructor arguments the algorithm requires
+    """
+    ALGORITHMS[name] = {"module": module, "class": class_name, "args": tuple(args)}
+
+def get_algorithm(name: str):
+    """
+        function to get the class of an algorithm, importing its module on first use
+
+        name is the name of the algorithm in the registry
+
+        returns the class of the algorithm
+    """
+    if name not in ALGORITHMS:
+        raise ValueError(f'Unknown algorithm {name}, must be one of {", ".join(ALGORITHMS)}.')
+
+    spec = ALGORITHMS[name]
+
+    return getattr(importlib.import_module(spec["module"]), spec["class"])
+
+def make_algorithm(name: str, **kwargs):
+    """
+        function to make an algorithm from the registry by name
+
+        name is the name of the algorithm in the registry
+
+        kwargs are the keyword arguments of the constructor of the algorithm, they must include the arguments it
+        requires (e.g. n_obvs and n_actions)
+
+        returns the algorithm object
+    """
+    if name not in ALGORITHMS:
+        raise ValueError(f'Unknown algorithm {name}, must be one of {", ".join(ALGORITHMS)}.')
+
+    #missing arguments are checked before the module (and possibly tensorflow) is imported
+    missing = [arg for arg in ALGORITHMS[name]["args"] if arg not in kwargs]
+    if missing:
+        raise TypeError(f'Algorithm {name} requires the arguments {", ".join(missing)}.')
+
+    return get_algorithm(name)(**kwargs)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import numpy as np
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def discounted_returns(rewards: np.ndarray, gamma: float, dones: np.ndarray=None, bootstrap: np.ndarray=None) -> np.ndarray:
+    """
+        function to calculate the discounted sum of future rewards at every time step
+
+        rewards is an array of rewards with shape [agents, time] (or [time] for a single agent)
+
+        gamma is the discount factor of future rewards
+
+        dones is an array of the same shape as rewards which is True at the last time step of an episode,
+        returns are not carried across these episode boundaries. If None no episode ends within the rewards
+
+        bootstrap is an array of values with shape [agents] used as the return after the last time step
+        (e.g. critic value of the final observation). If None the return after the last time step is 0
+
+        returns an array of the discounted returns with the same shape as rewards
+    """
+    rewards, dones, bootstrap, squeeze = _prepare(rewards, dones, bootstrap)
+
+    returns = _reverse_scan(gamma * (1.0 - dones), rewards, bootstrap)
+
+    return returns[0] if squeeze else returns
+
+def n_step_returns(rewards: np.ndarray, values: np.ndarray, gamma: float, n: int, dones: np.ndarray=None, bootstrap: np.ndarray=None) -> np.ndarray:
+    """
+        function to calculate the n-step returns at every time step, the discounted sum of the next n rewards
+        plus the discounted value of the observation n time steps ahead
+
+        rewards is an array of rewards with shape [agents, time] (or [time] for a single agent)
+
+        values is an array of the values of the observations at each time step with the same shape as rewards
+
+        gamma is the discount factor of future rewards
+
+        n is the number of time steps of rewards summed before bootstrapping from the value
+
+        dones is an array of the same shape as rewards which is True at the last time step of an episode,
+        returns are not carried across these episode boundaries. If None no episode ends within the rewards
+
+        bootstrap is an array of values with shape [agents] of the observation after the last time step.
+        If None the value after the last time step is 0
+
+        returns an array of the n-step returns with the same shape as rewards
+    """
+    if n < 1:
+        raise ValueError("n (number of steps) must be at least 1.")
+
+    rewards, dones, bootstrap, squeeze = _prepare(rewards, dones, bootstrap)
+    values = np.asarray(values, dtype=np.float64).reshape(rewards.shape)
+    time_steps = rewards.shape[-1]
+
+    #value of the observation after each time step
+    next_values = np.concatenate((values[:, 1:], bootstrap[:, None]), axis=1)
+
+    t = np.arange(time_steps)
+    returns = np.zeros_like(rewards)
+    discount = np.ones_like(rewards)
+
+    #loop over the (small) horizon only, each iteration is vectorised across agents and time
+    for k in range(n):
+        returns += discount * _shift(rewards, k)
+        discount *= gamma * (1.0 - _shift(dones, k))
+
+        #bootstrap from the next value where the horizon or the end of the data is reached
+        last = (t + k == time_steps - 1) | (k == n - 1)
+        returns += np.where(last, discount * _shift(next_values, k), 0.0)
+        discount = np.where(last, 0.0, discount)
+
+    return returns[0] if squeeze else returns
+
+def gae(rewards: np.ndarray, values: np.ndarray, gamma: float, lam: float=0.95, dones: np.ndarray=None, bootstrap: np.ndarray=None, truncated: np.ndarray=None, truncated_values: np.ndarray=None) -> tuple:
+    """
+        function to calculate the generalised advantage estimate (GAE) at every time step as proposed by
+        Schulman et al in "High-Dimensional Continuous Control Using Generalized Advantage Estimation"
+
+        rewards is an array of rewards with shape [agents, time] (or [time] for a single agent)
+
+        values is an array of the values of the observations at each time step with the same shape as rewards
+
+        gamma is the discount factor of future rewards
+
+        lam is the lambda parameter trading off bias (0, one-step TD) and variance (1, Monte Carlo)
+
+        dones is an array of the same shape as rewards which is True at the last time step of an episode,
+        advantages are not carried across these episode boundaries. If None no episode ends within the rewards
+
+        bootstrap is an array of values with shape [agents] of the observation after the last time step.
+        If None the value after the last time step is 0
+
+        truncated is an array of the same shape as rewards which is True at the last time step of an episode cut short
+        (e.g. by a time limit) rather than ended by reaching a terminal state, these time steps must also be done. If
+        None no episode is truncated
+
+        truncated_values is an array of the values of the last observation of each truncated episode, which their
+        returns are bootstrapped from, in the order of the time steps where truncated is True (row by row for
+        multiple agents)
+
+        returns a tuple (advantages, lambda_returns) both with the same shape as rewards
+    """
+    rewards, dones, bootstrap, squeeze = _prepare(rewards, dones, bootstrap)
+    values = np.asarray(values, dtype=np.float64).reshape(rewards.shape)
+
+    #value of the observation after each time step
+    next_values = np.concatenate((values[:, 1:], bootstrap[:, None]), axis=1)
+
+    if truncated is not None:
+        #truncated episodes are bootstrapped from the value of their last observation, as the next observation in
+        #the rewards is of the next episode, while advantages are still not carried across the episode boundary
+        truncated = np.asarray(truncated, dtype=bool).reshape(rewards.shape)
+        dones = np.where(truncated, 1.0, dones)
+        rewards = rewards.copy()
+        rewards[truncated] += gamma * np.asarray(truncated_values, dtype=np.float64).reshape(-1)
+
+    #one-step temporal difference errors
+    deltas = rewards + gamma * (1.0 - dones) * next_values - values
+    advantages = _reverse_scan(gamma * lam * (1.0 - dones), deltas, np.zeros(rewards.shape[0]))
+    lambda_returns = advantages + values
+
+    if squeeze:
+        return advantages[0], lambda_returns[0]
+
+    return advantages, lambda_returns
+
+def _prepare(rewards: np.ndarray, dones: np.ndarray, bootstrap: np.ndarray) -> tuple:
+    """
+        function to convert the inputs of the return functions into 2D float arrays of shape [agents, time]
+
+        returns a tuple (rewards, dones, bootstrap, squeeze) where squeeze is True if rewards was 1D
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    squeeze = rewards.ndim == 1
+    rewards = np.atleast_2d(rewards)
+
+    if rewards.ndim != 2:
+        raise ValueError("rewards must have shape [time] or [agents, time].")
+
+    if dones is None:
+        dones = np.zeros_like(rewards)
+    else:
+        dones = np.asarray(dones, dtype=np.float64).reshape(rewards.shape)
+
+    if bootstrap is None:
+        bootstrap = np.zeros(rewards.shape[0])
+    else:
+        bootstrap = np.asarray(bootstrap, dtype=np.float64).reshape(rewards.shape[0])
+
+    return rewards, dones, bootstrap, squeeze
+
+def _shift(x: np.ndarray, k: int) -> np.ndarray:
+    """
+        function to shift an array k time steps back along the last axis, i.e. out[..., t] = x[..., t + k],
+        padding with zeros past the end
+    """
+    if k == 0:
+        return x
+
+    out = np.zeros_like(x)
+    out[..., :-k] = x[..., k:]
+
+    return out
+
+def _reverse_scan(coeffs: np.ndarray, inputs: np.ndarray, init: np.ndarray) -> np.ndarray:
+    """
+        function to solve the linear recurrence y[t] = inputs[t] + coeffs[t] * y[t + 1] backwards along the last axis,
+        with y[T] = init
+
+        uses recursive doubling so only log2(T) vectorised operations are performed instead of a loop over every
+        time step, all coefficients are products of values in [0, 1] so the result is numerically stable
+    """
+    a = np.array(coeffs, dtype=np.float64)
+    b = np.array(inputs, dtype=np.float64)
+    time_steps = b.shape[-1]
+
+    #after each iteration b[t] is the sum over the next 2 * span steps and a[t] is the product of their coefficients
+    span = 1
+    while span < time_steps:
+        b[..., :-span] += a[..., :-span] * b[..., span:]
+        a[..., :-span] *= a[..., span:]
+        span *= 2
+
+    #a[t] is now the product of all coefficients from t to the end
+    return b + a * init[..., None]
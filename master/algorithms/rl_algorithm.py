@@ -1,13 +1,310 @@
 #!/usr/bin/env python3
 
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os
+import cProfile
+import functools
+import pstats
+import time
+import tracemalloc
+
 from abc import ABC, abstractmethod
 
+from algorithms.checkpoint import _atomic_write
+
+#-----------------------------------------------------------------------------------------------
+# Variables
+#-----------------------------------------------------------------------------------------------
+
+#methods of every algorithm wrapped so they can be profiled
+PROFILED_METHODS = ("get_action", "train")
+
+#samplers a Profiler can run on every n calls
+SAMPLERS = ("cprofile", "tracemalloc")
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def _profiled(name: str, fn):
+    """
+        function to wrap a method so its calls are recorded by the profiler of the algorithm, when profiling is not
+        enabled the cost is a single attribute lookup
+
+        name is the name the calls of the method are recorded under
+
+        fn is the method
+
+        returns the wrapped method
+    """
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        profiler = self._profiler
+
+        if profiler is None:
+            return fn(self, *args, **kwargs)
+
+        return profiler.call(name, fn, self, args, kwargs)
+
+    wrapper._profiled = True
+
+    return wrapper
+
+def _escape_label(value) -> str:
+    """
+        function to escape a label value of the Prometheus text exposition format, where backslashes, double quotes
+        and line feeds must be escaped
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class Profiler():
+    """
+        Class to record the number of calls and the time taken by the profiled methods (get_action and train) of an
+        algorithm, with optional sampling of every n calls of each by cProfile or tracemalloc. Metrics are returned by
+        metrics or written as a Prometheus text format file by write_metrics
+    """
+    def __init__(self, sample_every: int=0, sampler: str="cprofile"):
+        """
+            function to initialise the class
+
+            sample_every is the number of calls of each method between calls sampled by the sampler, 0 to only count
+            and time calls
+
+            sampler is the name of the sampler, "cprofile" to profile the functions called or "tracemalloc" to measure
+            the peak python memory allocated
+        """
+        if sample_every < 0:
+            raise ValueError("Sample interval cannot be negative.")
+
+        if sampler not in SAMPLERS:
+            raise ValueError(f'Unknown sampler {sampler}, must be one of {", ".join(SAMPLERS)}.')
+
+        self._sample_every = sample_every
+        self._sampler = sampler
+
+        #calls, timed calls, seconds, max seconds, sampled calls and sampled peak bytes of each method
+        self._calls = {}
+        self._timed_calls = {}
+        self._seconds = {}
+        self._max_seconds = {}
+        self._sampled_calls = {}
+        self._peak_bytes = {}
+
+        #methods being called, so calls of a method through super() are recorded once
+        self._active = set()
+        self._profile = cProfile.Profile() if sampler == "cprofile" else None
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def sample_every(self) -> int:
+        return self._sample_every
+
+    @property
+    def sampler(self) -> str:
+        return self._sampler
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def call(self, name: str, fn, obj, args: tuple, kwargs: dict):
+        """
+            function to call a method and record the call, sampled calls are not timed as the sampler slows them
+
+            name is the name the call is recorded under
+
+            fn is the (unwrapped) method called with obj, args and kwargs
+
+            returns the result of the method
+        """
+        if name in self._active:
+            return fn(obj, *args, **kwargs)
+
+        self._active.add(name)
+
+        try:
+            calls = self._calls.get(name, 0) + 1
+            self._calls[name] = calls
+
+            if self.sample_every and calls % self.sample_every == 0:
+                return self._sample(name, fn, obj, args, kwargs)
+
+            start_time = time.perf_counter()
+            result = fn(obj, *args, **kwargs)
+            elapsed = time.perf_counter() - start_time
+
+            self._timed_calls[name] = self._timed_calls.get(name, 0) + 1
+            self._seconds[name] = self._seconds.get(name, 0.0) + elapsed
+            self._max_seconds[name] = max(self._max_seconds.get(name, 0.0), elapsed)
+
+            return result
+        finally:
+            self._active.discard(name)
+
+    def metrics(self) -> dict:
+        """
+            function to get the metrics recorded of each method
+
+            returns a dict of a dict of each method of calls, timed_calls, seconds (total of the timed calls),
+            mean_seconds, max_seconds, sampled_calls and peak_bytes (total peak bytes of the calls sampled by
+            tracemalloc)
+        """
+        metrics = {}
+        for name, calls in self._calls.items():
+            timed_calls = self._timed_calls.get(name, 0)
+            seconds = self._seconds.get(name, 0.0)
+
+            metrics[name] = {
+                "calls": calls,
+                "timed_calls": timed_calls,
+                "seconds": seconds,
+                "mean_seconds": seconds / timed_calls if timed_calls else 0.0,
+                "max_seconds": self._max_seconds.get(name, 0.0),
+                "sampled_calls": self._sampled_calls.get(name, 0),
+                "peak_bytes": self._peak_bytes.get(name, 0),
+            }
+
+        return metrics
+
+    def prometheus(self, labels: dict=None) -> str:
+        """
+            function to get the metrics in the Prometheus text exposition format
+
+            labels is a dict of labels added to every metric (e.g. {"algorithm": "DQN", "agent": 0})
+
+            returns the metrics as a string
+        """
+        labels = labels or {}
+        metrics = self.metrics()
+
+        #each family is (name, type, help, samples) where samples are the (suffix, field) of each sample of a method
+        families = (
+            ("rl_algorithm_calls_total", "counter", "Number of calls of a method of an algorithm.", (("", "calls"),)),
+            ("rl_algorithm_call_seconds", "summary", "Seconds taken by the timed (not sampled) calls of a method.", (("_sum", "seconds"), ("_count", "timed_calls"))),
+            ("rl_algorithm_call_seconds_max", "gauge", "Maximum seconds taken by a timed call of a method.", (("", "max_seconds"),)),
+            ("rl_algorithm_sampled_calls_total", "counter", "Number of calls of a method sampled by the sampler.", (("", "sampled_calls"),)),
+            ("rl_algorithm_sampled_peak_bytes_sum", "counter", "Total peak python memory allocated by the calls of a method sampled by tracemalloc.", (("", "peak_bytes"),)),
+        )
+
+        lines = []
+        for family, kind, description, samples in families:
+            lines.append(f'# HELP {family} {description}')
+            lines.append(f'# TYPE {family} {kind}')
+
+            for name, values in metrics.items():
+                label_str = ",".join(f'{key}="{_escape_label(value)}"' for key, value in {**labels, "method": name}.items())
+
+                for suffix, field in samples:
+                    lines.append(f'{family}{suffix}{{{label_str}}} {values[field]}')
+
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path: str, labels: dict=None):
+        """
+            function to write the metrics as a Prometheus text format file (e.g. for the textfile collector of the
+            node exporter), the file is replaced atomically so it is never read partly written
+
+            path is a string of the path to the file
+
+            labels is a dict of labels added to every metric
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        text = self.prometheus(labels)
+        _atomic_write(path, lambda handle: handle.write(text.encode()))
+
+    def stats(self) -> pstats.Stats:
+        """
+            function to get the statistics of the calls sampled by cProfile
+
+            returns a pstats.Stats, None if no calls have been sampled by cProfile
+        """
+        if self._profile is None or not any(self._sampled_calls.values()):
+            return None
+
+        return pstats.Stats(self._profile)
+
+    def dump_stats(self, path: str):
+        """
+            function to write the statistics of the calls sampled by cProfile to a file readable by pstats (or viewers
+            such as snakeviz), nothing is written if no calls have been sampled by cProfile
+
+            path is a string of the path to the file
+        """
+        if self.stats() is not None:
+            self._profile.dump_stats(path)
+
+    def reset(self):
+        """
+            function to reset every metric and the sampled statistics to 0
+        """
+        for values in (self._calls, self._timed_calls, self._seconds, self._max_seconds, self._sampled_calls, self._peak_bytes):
+            values.clear()
+
+        if self._profile is not None:
+            self._profile = cProfile.Profile()
+
+    def _sample(self, name: str, fn, obj, args: tuple, kwargs: dict):
+        """
+            function to call a method with the sampler running
+
+            returns the result of the method
+        """
+        self._sampled_calls[name] = self._sampled_calls.get(name, 0) + 1
+
+        if self.sampler == "cprofile":
+            return self._profile.runcall(fn, obj, *args, **kwargs)
+
+        #tracemalloc is only stopped afterwards if it was started here, so it can also be used by the caller
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+
+        try:
+            return fn(obj, *args, **kwargs)
+        finally:
+            self._peak_bytes[name] = self._peak_bytes.get(name, 0) + tracemalloc.get_traced_memory()[1] - start
+
+            if not tracing:
+                tracemalloc.stop()
+
 class RLAlgorithm(ABC):
     """
         Base class for all rl algorithms
 
-        provides base properties and abstract methods required by all rl algorithms
+        provides base properties and abstract methods required by all rl algorithms, and opt-in profiling of the 
+        get_action and train methods of every subclass (see enable_profiling)
     """
+    #profiler of the algorithm, None unless profiling is enabled
+    _profiler = None
+
+    def __init_subclass__(cls, **kwargs):
+        """
+            function to wrap the profiled methods defined by each subclass so they can be profiled without changing 
+            their code
+        """
+        super().__init_subclass__(**kwargs)
+
+        for name in PROFILED_METHODS:
+            fn = cls.__dict__.get(name)
+
+            #static methods and methods already wrapped are left as they are
+            if callable(fn) and not isinstance(fn, (staticmethod, classmethod)) and not getattr(fn, "_profiled", False):
+                setattr(cls, name, _profiled(name, fn))
 
     #-------------------------------------------------------------------------------------------
     # Properties
@@ -64,16 +361,72 @@ class RLAlgorithm(ABC):
             raise TypeError("n_actions (number of actions) must be an integer.")
         self._n_actions = val
 
+    @property
+    def profiler(self) -> Profiler:
+        #profiler of the get_action and train methods, None unless profiling is enabled
+        return self._profiler
+
     #-------------------------------------------------------------------------------------------
     # Methods
     #-------------------------------------------------------------------------------------------
 
+    def enable_profiling(self, sample_every: int=0, sampler: str="cprofile") -> Profiler:
+        """
+            function to start recording the number of calls and the time taken by get_action and train, replacing any
+            profiler already enabled
+
+            sample_every is the number of calls of each method between calls sampled by the sampler, 0 to only count
+            and time calls
+
+            sampler is the name of the sampler, "cprofile" to profile the functions called or "tracemalloc" to measure
+            the peak python memory allocated
+
+            returns the Profiler the calls are recorded by
+        """
+        self._profiler = Profiler(sample_every=sample_every, sampler=sampler)
+
+        return self._profiler
+
+    def disable_profiling(self):
+        """
+            function to stop recording calls, the metrics of the profiler are kept by the Profiler returned by
+            enable_profiling
+        """
+        self._profiler = None
+
+    def profile_metrics(self) -> dict:
+        """
+            function to get the metrics recorded of get_action and train (see Profiler.metrics)
+
+            returns a dict of the metrics of each method, empty if profiling is not enabled
+        """
+        return {} if self.profiler is None else self.profiler.metrics()
+
+    def write_profile_metrics(self, path: str, labels: dict=None):
+        """
+            function to write the metrics recorded of get_action and train as a Prometheus text format file
+
+            path is a string of the path to the file
+
+            labels is a dict of labels added to every metric, the name of the class of the algorithm is added as the 
+            algorithm label
+        """
+        if self.profiler is None:
+            raise RuntimeError("Profiling must be enabled to write profile metrics.")
+
+        self.profiler.write_metrics(path, labels={"algorithm": type(self).__name__, **(labels or {})})
+
     @abstractmethod
-    def save_model(self, path: str):
+    def save_model(self, path: str, step: int=0, writer=None):
         """
-            function to save the model (neural net or q-table) to a file
+            function to save the model (neural net weights or q-table) as a checkpoint (see algorithms.checkpoint)
+
+            path is a string of the path to the checkpoint directory where the model will be saved
+
+            step is the training step (e.g. episode) the checkpoint is taken at
 
-            path is a string of the path to the file where the model will be saved
+            writer is a CheckpointWriter to write the checkpoint on a background thread, if None the checkpoint
+            is written before returning
         """
         raise NotImplementedError("save_model method must be implemented.")
 
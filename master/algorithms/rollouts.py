@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os
+import logging
+import time
+import numpy as np
+import cloudpickle
+
+from algorithms.workers import WorkerPool, run_worker
+from algorithms.trajectory import TrajectoryRecorder
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def run_rollouts(workers, agent, train_fn=None, episodes: int=100, time_steps: int=10000, rollout_len: int=None, recorder: TrajectoryRecorder=None):
+    """
+        function to train an on-policy agent on trajectories collected in parallel by RolloutWorkers, each update
+        trains on the stacked trajectories of every worker at once and the new weights are then sent to every worker
+
+        workers is the RolloutWorkers object, its policy must already be set
+
+        agent is the agent trained, it must have get_checkpoint and (unless train_fn is given) train_batch methods
+
+        train_fn is a function which trains the agent on a list of trajectories and returns the loss, if None
+        agent.train_batch is used
+
+        episodes is the number of episodes to simulate (summed over the workers)
+
+        time steps is the maximum number of time steps per episode
+
+        rollout_len is the number of time steps each worker collects per update, if None each worker collects
+        one whole episode per update
+
+        recorder is a TrajectoryRecorder the time steps are written to instead of being returned, so the memory held
+        is bounded however long the run
+
+        returns obvs, actions, rewards and losses of the agent and time of each episode in seconds
+    """
+    train_fn = train_fn or agent.train_batch
+
+    #init arrays to collect data
+    all_times = []
+    all_obvs = []
+    all_actions = []
+    all_rewards = []
+    all_losses = []
+
+    #robot-maze env can save the path taken by the agents each episode
+    robot_paths = []
+
+    #episodes may span rollouts so the unfinished episode of each worker is kept
+    ep_obvs = [[] for w in range(workers.n_workers)]
+    ep_actions = [[] for w in range(workers.n_workers)]
+    ep_rewards = np.zeros(workers.n_workers)
+    start_times = np.full(workers.n_workers, time.time())
+    ep_lengths = np.zeros(workers.n_workers, dtype=int)
+    #episodes of different workers overlap so they are recorded with indexes in the order they started
+    ep_indexes = np.arange(workers.n_workers)
+
+    workers.set_weights(agent.get_checkpoint())
+
+    while len(all_rewards) < episodes:
+        trajectories = workers.rollout(rollout_len, time_steps)
+
+        for w, trajectory in enumerate(trajectories):
+            ends = np.flatnonzero(trajectory["dones"]) + 1
+            infos = iter(trajectory["infos"])
+
+            #split the trajectory at the end of each episode
+            for obvs, actions, rewards, end in zip(np.split(trajectory["obvs"], ends), np.split(trajectory["actions"], ends), np.split(trajectory["rewards"], ends), np.append(ends, -1)):
+                info = next(infos) if end >= 0 else None
+                #only the last time step of an episode which reached a terminal state is done
+                done = info is not None and not info["timeout"]
+
+                if recorder is None:
+                    ep_obvs[w].extend(obvs)
+                    ep_actions[w].extend(actions)
+                else:
+                    for k in range(len(actions)):
+                        recorder.record(ep_indexes[w], ep_lengths[w] + k, obvs[k], actions[k], rewards[k], done and k == len(actions) - 1)
+
+                ep_lengths[w] += len(actions)
+                ep_rewards[w] += np.sum(rewards)
+
+                if info is None:
+                    #remainder of the trajectory is an unfinished episode
+                    continue
+
+                e = len(all_rewards)
+
+                if info["timeout"]:
+                    logging.info("Episode %u timed out, with total reward = %f", e, ep_rewards[w])
+                else:
+                    logging.info("Episode %u completed, after %u time steps, with total reward = %f", e, ep_lengths[w] - 1, ep_rewards[w])
+
+                all_times.append(round((time.time() - start_times[w]), 3))
+                all_obvs.append(ep_obvs[w])
+                all_actions.append(ep_actions[w])
+                all_rewards.append(float(ep_rewards[w]))
+
+                if "robot_path" in info:
+                    robot_paths.append(info["robot_path"])
+
+                ep_obvs[w] = []
+                ep_actions[w] = []
+                ep_rewards[w] = 0.0
+                start_times[w] = time.time()
+                ep_lengths[w] = 0
+                ep_indexes[w] = np.max(ep_indexes) + 1
+
+        loss = train_fn(trajectories)
+        all_losses.append(loss)
+
+        workers.set_weights(agent.get_checkpoint())
+
+    return all_obvs, all_actions, all_rewards, all_losses, robot_paths, all_times
+
+def _worker(remote, env_fn: bytes, n_threads: int):
+    """
+        function run by each worker process of a RolloutWorkers, steps its env with actions sampled from its copy of
+        the policy on commands received from remote and sends back the collected trajectories
+
+        remote is the worker end of the pipe to the RolloutWorkers
+
+        env_fn is the function which creates the env of this worker, pickled with cloudpickle
+
+        n_threads is the number of threads tensorflow uses for each op in this worker
+    """
+    def serve(stack):
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(n_threads)
+        tf.random.set_seed(np.random.randint(2 ** 31))
+
+        env = cloudpickle.loads(env_fn)()
+        stack.callback(env.close)
+
+        policy = None
+        obv = env.reset()
+        ep_steps = 0
+
+        remote.send((env.observation_space, env.action_space))
+
+        while True:
+            cmd, data = remote.recv()
+
+            if cmd == "policy":
+                policy = cloudpickle.loads(data)()
+                remote.send(None)
+            elif cmd == "weights":
+                policy.set_checkpoint(data)
+                remote.send(None)
+            elif cmd == "rollout":
+                n_steps, time_limit = data
+                obvs, actions, rewards, dones, infos = [], [], [], [], []
+                truncated, truncated_obvs = [], []
+
+                while n_steps is None or len(actions) < n_steps:
+                    action = int(policy.act_step(np.array([obv], dtype=np.float32))[0])
+                    next_obv, reward, done, info = env.step(action)
+                    ep_steps += 1
+
+                    obvs.append(obv)
+                    actions.append(action)
+                    rewards.append(reward)
+                    obv = next_obv
+
+                    timeout = not done and time_limit is not None and ep_steps >= time_limit
+                    dones.append(done or timeout)
+                    truncated.append(timeout)
+
+                    if timeout:
+                        #last observation of an episode cut short by the time limit, to bootstrap it from
+                        truncated_obvs.append(next_obv)
+
+                    if done or timeout:
+                        info = dict(info)
+                        info["timeout"] = timeout
+                        infos.append(info)
+
+                        obv = env.reset()
+                        ep_steps = 0
+
+                        #a rollout of whole episodes ends with the episode
+                        if n_steps is None:
+                            break
+
+                remote.send({
+                    "obvs": np.array(obvs, dtype=np.float32),
+                    "actions": np.array(actions, dtype=np.int32),
+                    "rewards": np.array(rewards, dtype=np.float32),
+                    "dones": np.array(dones, dtype=bool),
+                    "truncated": np.array(truncated, dtype=bool),
+                    "truncated_obvs": np.array(truncated_obvs, dtype=np.float32).reshape((len(truncated_obvs),) + np.shape(obv)),
+                    #observation after the last time step, to bootstrap an unfinished episode from
+                    "next_obv": np.array(obv, dtype=np.float32),
+                    "infos": infos,
+                })
+            elif cmd == "close":
+                break
+
+    #every worker explores independently
+    run_worker(remote, "Rollout worker", serve, reseed=True)
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class RolloutWorkers(WorkerPool):
+    """
+        Class of worker processes which each hold a copy of a gym env and of the policy of an on-policy agent, and
+        collect trajectories (whole episodes or fixed length segments) in parallel with the latest weights of the
+        policy. Passing a RolloutWorkers in place of the env to the single agent policy gradient and actor critic
+        runners trains the agent on the trajectories of every worker in one batched update
+    """
+    def __init__(self, env_fns: list, n_threads: int=None, start_method: str="spawn"):
+        """
+            function to initialise the class
+
+            env_fns is a list of functions which each return a new gym env (e.g. lambda: gym.make(...)), one per
+            worker, they are pickled with cloudpickle so can be lambdas
+
+            n_threads is the number of threads tensorflow uses for each op in each worker, if None the cores are
+            divided between the workers
+
+            start_method is the multiprocessing start method of the workers, spawn by default as tensorflow is not
+            safe to fork once its runtime has started
+        """
+        if len(env_fns) < 1:
+            raise ValueError("RolloutWorkers must have at least 1 worker.")
+
+        n_threads = n_threads or max(1, (os.cpu_count() or 1) // len(env_fns))
+
+        super(RolloutWorkers, self).__init__()
+
+        try:
+            self.start_workers(_worker, [(cloudpickle.dumps(env_fn), n_threads) for env_fn in env_fns], start_method=start_method)
+
+            #spaces are sent by the workers so no env is created in this process
+            self._observation_space, self._action_space = [self._recv(remote) for remote in self._remotes][0]
+        except Exception:
+            self.close()
+            raise
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def observation_space(self):
+        return self._observation_space
+
+    @property
+    def action_space(self):
+        return self._action_space
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def set_policy(self, policy_fn):
+        """
+            function to create the copy of the policy of every worker
+
+            policy_fn is a function which returns a new agent (e.g. functools.partial(ActorCritic, n_obvs, n_actions)),
+            which must have act_step and set_checkpoint methods, it is pickled with cloudpickle so can be a lambda
+        """
+        self._broadcast(("policy", cloudpickle.dumps(policy_fn)))
+
+    def set_weights(self, arrays: dict):
+        """
+            function to send the weights of the policy to every worker
+
+            arrays is a dict of the weights (as returned by get_checkpoint of the agent)
+        """
+        self._broadcast(("weights", arrays))
+
+    def rollout(self, n_steps: int=None, time_limit: int=None) -> list:
+        """
+            function to collect a trajectory from every worker in parallel, the env of each worker is reset as soon as
+            its episode ends so episodes continue across rollouts of segments
+
+            n_steps is the number of time steps of each trajectory, if None each trajectory is one whole episode
+
+            time_limit is the maximum number of time steps of an episode before it is ended (timed out), if None
+            episodes only end when the env is done
+
+            returns a list of the trajectory of each worker, a dict of obvs, actions, rewards, dones and truncated
+            arrays with a leading [time] dimension (dones is True at the last time step of each episode, including
+            timeouts, truncated only at timeouts), the truncated_obvs of the last observation of each timed out
+            episode, the next_obv after the last time step and the info dict of the last time step of each episode
+        """
+        return self._broadcast(("rollout", (n_steps, time_limit)))
+
+    def render(self):
+        """
+            function to render the env, envs of rollout workers cannot be rendered
+        """
+        raise ValueError("Envs of rollout workers cannot be rendered.")
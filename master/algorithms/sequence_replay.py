@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import numpy as np
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class SequenceReplay():
+    """
+        Class to contain a replay memory of transitions for recurrent networks which samples overlapping fixed
+        length windows of consecutive time steps, along with the recurrent (LSTM) state at the start of each window
+
+        transitions are held in preallocated ring buffers so adding and sampling never copies the whole memory,
+        windows are sampled in the same way as R2D2 (Kapturowski et al) with the first burn_in steps of each window
+        only used to warm up the recurrent state before the remaining steps are trained on
+    """
+    def __init__(self, capacity: int, n_obvs: int, hidden_size: int, seq_len: int, burn_in: int=0):
+        """
+            function to initialise the class
+
+            capacity is the maximum number of transitions held, the oldest are overwritten once full
+
+            n_obvs is the size of the observations
+
+            hidden_size is the size of the recurrent state (h and c each have this size)
+
+            seq_len is the number of time steps of each window which are trained on
+
+            burn_in is the number of time steps before these used to warm up the recurrent state
+        """
+        if seq_len < 1:
+            raise ValueError("seq_len (sequence length) must be at least 1.")
+
+        if burn_in < 0:
+            raise ValueError("burn_in (burn in length) cannot be negative.")
+
+        if capacity < seq_len + burn_in:
+            raise ValueError("capacity must be at least the window length (seq_len + burn_in).")
+
+        self._capacity = capacity
+        self._seq_len = seq_len
+        self._burn_in = burn_in
+
+        #index of the next transition to be written and number of transitions held
+        self._index = 0
+        self._size = 0
+        #episode each transition belongs to so windows are masked at episode boundaries
+        self._episode = 0
+
+        self._obvs = np.zeros((capacity, n_obvs), dtype=np.float32)
+        self._actions = np.zeros(capacity, dtype=np.int32)
+        self._rewards = np.zeros(capacity, dtype=np.float32)
+        self._next_obvs = np.zeros((capacity, n_obvs), dtype=np.float32)
+        self._dones = np.zeros(capacity, dtype=np.float32)
+        self._episodes = np.zeros(capacity, dtype=np.int64)
+        #recurrent state before each observation was fed to the network
+        self._h = np.zeros((capacity, hidden_size), dtype=np.float32)
+        self._c = np.zeros((capacity, hidden_size), dtype=np.float32)
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def seq_len(self) -> int:
+        return self._seq_len
+
+    @property
+    def burn_in(self) -> int:
+        return self._burn_in
+
+    @property
+    def window_len(self) -> int:
+        return self.burn_in + self.seq_len
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, obv: np.ndarray, action: int, reward: float, next_obv: np.ndarray, done: bool, state: tuple=None):
+        """
+            function to add a transition to the memory
+
+            obv is the observation the action was taken in
+
+            action is the action taken
+
+            reward is the reward received after taking the action
+
+            next_obv is the observation after taking the action
+
+            done is whether the episode ended after taking the action
+
+            state is a tuple (h, c) of the recurrent state before obv was fed to the network, if None a zero
+            state is stored (burn in then warms up the state during training)
+        """
+        i = self._index
+
+        self._obvs[i] = obv
+        self._actions[i] = action
+        self._rewards[i] = reward
+        self._next_obvs[i] = next_obv
+        self._dones[i] = done
+        self._episodes[i] = self._episode
+
+        if state is None:
+            self._h[i] = 0.0
+            self._c[i] = 0.0
+        else:
+            self._h[i] = np.reshape(state[0], -1)
+            self._c[i] = np.reshape(state[1], -1)
+
+        self._index = (i + 1) % self.capacity
+        self._size = min(self.size + 1, self.capacity)
+
+        if done:
+            self.end_episode()
+
+    def end_episode(self):
+        """
+            function to mark the end of an episode (e.g. on a time out), transitions added afterwards are not
+            trained on in the same window as earlier transitions
+        """
+        self._episode += 1
+
+    def sample(self, batch_size: int) -> tuple:
+        """
+            function to sample a batch of windows of consecutive transitions
+
+            batch_size is the number of windows
+
+            returns a tuple (obvs, actions, rewards, next_obvs, dones, mask, h, c) where obvs and next_obvs have shape
+            [batch, window_len, n_obvs], actions, rewards, dones and mask have shape [batch, window_len] and h and c
+            are the recurrent states at the start of each window with shape [batch, hidden_size]. mask is 1 for the
+            time steps in the same episode as the start of the window and 0 for time steps after the episode ended
+        """
+        if self.size < self.window_len:
+            raise ValueError("Not enough transitions in memory to sample a window.")
+
+        #windows start at any transition which is followed by window_len - 1 transitions (in time order)
+        oldest = (self._index - self.size) % self.capacity
+        starts = (oldest + np.random.randint(self.size - self.window_len + 1, size=batch_size)) % self.capacity
+        windows = (starts[:, None] + np.arange(self.window_len)) % self.capacity
+
+        mask = (self._episodes[windows] == self._episodes[starts][:, None]).astype(np.float32)
+
+        return self._obvs[windows], self._actions[windows], self._rewards[windows], self._next_obvs[windows], self._dones[windows], mask, self._h[starts], self._c[starts]
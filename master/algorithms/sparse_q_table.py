@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import numpy as np
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class SparseQTable():
+    """
+        Class to contain a Q-table which only stores the rows (action values) of states which have been visited
+
+        states are mapped to rows of a growable contiguous array through an open-addressing hash table
+        with linear probing, rows are initialised to zero on the first visit of a state. The table is indexed
+        in the same way as the equivalent dense numpy array of shape [..., n_states, n_actions]
+    """
+    #marks an unused slot of the hash table
+    EMPTY = -1
+    #multiplier for fibonacci hashing of state keys
+    HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+    #maximum fraction of used hash table slots before the hash table is doubled in size
+    MAX_LOAD = 0.5
+
+    def __init__(self, shape: tuple, capacity: int=1024):
+        """
+            function to initialise the class
+
+            shape is the shape of the equivalent dense q-table, all dimensions except the last index states
+            (e.g. [n_states] or [n_agents, n_states]) and the last dimension is the number of actions
+
+            capacity is the initial number of rows allocated, rounded up to a power of 2
+        """
+        if len(shape) < 2:
+            raise ValueError("shape must have at least 2 dimensions, [n_states, n_actions].")
+
+        self._shape = tuple(int(dim) for dim in shape)
+        self._n_rows = 0
+
+        #row of action values of each visited state and the key of the state each row belongs to
+        capacity = 1 << max(int(capacity) - 1, 1).bit_length()
+        self._values = np.zeros((capacity, self.shape[-1]))
+        self._row_keys = np.full(capacity, self.EMPTY, dtype=np.int64)
+
+        self._init_hash_table(2 * capacity)
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def shape(self) -> tuple:
+        return self._shape
+
+    @property
+    def n_rows(self) -> int:
+        #number of states visited
+        return self._n_rows
+
+    @property
+    def nbytes(self) -> int:
+        return self._values.nbytes + self._row_keys.nbytes + self._keys.nbytes + self._slots.nbytes
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def __getitem__(self, index):
+        """
+            function to get the action values of states, indexed in the same way as a dense q-table
+
+            index is a tuple of the state indexes (ints or int arrays) for all but the last dimension of the
+            q-table, optionally followed by an action index
+        """
+        rows, actions = self._get_rows(index)
+
+        return self._values[(rows,) + actions]
+
+    def __setitem__(self, index, val):
+        """
+            function to set the action values of states, indexed in the same way as a dense q-table
+        """
+        rows, actions = self._get_rows(index)
+
+        self._values[(rows,) + actions] = val
+
+    def __getstate__(self) -> dict:
+        #only the visited rows are pickled so the saved q-table is compact
+        return self.to_arrays()
+
+    def __setstate__(self, state: dict):
+        keys = np.asarray(state["keys"], dtype=np.int64)
+        self.__init__(state["shape"], capacity=max(np.size(keys), 1))
+
+        self._n_rows = np.size(keys)
+        self._row_keys[:self.n_rows] = keys
+        self._values[:self.n_rows] = state["values"]
+        self._place(keys, np.arange(self.n_rows))
+
+    @classmethod
+    def from_arrays(cls, shape: tuple, keys: np.ndarray, values: np.ndarray):
+        """
+            function to create a q-table from its compact representation (as returned by to_arrays)
+
+            shape is the shape of the equivalent dense q-table
+
+            keys is an int array of the flat index of each visited state (unique)
+
+            values is an array of shape [len(keys), n_actions] of the action values of each visited state
+        """
+        table = cls.__new__(cls)
+        table.__setstate__({"shape": shape, "keys": keys, "values": values})
+
+        return table
+
+    def to_arrays(self) -> dict:
+        """
+            function to get the compact representation of the q-table
+
+            returns a dict of {"shape", "keys", "values"} where keys is an int array of the flat index of each
+            visited state and values is an array of their action values
+        """
+        return {"shape": np.array(self.shape), "keys": self._row_keys[:self.n_rows].copy(), "values": self._values[:self.n_rows].copy()}
+
+    def rows(self, keys: np.ndarray, insert: bool=True) -> np.ndarray:
+        """
+            function to get the rows of a batch of states, inserting zero initialised rows for unvisited states
+
+            keys is an int array of the flat indexes of the states
+
+            insert determines whether rows are inserted for unvisited states, if False their row is -1
+
+            returns an int array of the row of each state with the same shape as keys
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+        if insert:
+            self._reserve(np.size(unique_keys))
+
+        rows = np.full(np.size(unique_keys), self.EMPTY, dtype=np.int64)
+        slots = self._hash(unique_keys)
+        pending = np.arange(np.size(unique_keys))
+
+        #probe all pending keys in lockstep until each is found or inserted
+        while np.size(pending) > 0:
+            slot_keys = self._keys[slots[pending]]
+
+            found = slot_keys == unique_keys[pending]
+            rows[pending[found]] = self._slots[slots[pending[found]]]
+
+            empty = slot_keys == self.EMPTY
+            if insert:
+                #several keys may reach the same empty slot, the first claims it and the others probe on
+                claimed = pending[empty][np.unique(slots[pending[empty]], return_index=True)[1]]
+                rows[claimed] = self._insert(slots[claimed], unique_keys[claimed])
+                resolved = found | np.isin(pending, claimed)
+                #keys which reached a slot claimed this iteration must compare against the new key
+                advance = ~(found | empty)
+            else:
+                resolved = found | empty
+                advance = ~resolved
+
+            slots[pending[advance]] = (slots[pending[advance]] + 1) & self._mask
+            pending = pending[~resolved]
+
+        return rows[inverse].reshape(np.shape(keys))
+
+    def _get_rows(self, index) -> tuple:
+        """
+            function to split an index into the rows of the indexed states and the remaining action index
+
+            returns a tuple (rows, action_index)
+        """
+        if not isinstance(index, tuple):
+            index = (index,)
+
+        n_key_dims = len(self.shape) - 1
+        if len(index) < n_key_dims:
+            raise IndexError(f'SparseQTable of shape {self.shape} must be indexed by at least {n_key_dims} state indexes.')
+
+        key_index = index[:n_key_dims]
+
+        if all(np.ndim(i) == 0 for i in key_index):
+            #fast path for a single state
+            row = self._row(self._flat_key(key_index))
+        else:
+            row = self.rows(np.ravel_multi_index(key_index, self.shape[:-1]))
+
+        return row, index[n_key_dims:]
+
+    def _flat_key(self, key_index: tuple) -> int:
+        """
+            function to get the flat index of a single state (as in np.ravel_multi_index)
+        """
+        key = 0
+        for i, dim in zip(key_index, self.shape[:-1]):
+            i = int(i)
+            if i < 0 or i >= dim:
+                raise IndexError(f'index {i} is out of bounds for dimension of size {dim}.')
+            key = key * dim + i
+
+        return key
+
+    def _row(self, key: int) -> int:
+        """
+            function to get the row of a single state, inserting a zero initialised row if the state is unvisited
+        """
+        slot = ((key * self.HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> self._shift
+
+        while True:
+            slot_key = self._keys[slot]
+
+            if slot_key == key:
+                return int(self._slots[slot])
+
+            if slot_key == self.EMPTY:
+                if self._reserve(1):
+                    #hash table was resized so the slot must be found again
+                    return self._row(key)
+
+                return int(self._insert(np.array([slot]), np.array([key]))[0])
+
+            slot = (slot + 1) & self._mask
+
+    def _hash(self, keys: np.ndarray) -> np.ndarray:
+        """
+            function to get the initial hash table slot of each key
+        """
+        #unsigned multiplication wraps modulo 2^64
+        return ((keys.astype(np.uint64) * np.uint64(self.HASH_MULTIPLIER)) >> np.uint64(self._shift)).astype(np.int64)
+
+    def _insert(self, slots: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        """
+            function to insert new states into empty hash table slots, rows must already be reserved
+
+            returns an int array of the new rows
+        """
+        rows = np.arange(self.n_rows, self.n_rows + np.size(keys))
+
+        self._keys[slots] = keys
+        self._slots[slots] = rows
+        self._row_keys[rows] = keys
+        self._n_rows += np.size(keys)
+
+        return rows
+
+    def _reserve(self, n: int) -> bool:
+        """
+            function to ensure there is space for n more rows without exceeding the maximum hash table load
+
+            returns True if the hash table was resized
+        """
+        required = self.n_rows + n
+
+        #rows array is doubled in size until large enough
+        if required > np.shape(self._values)[0]:
+            capacity = np.shape(self._values)[0]
+            while required > capacity:
+                capacity *= 2
+
+            values = np.zeros((capacity, self.shape[-1]))
+            values[:self.n_rows] = self._values[:self.n_rows]
+            row_keys = np.full(capacity, self.EMPTY, dtype=np.int64)
+            row_keys[:self.n_rows] = self._row_keys[:self.n_rows]
+            self._values, self._row_keys = values, row_keys
+
+        if required <= self.MAX_LOAD * np.size(self._keys):
+            return False
+
+        #hash table is doubled in size until under the maximum load then all states are rehashed
+        size = np.size(self._keys)
+        while required > self.MAX_LOAD * size:
+            size *= 2
+
+        self._init_hash_table(size)
+        self._place(self._row_keys[:self.n_rows], np.arange(self.n_rows))
+
+        return True
+
+    def _place(self, keys: np.ndarray, rows: np.ndarray):
+        """
+            function to add states which are known to be unique and absent from the hash table to existing rows
+        """
+        slots = self._hash(keys)
+        pending = np.arange(np.size(keys))
+
+        while np.size(pending) > 0:
+            empty = self._keys[slots[pending]] == self.EMPTY
+
+            #first key to reach each empty slot takes it, the others compare against it next iteration
+            placed = pending[empty][np.unique(slots[pending[empty]], return_index=True)[1]]
+            self._keys[slots[placed]] = keys[placed]
+            self._slots[slots[placed]] = rows[placed]
+
+            slots[pending[~empty]] = (slots[pending[~empty]] + 1) & self._mask
+            pending = pending[~np.isin(pending, placed)]
+
+    def _init_hash_table(self, size: int):
+        """
+            function to allocate an empty hash table with size slots (a power of 2)
+        """
+        self._keys = np.full(size, self.EMPTY, dtype=np.int64)
+        self._slots = np.full(size, self.EMPTY, dtype=np.int64)
+        self._mask = size - 1
+        self._shift = 64 - (size.bit_length() - 1)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os, sys
+import json
+import itertools
+import logging
+import time
+import traceback
+import multiprocessing
+import numpy as np
+import cloudpickle
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def grid_search(space: dict) -> list:
+    """
+        function to get the trials of a grid search
+
+        space is a dict of the list of values of each hyperparameter
+
+        returns a list of dicts of the hyperparameters of every combination of the values
+    """
+    names = list(space.keys())
+
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+def random_search(space: dict, n_trials: int, seed: int=None) -> list:
+    """
+        function to get the trials of a random search
+
+        space is a dict of the values of each hyperparameter, either a list of values to choose from, a tuple
+        (low, high) to sample uniformly from (ints if both are ints, inclusive of high) or a tuple (low, high, "log")
+        to sample log-uniformly from
+
+        n_trials is the number of trials
+
+        seed is the seed of the random generator, so the same trials can be generated again to resume a sweep
+
+        returns a list of dicts of the sampled hyperparameters of each trial
+    """
+    rng = np.random.default_rng(seed)
+    trials = []
+
+    for i in range(n_trials):
+        params = {}
+
+        for name, values in space.items():
+            if isinstance(values, list):
+                #index is sampled so values of any type (e.g. None) are chosen as they are
+                params[name] = values[rng.integers(len(values))]
+            elif len(values) == 3 and values[2] == "log":
+                params[name] = float(np.exp(rng.uniform(np.log(values[0]), np.log(values[1]))))
+            elif isinstance(values[0], int) and isinstance(values[1], int):
+                params[name] = int(rng.integers(values[0], values[1] + 1))
+            else:
+                params[name] = float(rng.uniform(values[0], values[1]))
+
+        trials.append(params)
+
+    return trials
+
+def median_thresholds(all_rewards: list, min_trials: int=3) -> np.ndarray:
+    """
+        function to get the median stopping thresholds from the episode rewards of completed trials, the threshold of
+        each episode is the median of the running mean rewards of the trials which reached that episode
+
+        all_rewards is a list of the list of episode rewards of each completed trial
+
+        min_trials is the minimum number of trials reaching an episode for it to have a threshold
+
+        returns an array of the threshold of each episode, -inf where there are fewer than min_trials trials
+    """
+    curves = [np.cumsum(rewards) / np.arange(1, len(rewards) + 1) for rewards in all_rewards if len(rewards) > 0]
+    n_episodes = max((len(curve) for curve in curves), default=0)
+
+    thresholds = np.full(n_episodes, -np.inf)
+    for e in range(n_episodes):
+        values = [curve[e] for curve in curves if len(curve) > e]
+
+        if len(values) >= min_trials:
+            thresholds[e] = np.median(values)
+
+    return thresholds
+
+def run_trial(runner: bytes, env_fn: bytes, trial: int, params: dict, thresholds: np.ndarray=None, grace: int=10, window: int=10) -> dict:
+    """
+        function to run one trial of a sweep, run in a worker process of run_sweep
+
+        runner and env_fn are the run_gym_* function and the function which creates the env, pickled with cloudpickle
+
+        trial is the index of the trial
+
+        params is a dict of the keyword arguments of the trial passed to the runner
+
+        thresholds is an array of the median stopping threshold of each episode, the trial is stopped once the best
+        running mean of its episode rewards is below the threshold of the episode, if None the trial is not stopped
+
+        grace is the number of episodes before the trial can be stopped
+
+        window is the number of final episodes the score of the trial is averaged over
+
+        returns a dict of the result of the trial
+    """
+    start_time = time.time()
+    result = {"trial": trial, "params": params}
+
+    try:
+        env = TrialMonitor(cloudpickle.loads(env_fn)(), thresholds=thresholds, grace=grace)
+
+        try:
+            cloudpickle.loads(runner)(env, **params)
+            env.end_episode(stop=False)
+            result["status"] = "completed"
+        except TrialStopped:
+            result["status"] = "stopped"
+        finally:
+            env.close()
+
+        result["episodes"] = len(env.episode_rewards)
+        result["score"] = float(np.mean(env.episode_rewards[-window:])) if env.episode_rewards else None
+        result["rewards"] = env.episode_rewards
+    except Exception:
+        result["status"] = "failed"
+        result["error"] = traceback.format_exc()
+    finally:
+        #models of the trial are freed so memory does not grow with every trial run by the worker
+        if "tensorflow" in sys.modules:
+            sys.modules["tensorflow"].keras.backend.clear_session()
+
+    result["time"] = round(time.time() - start_time, 3)
+
+    return result
+
+def run_sweep(runner, env_fn, trials: list, results_path: str, n_workers: int=None, n_threads: int=None, early_stopping: bool=True, grace: int=10, min_trials: int=3, window: int=10, resume: bool=True) -> list:
+    """
+        function to run the trials of a hyperparameter sweep in a pool of worker processes, the result of each trial
+        is appended to the results file as a line of json as soon as it finishes
+
+        runner is the run_gym_* function of the algorithm (e.g. run_gym_dqn_single_agent)
+
+        env_fn is a function which returns a new gym env for a trial (e.g. functools.partial(gym.make, "CartPole-v1")),
+        runner and env_fn are pickled with cloudpickle so can be lambdas
+
+        trials is a list of dicts of the keyword arguments of each trial passed to the runner (e.g. from grid_search
+        or random_search), they should include episodes and time_steps
+
+        results_path is the path to the results file
+
+        n_workers is the number of worker processes, if None there is one per core
+
+        n_threads is the number of threads tensorflow uses for each op in each worker, if None the cores are divided
+        between the workers so trials do not oversubscribe them
+
+        early_stopping determines whether trials are stopped by the median stopping rule, a trial is stopped once the
+        best running mean of its episode rewards is below the median of the running means of the completed trials
+        at the same episode (after grace episodes and once min_trials trials have reached the episode)
+
+        window is the number of final episodes the score of each trial is averaged over
+
+        resume determines whether trials with a result in the results file (with the same index and parameters) are
+        skipped, so an interrupted sweep can be continued
+
+        returns a list of the result of each trial
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    n_threads = n_threads or max(1, (os.cpu_count() or 1) // n_workers)
+
+    if n_workers < 1:
+        raise ValueError("Sweep must have at least 1 worker.")
+
+    results = {}
+
+    if resume and os.path.isfile(results_path):
+        with open(results_path, "r") as handle:
+            for line in handle:
+                result = json.loads(line)
+
+                #parameters are compared as json so tuples and numpy values match their json lists and numbers
+                if result["trial"] < len(trials) and result["params"] == json.loads(json.dumps(trials[result["trial"]], default=_to_json)):
+                    results[result["trial"]] = result
+
+        logging.info("Resuming sweep with %u of %u trials finished", len(results), len(trials))
+
+    pending = [i for i in range(len(trials)) if i not in results]
+    runner = cloudpickle.dumps(runner)
+    env_fn = cloudpickle.dumps(env_fn)
+
+    #workers are spawned as tensorflow is not safe to fork once its runtime has started
+    ctx = multiprocessing.get_context("spawn")
+
+    with open(results_path, "a") as handle, ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx, initializer=_init_worker, initargs=(n_threads,)) as pool:
+        running = {}
+
+        while pending or running:
+            #trials are submitted as workers become free so each is stopped against the latest finished trials
+            while pending and len(running) < n_workers:
+                trial = pending.pop(0)
+                #stopped trials are left out as their truncated rewards would lower the median
+                thresholds = median_thresholds([result["rewards"] for result in results.values() if result["status"] == "completed"], min_trials) if early_stopping else None
+
+                running[pool.submit(run_trial, runner, env_fn, trial, trials[trial], thresholds, grace, window)] = trial
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                result = future.result()
+                results[running.pop(future)] = result
+
+                handle.write(json.dumps(result, default=_to_json) + "\n")
+                handle.flush()
+
+                if result["status"] == "failed":
+                    logging.error("Trial %u failed:\n%s", result["trial"], result["error"])
+                else:
+                    logging.info("Trial %u %s after %u episodes, with score = %s", result["trial"], result["status"], result["episodes"], str(result["score"]))
+
+    return [results[i] for i in range(len(trials))]
+
+def _init_worker(n_threads: int):
+    """
+        function run on the start of each worker process of run_sweep to limit the threads of tensorflow
+    """
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(n_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(n_threads)
+
+def _to_json(obj):
+    """
+        function to convert numpy values of results to types which can be written as json
+    """
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class TrialStopped(Exception):
+    """
+        Exception raised by a TrialMonitor to stop a trial early
+    """
+    pass
+
+class TrialMonitor():
+    """
+        Class to wrap the env of a trial, recording the total reward of each episode (the mean over agents for
+        multi-agent envs) and stopping the trial by raising TrialStopped when it is reset after a poor episode.
+        Every other attribute is passed through to the env, so it can be used in place of the env by the runners
+    """
+    def __init__(self, env, thresholds: np.ndarray=None, grace: int=10):
+        """
+            function to initialise the class
+
+            env is the gym env object
+
+            thresholds is an array of the median stopping threshold of each episode, if None the trial is not stopped
+
+            grace is the number of episodes before the trial can be stopped
+        """
+        self.env = env
+        self.thresholds = thresholds
+        self.grace = grace
+        self.episode_rewards = []
+
+        self._total_reward = None
+        self._reward_sum = 0.0
+        self._best_mean = -np.inf
+
+    def __getattr__(self, name: str):
+        return getattr(self.env, name)
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def reset(self, *args, **kwargs):
+        """
+            function to reset the env, ending the previous episode (runners reset the env at the start of every episode)
+        """
+        self.end_episode()
+
+        return self.env.reset(*args, **kwargs)
+
+    def step(self, action) -> tuple:
+        """
+            function to take a time step in the env, recording its reward
+        """
+        obv, reward, done, info = self.env.step(action)
+        self._total_reward = (self._total_reward or 0.0) + float(np.mean(reward))
+
+        return obv, reward, done, info
+
+    def end_episode(self, stop: bool=True):
+        """
+            function to record the total reward of the current episode, if it has any time steps
+
+            stop determines whether TrialStopped is raised if the trial is below the stopping threshold
+        """
+        if self._total_reward is None:
+            return
+
+        self.episode_rewards.append(self._total_reward)
+        self._reward_sum += self._total_reward
+        self._total_reward = None
+
+        e = len(self.episode_rewards) - 1
+        self._best_mean = max(self._best_mean, self._reward_sum / len(self.episode_rewards))
+
+        if stop and self.thresholds is not None and self.grace <= e < len(self.thresholds) and self._best_mean < self.thresholds[e]:
+            raise TrialStopped(f'Best mean reward {self._best_mean} is below the median {self.thresholds[e]} at episode {e}.')
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os
+import json
+import random
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+
+#-----------------------------------------------------------------------------------------------
+# Variables
+#-----------------------------------------------------------------------------------------------
+
+#separator of the step id appended to the payload of a message of a traced step
+SEPARATOR = "@"
+
+#context returned by span for steps which are not traced, shared so untraced steps do not allocate one
+_NO_SPAN = nullcontext()
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def attach_step(payload: str, step: str) -> str:
+    """
+        function to append the id of a traced step to the payload of a message, so the receiver can record its spans
+        of the step under the same id
+
+        payload is the string of the message
+
+        step is the id of the step, if None the payload is returned unchanged
+
+        returns the payload with the step id
+    """
+    return payload if step is None else f'{payload}{SEPARATOR}{step}'
+
+def split_step(payload: str) -> tuple:
+    """
+        function to split the id of a traced step from the payload of a message (see attach_step)
+
+        payload is the string of the message
+
+        returns a tuple of the payload without the step id and the step id, None if the step is not traced
+    """
+    payload, _, step = payload.partition(SEPARATOR)
+
+    return payload, step or None
+
+def read_trace(path: str) -> list:
+    """
+        function to read the events of a trace file written by a Tracer, including a file left unclosed by a crash
+
+        path is a string of the path to the trace file
+
+        returns a list of the trace events
+    """
+    with open(path, "r") as handle:
+        text = handle.read().strip()
+
+    #closing bracket of the json array is optional in the trace event format so it is added if missing
+    if not text.endswith("]"):
+        text = text.rstrip(",") + "]"
+
+    return json.loads(text)
+
+def merge_traces(paths: list, path: str) -> int:
+    """
+        function to merge the trace files of many processes (e.g. the master and the simulated agents) into a single
+        trace file viewable in chrome://tracing or Perfetto, with flow events linking the spans of each traced step
+        across processes in time order
+
+        paths is a list of the paths to the trace files
+
+        path is a string of the path to the merged trace file
+
+        returns the number of steps linked
+    """
+    events = [event for trace_path in paths for event in read_trace(trace_path)]
+
+    steps = {}
+    for event in events:
+        if event.get("ph") == "X" and "step" in event.get("args", {}):
+            steps.setdefault(event["args"]["step"], []).append(event)
+
+    flows = []
+    for flow_id, spans in enumerate(steps.values()):
+        if len(spans) < 2:
+            continue
+
+        spans.sort(key=lambda event: event["ts"])
+
+        for i, span in enumerate(spans):
+            #flow starts at the first span of the step, steps through every span after it and finishes at the last
+            phase = "s" if i == 0 else "f" if i == len(spans) - 1 else "t"
+            flow = {"name": "step", "cat": "step", "ph": phase, "id": flow_id, "ts": span["ts"], "pid": span["pid"], "tid": span["tid"]}
+
+            if phase == "f":
+                flow["bp"] = "e"
+
+            flows.append(flow)
+
+    with open(path, "w") as handle:
+        json.dump({"traceEvents": events + flows, "displayTimeUnit": "ms"}, handle)
+
+    return sum(len(spans) > 1 for spans in steps.values())
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class Tracer():
+    """
+        Class to record the spans of a sample of steps as Chrome trace events, so where the time of a step goes can be
+        found across processes (e.g. the master and the simulated agents). Steps are sampled by the process which
+        starts them, whose step id is passed on with its messages (see attach_step) so every process records its spans
+        of the step under the same id. Spans of steps which are not sampled cost a comparison, so tracing can be left
+        on at a low sampling rate. Events are buffered and appended to a json array, which is readable even if the
+        process crashes before the tracer is closed
+    """
+    def __init__(self, path: str, rate: float=0.01, process_name: str=None, buffer_size: int=1000):
+        """
+            function to initialise the class, any trace already at path is overwritten
+
+            path is a string of the path to the trace file, its directory is created if it does not exist
+
+            rate is the fraction of steps sampled by sample, between 0 and 1
+
+            process_name is the name of the process shown in the trace viewer
+
+            buffer_size is the number of events buffered before they are written
+        """
+        if rate < 0 or rate > 1:
+            raise ValueError("Sampling rate must have a value between 0 and 1 (inclusive).")
+
+        self._path = path
+        self._rate = rate
+        self._buffer_size = buffer_size
+        self._pid = os.getpid()
+        self._n_steps = 0
+        self._n_events = 0
+        self._events = []
+        self._lock = threading.Lock()
+
+        #timestamps are taken from the monotonic clock aligned to the wall clock, so those of processes on the same
+        #machine can be compared
+        self._offset = time.time_ns() - time.perf_counter_ns()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._handle = open(path, "w")
+        self._handle.write("[\n")
+
+        if process_name is not None:
+            self._append({"name": "process_name", "ph": "M", "pid": self._pid, "tid": 0, "args": {"name": process_name}})
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def n_events(self) -> int:
+        #number of events recorded, including those not yet written
+        return self._n_events
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def sample(self) -> str:
+        """
+            function to decide whether to trace a step started by this process
+
+            returns a new step id unique across processes if the step is sampled, otherwise None
+        """
+        if self.rate == 0 or random.random() >= self.rate:
+            return None
+
+        self._n_steps += 1
+
+        return f'{self._pid:x}-{self._n_steps}'
+
+    def span(self, name: str, step: str, tid: int=0, **args):
+        """
+            function to record a span of a step, used as a context manager around the code of the span
+
+            name is the name of the span
+
+            step is the id of the step (from sample or split_step), if None nothing is recorded
+
+            tid is the thread the span is shown on, spans of concurrent coroutines (e.g. of each agent) should be on
+            different threads
+
+            args are values shown with the span
+
+            returns a context manager
+        """
+        if step is None:
+            return _NO_SPAN
+
+        return self._span(name, step, tid, args)
+
+    def instant(self, name: str, step: str, tid: int=0, **args):
+        """
+            function to record an event at a point in time of a step, nothing is recorded if step is None
+        """
+        if step is not None:
+            self._append({"name": name, "ph": "i", "s": "t", "ts": self._now(), "pid": self._pid, "tid": tid, "args": {"step": step, **args}})
+
+    def flush(self):
+        """
+            function to write the buffered events to the trace file
+        """
+        with self._lock:
+            events, self._events = self._events, []
+
+            if events and self._handle is not None:
+                self._handle.write("".join(f'{json.dumps(event)},\n' for event in events))
+                self._handle.flush()
+
+    def close(self):
+        """
+            function to write the buffered events and close the trace file
+        """
+        if self._handle is None:
+            return
+
+        self.flush()
+
+        with self._lock:
+            #an empty metadata event follows the trailing comma so the array is valid json
+            self._handle.write(json.dumps({"name": "trace_end", "ph": "M", "pid": self._pid, "tid": 0, "args": {}}) + "\n]\n")
+            self._handle.close()
+            self._handle = None
+
+    def _now(self) -> float:
+        """
+            function to get the timestamp of an event in microseconds
+        """
+        return (time.perf_counter_ns() + self._offset) / 1000
+
+    @contextmanager
+    def _span(self, name: str, step: str, tid: int, args: dict):
+        """
+            function to record a complete event of the time taken by the code inside the context
+        """
+        start = self._now()
+
+        try:
+            yield
+        except BaseException as e:
+            #span ended by an exception (e.g. the task being cancelled) is marked so its duration is not mistaken for work
+            args = {**args, "error": type(e).__name__}
+            raise
+        finally:
+            self._append({"name": name, "ph": "X", "ts": start, "dur": self._now() - start, "pid": self._pid, "tid": tid, "args": {"step": step, **args}})
+
+    def _append(self, event: dict):
+        """
+            function to buffer an event, the buffer is written once it is full
+        """
+        with self._lock:
+            #spans ended after the tracer is closed (e.g. of tasks cancelled on exit) are dropped
+            if self._handle is None:
+                return
+
+            self._events.append(event)
+            self._n_events += 1
+            full = len(self._events) >= self._buffer_size
+
+        if full:
+            self.flush()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os
+import struct
+import logging
+import threading
+import time
+import numpy as np
+
+#-----------------------------------------------------------------------------------------------
+# Variables
+#-----------------------------------------------------------------------------------------------
+
+#kinds of record in a training log
+STEP = 0
+EPISODE = 1
+
+#little-endian length prefix of each record, the number of bytes of the record after it
+LENGTH = struct.Struct("<I")
+#kind, agent, episode, t (time step of a step, number of time steps of an episode), reward, loss, epsilon,
+#latency (seconds taken by a step or an episode) and wall clock time
+RECORD = struct.Struct("<BHIIdfffd")
+
+#numpy dtype of a record including its length prefix, so a log of records of the same length is read in one call
+RECORD_DTYPE = np.dtype([
+    ("length", "<u4"),
+    ("kind", "u1"),
+    ("agent", "<u2"),
+    ("episode", "<u4"),
+    ("t", "<u4"),
+    ("reward", "<f8"),
+    ("loss", "<f4"),
+    ("epsilon", "<f4"),
+    ("latency", "<f4"),
+    ("time", "<f8"),
+])
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def read_training_log(path: str) -> np.ndarray:
+    """
+        function to read the records of a training log written by a TrainingLog, a record cut short by a crash at
+        the end of the log is ignored
+
+        path is a string of the path to the log file
+
+        returns a structured array (with the fields of RECORD_DTYPE) of every record in the order they were written,
+        the kind field is STEP or EPISODE and loss, epsilon and latency are nan when they were not recorded
+    """
+    data = np.fromfile(path, dtype=np.uint8)
+
+    if len(data) < LENGTH.size:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+
+    record_size = LENGTH.size + int(data[:LENGTH.size].view("<u4")[0])
+
+    if record_size >= RECORD_DTYPE.itemsize:
+        #records written by newer versions may be longer, the fields they share are at the same offsets
+        dtype = np.dtype({"names": RECORD_DTYPE.names, "formats": [RECORD_DTYPE.fields[name][0] for name in RECORD_DTYPE.names], "offsets": [RECORD_DTYPE.fields[name][1] for name in RECORD_DTYPE.names], "itemsize": record_size})
+        records = data[:len(data) - len(data) % record_size].view(dtype)
+
+        #every record of a log written by a single version has the same length so it is read without a python loop
+        if np.all(records["length"] == record_size - LENGTH.size):
+            return records.astype(RECORD_DTYPE)
+
+    #records of different lengths are found by following the length prefixes
+    offsets = []
+    offset = 0
+    while offset + LENGTH.size <= len(data):
+        length = LENGTH.unpack_from(data, offset)[0]
+
+        if offset + LENGTH.size + length > len(data):
+            break
+
+        if length >= RECORD.size:
+            offsets.append(offset)
+
+        offset += LENGTH.size + length
+
+    records = np.zeros(len(offsets), dtype=RECORD_DTYPE)
+    for i, offset in enumerate(offsets):
+        records[i] = (RECORD.size,) + RECORD.unpack_from(data, offset + LENGTH.size)
+
+    return records
+
+def read_training_logs(paths: list) -> np.ndarray:
+    """
+        function to read the training logs of many agents into a single array
+
+        paths is a list of the paths to the log files (e.g. from glob)
+
+        returns a structured array of the records of every log, in the order of paths, the agent field identifies
+        the agent of each record
+    """
+    return np.concatenate([read_training_log(path) for path in paths] or [np.zeros(0, dtype=RECORD_DTYPE)])
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class TrainingLog():
+    """
+        Class to stream the metrics of training to an append-only binary log file, with one length-prefixed record
+        per episode and optionally per time step. Records are packed into a buffer and written on a background thread,
+        which fsyncs the file periodically so a crash loses at most the last few seconds of records
+    """
+    def __init__(self, path: str, agent: int=0, log_steps: bool=False, flush_interval: float=1.0, fsync_interval: float=10.0):
+        """
+            function to initialise the class and start the writer thread, records are appended to an existing log
+
+            path is a string of the path to the log file, its directory is created if it does not exist
+
+            agent is the index of the agent written in each record
+
+            log_steps determines whether log_step records every time step, otherwise only episodes are recorded
+
+            flush_interval is the maximum number of seconds records are buffered before they are written
+
+            fsync_interval is the minimum number of seconds between fsyncs of the file
+        """
+        self._path = path
+        self._agent = agent
+        self._log_steps = log_steps
+        self._flush_interval = flush_interval
+        self._fsync_interval = fsync_interval
+
+        self._buffer = bytearray()
+        self._n_records = 0
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._handle = open(path, "ab")
+
+        self._thread = threading.Thread(target=self._run, name="training-log-writer", daemon=True)
+        self._thread.start()
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def agent(self) -> int:
+        return self._agent
+
+    @property
+    def log_steps(self) -> bool:
+        return self._log_steps
+
+    @property
+    def n_records(self) -> int:
+        #number of records logged, including those not yet written
+        return self._n_records
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def log_step(self, episode: int, t: int, reward: float, loss: float=np.nan, epsilon: float=np.nan, latency: float=np.nan):
+        """
+            function to log the metrics of a time step, ignored unless log_steps is set
+
+            episode is the index of the episode
+
+            t is the time step of the episode
+
+            reward is the reward received
+
+            loss is the loss of the training at this time step, nan if not trained
+
+            epsilon is the exploration rate of the agent, nan if it has none
+
+            latency is the number of seconds the time step took
+        """
+        if self.log_steps:
+            self._append(STEP, episode, t, reward, loss, epsilon, latency)
+
+    def log_episode(self, episode: int, steps: int, reward: float, loss: float=np.nan, epsilon: float=np.nan, latency: float=np.nan):
+        """
+            function to log the metrics of an episode
+
+            episode is the index of the episode
+
+            steps is the number of time steps of the episode
+
+            reward is the total reward of the episode
+
+            loss is the mean loss of the training during the episode, nan if not trained
+
+            epsilon is the exploration rate of the agent at the end of the episode, nan if it has none
+
+            latency is the number of seconds the episode took
+        """
+        self._append(EPISODE, episode, steps, reward, loss, epsilon, latency)
+
+    def flush(self):
+        """
+            function to write and fsync every buffered record, raises the last error of the writer thread if any
+        """
+        self._write(fsync=True)
+
+        with self._cond:
+            error, self._error = self._error, None
+
+        if error is not None:
+            raise error
+
+    def close(self):
+        """
+            function to write every buffered record, stop the writer thread and close the file
+        """
+        with self._cond:
+            if self._closed:
+                return
+
+            self._closed = True
+            self._cond.notify_all()
+
+        self._thread.join()
+
+        try:
+            self.flush()
+        finally:
+            self._handle.close()
+
+    def _append(self, kind: int, episode: int, t: int, reward: float, loss: float, epsilon: float, latency: float):
+        """
+            function to pack a record into the buffer
+        """
+        record = RECORD.pack(kind, self.agent, episode, t, reward, loss, epsilon, latency, time.time())
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Cannot log to a closed TrainingLog.")
+
+            self._buffer += LENGTH.pack(len(record))
+            self._buffer += record
+            self._n_records += 1
+
+    def _write(self, fsync: bool=False):
+        """
+            function to append the buffered records to the file, the lock keeps buffers written in the order they were
+            taken when flush is called while the writer thread is writing
+        """
+        with self._write_lock:
+            with self._cond:
+                buffer, self._buffer = self._buffer, bytearray()
+
+            if buffer:
+                self._handle.write(buffer)
+                self._handle.flush()
+
+            if fsync:
+                os.fsync(self._handle.fileno())
+
+    def _run(self):
+        """
+            function run by the writer thread to write buffered records every flush interval
+        """
+        last_fsync = time.monotonic()
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed, timeout=self._flush_interval)
+
+                if self._closed:
+                    return
+
+            fsync = time.monotonic() - last_fsync >= self._fsync_interval
+
+            try:
+                self._write(fsync=fsync)
+            except Exception as e:
+                logging.error("Failed to write training log %s: %s", self.path, e)
+
+                with self._cond:
+                    self._error = e
+
+            if fsync:
+                last_fsync = time.monotonic()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os
+import json
+import numpy as np
+
+from algorithms.checkpoint import _atomic_write
+
+#-----------------------------------------------------------------------------------------------
+# Variables
+#-----------------------------------------------------------------------------------------------
+
+#name of the manifest file in a trajectory directory
+MANIFEST = "manifest.json"
+#version of the trajectory format written by TrajectoryRecorder
+FORMAT_VERSION = 1
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def is_trajectory(path: str) -> bool:
+    """
+        function to check whether path is a trajectory directory (written by a TrajectoryRecorder)
+    """
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+def load_trajectories(path: str, mmap: bool=True) -> dict:
+    """
+        function to load the columns of a trajectory directory written by a TrajectoryRecorder, only the rows
+        flushed to disk are loaded
+
+        path is a string of the path to the trajectory directory
+
+        mmap determines whether the columns are memory-mapped (read only) rather than read into memory, so runs
+        too large for memory can be analysed
+
+        returns a dict of the array of each column (episode, t, agent, obv, action, reward and done) with a leading
+        [rows] dimension, rows are in the order they were recorded
+    """
+    if not is_trajectory(path):
+        raise FileNotFoundError(f'No trajectory manifest found in {path}.')
+
+    with open(os.path.join(path, MANIFEST), "r") as handle:
+        manifest = json.load(handle)
+
+    if manifest["format"] > FORMAT_VERSION:
+        raise ValueError(f'Trajectories at {path} have format {manifest["format"]}, only formats up to {FORMAT_VERSION} can be read.')
+
+    n_rows = manifest["n_rows"]
+
+    columns = {}
+    for name, spec in manifest["columns"].items():
+        dtype = np.dtype(spec["dtype"])
+        shape = (n_rows,) + tuple(spec["shape"])
+        file = os.path.join(path, spec["file"])
+
+        if n_rows == 0:
+            #empty files cannot be memory-mapped
+            columns[name] = np.zeros(shape, dtype=dtype)
+        elif mmap:
+            columns[name] = np.memmap(file, dtype=dtype, mode="r", shape=shape)
+        else:
+            columns[name] = np.fromfile(file, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+    return columns
+
+def episode_rows(columns: dict, episode: int) -> np.ndarray:
+    """
+        function to get the rows of an episode, rows of episodes of VecEnvs, parallel agents and rollout workers
+        are interleaved so they are not always contiguous
+
+        columns is a dict of columns (as returned by load_trajectories)
+
+        episode is the index of the episode
+
+        returns an array of the indexes of the rows of the episode, empty if it was not recorded
+    """
+    return np.flatnonzero(columns["episode"] == episode)
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class TrajectoryRecorder():
+    """
+        Class to record the time steps of a run as fixed dtype columns (episode, t, agent, obv, action, reward and
+        done), with one row per agent per time step. Rows are written into preallocated chunks which are appended to
+        one file per column in a directory each time a chunk is full, so the memory held is bounded by the chunk size
+        however long the run. Passing a recorder to a runner records its time steps instead of returning them
+    """
+    def __init__(self, path: str, obv_shape: tuple, obv_dtype=np.float32, action_shape: tuple=(), action_dtype=np.int64, chunk_size: int=65536):
+        """
+            function to initialise the class, any trajectories already in the directory are overwritten
+
+            path is a string of the path to the trajectory directory, created if it does not exist
+
+            obv_shape and obv_dtype are the shape and dtype of the observation of each agent (e.g. from the
+            observation space of the env)
+
+            action_shape and action_dtype are the shape and dtype of the action of each agent, () and int64 for
+            discrete actions
+
+            chunk_size is the number of rows held in memory before they are flushed to disk, it must be at least the
+            number of agents
+        """
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1.")
+
+        self._path = path
+        self._chunk_size = chunk_size
+        self._n_flushed = 0
+        self._n_buffered = 0
+
+        specs = {
+            "episode": ((), np.uint32),
+            "t": ((), np.uint32),
+            "agent": ((), np.uint16),
+            "obv": (tuple(obv_shape), obv_dtype),
+            "action": (tuple(action_shape), action_dtype),
+            "reward": ((), np.float32),
+            "done": ((), np.bool_),
+        }
+
+        self._chunks = {name: np.zeros((chunk_size,) + shape, dtype=dtype) for name, (shape, dtype) in specs.items()}
+        self._columns = {name: {"file": f'{name}.bin', "dtype": np.dtype(dtype).str, "shape": list(shape)} for name, (shape, dtype) in specs.items()}
+
+        os.makedirs(path, exist_ok=True)
+
+        #column files are only appended to, they are truncated so a previous run is overwritten
+        self._files = {name: open(os.path.join(path, column["file"]), "wb") for name, column in self._columns.items()}
+        self._write_manifest()
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    @property
+    def n_rows(self) -> int:
+        #number of rows recorded, including those not yet flushed
+        return self._n_flushed + self._n_buffered
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, episode: int, t: int, obvs, actions, rewards, done: bool):
+        """
+            function to record a time step of every agent
+
+            episode is the index of the episode
+
+            t is the time step of the episode
+
+            obvs is the observation the actions were taken from, of a single agent or an array with a leading
+            [n_agents] dimension
+
+            actions and rewards are the action taken and reward received by each agent, of a single agent or arrays
+            with shape [n_agents]
+
+            done is whether the episode ended (the env reached a terminal state) after this time step
+        """
+        if self._files is None:
+            raise RuntimeError("Cannot record to a closed TrajectoryRecorder.")
+
+        obv_shape = self._chunks["obv"].shape[1:]
+        obvs = np.asarray(obvs)
+        #a single agent observation has the shape of the observation space
+        n_agents = 1 if obvs.shape == obv_shape else len(obvs)
+
+        if n_agents > self.chunk_size:
+            raise ValueError(f'Cannot record {n_agents} agents with a chunk size of {self.chunk_size}.')
+
+        if self._n_buffered + n_agents > self.chunk_size:
+            self.flush()
+
+        rows = slice(self._n_buffered, self._n_buffered + n_agents)
+
+        self._chunks["episode"][rows] = episode
+        self._chunks["t"][rows] = t
+        self._chunks["agent"][rows] = np.arange(n_agents)
+        self._chunks["obv"][rows] = obvs.reshape((n_agents,) + obv_shape)
+        self._chunks["action"][rows] = np.reshape(actions, (n_agents,) + self._chunks["action"].shape[1:])
+        self._chunks["reward"][rows] = np.reshape(rewards, n_agents)
+        self._chunks["done"][rows] = done
+
+        self._n_buffered += n_agents
+
+    def flush(self):
+        """
+            function to append the buffered rows to the column files and update the manifest so they can be loaded
+        """
+        if self._files is None or self._n_buffered == 0:
+            return
+
+        for name, handle in self._files.items():
+            self._chunks[name][:self._n_buffered].tofile(handle)
+            handle.flush()
+
+        self._n_flushed += self._n_buffered
+        self._n_buffered = 0
+
+        #manifest is written after the columns so it never counts rows which are not on disk
+        self._write_manifest()
+
+    def close(self):
+        """
+            function to flush the buffered rows and close the column files
+        """
+        if self._files is None:
+            return
+
+        self.flush()
+
+        for handle in self._files.values():
+            handle.close()
+
+        self._files = None
+
+    def _write_manifest(self):
+        """
+            function to write the manifest of the columns and the number of rows flushed
+        """
+        manifest = {"format": FORMAT_VERSION, "n_rows": self._n_flushed, "columns": self._columns}
+
+        _atomic_write(os.path.join(self.path, MANIFEST), lambda handle: handle.write(json.dumps(manifest, indent=4).encode()))
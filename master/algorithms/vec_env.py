@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import os
+import numpy as np
+import cloudpickle
+
+from algorithms.workers import WorkerPool, run_worker, attach_arrays
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def step_envs(envs: list, actions: np.ndarray, ep_steps: np.ndarray, time_limit: int, rewards: np.ndarray, dones: np.ndarray) -> tuple:
+    """
+        function to take one time step in each of a list of envs, resetting every env whose episode ended
+
+        envs is the list of envs
+
+        actions is an array of the action to take in each env
+
+        ep_steps is an int array of the number of time steps of the current episode of each env, updated in place
+
+        time_limit is the maximum number of time steps of an episode, if None episodes only end when the env is done
+
+        rewards and dones are arrays the reward and whether the episode ended of each env are written to
+
+        returns a tuple (obvs, infos) of lists of the observation and info dict of each env
+    """
+    obvs = []
+    infos = []
+
+    ep_steps += 1
+
+    for i, (env, action) in enumerate(zip(envs, actions)):
+        obv, rewards[i], done, info = env.step(action)
+        info = dict(info)
+        info["timeout"] = not done and time_limit is not None and ep_steps[i] >= time_limit
+
+        if done or info["timeout"]:
+            #env is reset straight away so every env always has an observation to act on
+            info["terminal_observation"] = obv
+            obv = env.reset()
+            dones[i] = True
+            ep_steps[i] = 0
+        else:
+            dones[i] = False
+
+        obvs.append(obv)
+        infos.append(info)
+
+    return obvs, infos
+
+def _worker(remote, env_fns: bytes, start: int, stop: int):
+    """
+        function run by each worker process of a SubprocVecEnv, steps the envs from start to stop on commands received
+        from remote and writes their observations, rewards and dones into the shared memory block
+
+        remote is the worker end of the pipe to the SubprocVecEnv
+
+        env_fns is the list of functions which create the envs of this worker, pickled with cloudpickle
+    """
+    def serve(stack):
+        envs = [env_fn() for env_fn in cloudpickle.loads(env_fns)]
+        for env in envs:
+            stack.callback(env.close)
+
+        ep_steps = np.zeros(len(envs), dtype=np.int64)
+        time_limit = None
+
+        remote.send((envs[0].observation_space, envs[0].action_space))
+
+        while True:
+            cmd, data = remote.recv()
+
+            if cmd == "attach":
+                arrays = attach_arrays(stack, data[0], data[1], start, stop)
+                remote.send(None)
+            elif cmd == "time_limit":
+                time_limit = data
+                remote.send(None)
+            elif cmd == "reset":
+                ep_steps[:] = 0
+                arrays["obvs"][:] = [env.reset() for env in envs]
+                remote.send(None)
+            elif cmd == "step":
+                obvs, infos = step_envs(envs, arrays["actions"], ep_steps, time_limit, arrays["rewards"], arrays["dones"])
+                arrays["obvs"][:] = obvs
+                remote.send(infos)
+            elif cmd == "render":
+                envs[0].render()
+                remote.send(None)
+            elif cmd == "close":
+                break
+
+    #numpy is reseeded as forked workers (and envs cloudpickled with the same state) would otherwise share random
+    #streams, so the env copies would not be independent
+    run_worker(remote, f'Worker of envs {start} to {stop - 1}', serve, reseed=True)
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class VecEnv():
+    """
+        Class to step a batch of independent copies of a gym env in lockstep, so an agent can choose the actions of
+        every copy with a single (batched) call of its network and store all of their experiences at once
+
+        observations, rewards and dones are returned as arrays with a leading batch dimension of size n_envs, and each
+        copy is reset as soon as its episode ends so the batch is always full
+    """
+    def __init__(self, env_fns: list, time_limit: int=None):
+        """
+            function to initialise the class
+
+            env_fns is a list of functions which each return a new gym env (e.g. lambda: gym.make(...)), one per copy
+
+            time_limit is the maximum number of time steps of an episode before it is ended (timed out), if None
+            episodes only end when the env is done
+        """
+        if len(env_fns) < 1:
+            raise ValueError("VecEnv must have at least 1 env.")
+
+        self._envs = [env_fn() for env_fn in env_fns]
+        self.time_limit = time_limit
+
+        #number of time steps of the current episode of each env
+        self._ep_steps = np.zeros(self.n_envs, dtype=np.int64)
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def envs(self) -> list:
+        return self._envs
+
+    @property
+    def n_envs(self) -> int:
+        return len(self.envs)
+
+    @property
+    def observation_space(self):
+        #every env is a copy of the same env so they share the same spaces
+        return self.envs[0].observation_space
+
+    @property
+    def action_space(self):
+        return self.envs[0].action_space
+
+    @property
+    def time_limit(self) -> int:
+        return self._time_limit
+
+    @time_limit.setter
+    def time_limit(self, val: int):
+        if val is not None and val < 1:
+            raise ValueError("time_limit (maximum time steps per episode) must be at least 1.")
+
+        self._time_limit = val
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.n_envs
+
+    def reset(self) -> np.ndarray:
+        """
+            function to reset every env
+
+            returns an array of the initial observations with shape [n_envs, ...]
+        """
+        self._ep_steps[:] = 0
+
+        return np.stack([env.reset() for env in self.envs])
+
+    def step(self, actions: np.ndarray) -> tuple:
+        """
+            function to take one time step in every env
+
+            actions is an array of the action to take in each env with shape [n_envs, ...]
+
+            returns a tuple (obvs, rewards, dones, infos) where obvs has shape [n_envs, ...], rewards and dones have shape
+            [n_envs] and infos is a list of the info dict of each env. The observation of an env whose episode ended is
+            the first observation of its next episode, the last observation of the ended episode is in its info dict as
+            "terminal_observation" and "timeout" is True in its info dict if the episode was ended by the time limit
+        """
+        if len(actions) != self.n_envs:
+            raise ValueError(f'Expected {self.n_envs} actions, got {len(actions)}.')
+
+        rewards = np.zeros(self.n_envs, dtype=np.float32)
+        dones = np.zeros(self.n_envs, dtype=bool)
+
+        obvs, infos = step_envs(self.envs, actions, self._ep_steps, self.time_limit, rewards, dones)
+
+        return np.stack(obvs), rewards, dones, infos
+
+    def render(self):
+        """
+            function to render the first env
+        """
+        self.envs[0].render()
+
+    def close(self):
+        """
+            function to close every env
+        """
+        for env in self.envs:
+            env.close()
+
+class SubprocVecEnv(VecEnv, WorkerPool):
+    """
+        Class to step a batch of copies of a gym env in lockstep, with the copies split between worker processes so
+        envs which cannot be vectorised (e.g. the pygame maze envs) are stepped on every core
+
+        actions, observations, rewards and dones are exchanged through a single shared memory block, so they are
+        never pickled. Observations, rewards and dones returned by reset and step are views of the block (they are
+        not copied), they are only valid until the next call of step or reset so must be copied to be kept
+    """
+    def __init__(self, env_fns: list, time_limit: int=None, n_workers: int=None, start_method: str=None):
+        """
+            function to initialise the class
+
+            env_fns is a list of functions which each return a new gym env (e.g. lambda: gym.make(...)), one per copy,
+            they are pickled with cloudpickle so can be lambdas
+
+            time_limit is the maximum number of time steps of an episode before it is ended (timed out), if None
+            episodes only end when the env is done
+
+            n_workers is the number of worker processes, if None there is one per core (or per env if fewer)
+
+            start_method is the multiprocessing start method of the workers (e.g. "fork" or "spawn"), if None the
+            default of the platform is used
+        """
+        if len(env_fns) < 1:
+            raise ValueError("VecEnv must have at least 1 env.")
+
+        self._n_envs = len(env_fns)
+        n_workers = min(self.n_envs, n_workers or os.cpu_count() or 1)
+
+        if n_workers < 1:
+            raise ValueError("SubprocVecEnv must have at least 1 worker.")
+
+        WorkerPool.__init__(self)
+        self._envs = None
+        self._time_limit = None
+
+        #each worker steps a contiguous slice of the envs
+        bounds = np.linspace(0, self.n_envs, n_workers + 1).astype(int)
+        self.start_workers(_worker, [(cloudpickle.dumps(env_fns[start:stop]), int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])], start_method=start_method)
+
+        try:
+            #spaces are sent by the workers so no env is created in this process
+            self._observation_space, self._action_space = [self._recv(remote) for remote in self._remotes][0]
+
+            layout = self.create_arrays(self.array_specs(self.n_envs, self.observation_space, self.action_space))
+            self._broadcast(("attach", (self._shm.name, layout)))
+        except Exception:
+            self.close()
+            raise
+
+        self.time_limit = time_limit
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def envs(self) -> list:
+        raise AttributeError("Envs of a SubprocVecEnv are held by its worker processes.")
+
+    @property
+    def n_envs(self) -> int:
+        return self._n_envs
+
+    @property
+    def observation_space(self):
+        return self._observation_space
+
+    @property
+    def action_space(self):
+        return self._action_space
+
+    @VecEnv.time_limit.setter
+    def time_limit(self, val: int):
+        VecEnv.time_limit.fset(self, val)
+
+        self._broadcast(("time_limit", val))
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def array_specs(n_envs: int, observation_space, action_space) -> dict:
+        """
+            function to get the specs of the actions, observations, rewards and dones of n_envs envs in the shared
+            memory block
+
+            returns a dict of (shape, dtype) of each array
+        """
+        #spaces without a dtype (e.g. Discrete in older versions of gym) hold ints (actions) and floats (observations)
+        return {
+            "actions": ((n_envs,) + tuple(getattr(action_space, "shape", None) or ()), getattr(action_space, "dtype", None) or np.int64),
+            "obvs": ((n_envs,) + tuple(observation_space.shape), getattr(observation_space, "dtype", None) or np.float32),
+            "rewards": ((n_envs,), np.float32),
+            "dones": ((n_envs,), bool),
+        }
+
+    def reset(self) -> np.ndarray:
+        """
+            function to reset every env
+
+            returns a view of the initial observations with shape [n_envs, ...] in shared memory
+        """
+        self._broadcast(("reset", None))
+
+        return self._arrays["obvs"]
+
+    def step(self, actions: np.ndarray) -> tuple:
+        """
+            function to take one time step in every env, the envs of each worker are stepped in parallel
+
+            actions is an array of the action to take in each env with shape [n_envs, ...]
+
+            returns a tuple (obvs, rewards, dones, infos) as for VecEnv.step, where obvs, rewards and dones are views
+            of shared memory which are overwritten by the next step
+        """
+        if len(actions) != self.n_envs:
+            raise ValueError(f'Expected {self.n_envs} actions, got {len(actions)}.')
+
+        self._arrays["actions"][:] = actions
+
+        infos = [info for infos in self._broadcast(("step", None)) for info in infos]
+
+        return self._arrays["obvs"], self._arrays["rewards"], self._arrays["dones"], infos
+
+    def render(self):
+        """
+            function to render the first env
+        """
+        self._remotes[0].send(("render", None))
+        self._recv(self._remotes[0])
+
+    def close(self):
+        """
+            function to close every env, stop the worker processes and free the shared memory block
+        """
+        WorkerPool.close(self)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+#-----------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------
+
+import traceback
+import multiprocessing
+import numpy as np
+
+from contextlib import ExitStack
+from multiprocessing import resource_tracker, shared_memory
+
+#-----------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------
+
+def shared_arrays(buffer, layout: dict) -> dict:
+    """
+        function to create numpy arrays backed by a shared memory buffer without copying
+
+        buffer is the buffer of the shared memory block
+
+        layout is a dict of (offset, shape, dtype) of each array in the block, as returned by array_layout
+
+        returns a dict of the arrays
+    """
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset) for name, (offset, shape, dtype) in layout.items()}
+
+def array_layout(specs: dict) -> tuple:
+    """
+        function to get the layout of a set of arrays in a shared memory block, each array is aligned to 8 bytes
+
+        specs is a dict of (shape, dtype) of each array
+
+        returns a tuple (layout, size) of a dict of (offset, shape, dtype) of each array and the size of the block
+    """
+    layout = {}
+    offset = 0
+    for name, (shape, dtype) in specs.items():
+        dtype = np.dtype(dtype)
+        layout[name] = (offset, tuple(shape), dtype)
+        offset += -(-int(np.prod(shape)) * dtype.itemsize // 8) * 8
+
+    return layout, offset
+
+def run_worker(remote, description: str, serve, reseed: bool=False):
+    """
+        function run by each worker process of a WorkerPool, serves the commands received from remote until it is
+        closed and sends any error back to the pool, which raises it
+
+        remote is the worker end of the pipe to the pool
+
+        description is the description of the worker used in the error, e.g. "Worker of envs 0 to 3"
+
+        serve is a function which is passed an ExitStack and serves commands, resources it enters into the stack (e.g.
+        shared arrays from attach_arrays) are released when the worker stops
+
+        reseed determines whether numpy is reseeded, as forked workers inherit the random state of the pool so would
+        otherwise e.g. explore identically
+    """
+    try:
+        if reseed:
+            np.random.seed()
+
+        with ExitStack() as stack:
+            serve(stack)
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:
+        remote.send(RuntimeError(f'{description} failed:\n{traceback.format_exc()}'))
+    finally:
+        remote.close()
+
+def attach_arrays(stack: ExitStack, name: str, layout: dict, start: int, stop: int) -> dict:
+    """
+        function to attach a worker to the shared memory block of its pool, detached when the stack is closed
+
+        stack is the ExitStack of the worker (see run_worker)
+
+        name and layout are the name and layout of the shared memory block
+
+        start and stop are the range of indexes of the leading dimension of the arrays of this worker
+
+        returns a dict of views of the slice of each array of this worker, which is cleared when the worker stops
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {key: array[start:stop] for key, array in shared_arrays(shm.buf, layout).items()}
+
+    def detach():
+        #views must be released before the block can be closed
+        arrays.clear()
+
+        try:
+            shm.close()
+        except BufferError:
+            #views are still held (e.g. by a traceback), the block is unmapped when the process exits
+            pass
+
+    stack.callback(detach)
+
+    return arrays
+
+#-----------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------
+
+class WorkerPool():
+    """
+        Class of worker processes each connected by a pipe, the base of SubprocVecEnv, ParallelAgents and
+        RolloutWorkers. Workers (running run_worker) are sent commands of (cmd, data) and reply to every command but
+        close, an error of a worker is raised by the pool. Arrays can be exchanged through a single shared memory
+        block (create_arrays) rather than being pickled
+    """
+    def __init__(self):
+        """
+            function to initialise the class, workers are started by start_workers
+        """
+        self._remotes = []
+        self._processes = []
+        self._shm = None
+        self._arrays = None
+
+    #-------------------------------------------------------------------------------------------
+    # Properties
+    #-------------------------------------------------------------------------------------------
+
+    @property
+    def n_workers(self) -> int:
+        return len(self._processes)
+
+    #-------------------------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------------------------
+
+    def start_workers(self, target, worker_args: list, start_method: str=None):
+        """
+            function to start a worker process for each set of arguments
+
+            target is the function run by each worker, called with the worker end of its pipe and its arguments
+
+            worker_args is a list of the tuple of arguments of each worker
+
+            start_method is the multiprocessing start method of the workers (e.g. "fork" or "spawn"), if None the
+            default of the platform is used
+        """
+        ctx = multiprocessing.get_context(start_method)
+        #workers inherit the resource tracker of this process, so a shared memory block they attach to is only
+        #unlinked by close and not by the tracker of each worker when it exits
+        resource_tracker.ensure_running()
+
+        for args in worker_args:
+            remote, worker_remote = ctx.Pipe()
+            process = ctx.Process(target=target, args=(worker_remote,) + tuple(args), daemon=True)
+            process.start()
+            worker_remote.close()
+
+            self._remotes.append(remote)
+            self._processes.append(process)
+
+    def create_arrays(self, specs: dict) -> dict:
+        """
+            function to create the shared memory block of the pool
+
+            specs is a dict of (shape, dtype) of each array in the block
+
+            returns the layout of the block to be sent to the workers (see attach_arrays)
+        """
+        layout, size = array_layout(specs)
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._arrays = shared_arrays(self._shm.buf, layout)
+
+        return layout
+
+    def close(self):
+        """
+            function to stop the worker processes and free the shared memory block
+        """
+        for remote, process in zip(self._remotes, self._processes):
+            if process.is_alive():
+                try:
+                    remote.send(("close", None))
+                except (BrokenPipeError, EOFError):
+                    pass
+
+        for remote, process in zip(self._remotes, self._processes):
+            process.join(timeout=10)
+
+            if process.is_alive():
+                process.terminate()
+
+            remote.close()
+
+        self._remotes = []
+        self._processes = []
+        self._arrays = None
+
+        if self._shm is not None:
+            try:
+                self._shm.close()
+            except BufferError:
+                #views of the block returned by the pool are still held, it is freed once they are released
+                pass
+
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _broadcast(self, cmd: tuple) -> list:
+        """
+            function to send a command to every worker and wait for all of them to complete it
+
+            returns a list of the reply of each worker
+        """
+        for remote in self._remotes:
+            remote.send(cmd)
+
+        return [self._recv(remote) for remote in self._remotes]
+
+    def _recv(self, remote):
+        """
+            function to receive the reply of a worker to a command, raising any error of the worker
+
+            returns the reply
+        """
+        reply = remote.recv()
+
+        if isinstance(reply, Exception):
+            raise reply
+
+        return reply
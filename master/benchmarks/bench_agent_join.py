@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the latency of an agent joining the master, the time taken to make its algorithm and take its
+#first action and training step, when made from the registry against taken from an AgentCache of warmed up spares
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.registry import make_algorithm
+from algorithms.agent_cache import AgentCache
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--algorithm", "-a", type=str, choices=["dqn", "ddrqn"], default="ddrqn", help="Algorithm of the agents, defaults to ddrqn")
+    parser.add_argument("--joins", "-j", type=int, default=8, help="Number of agents joining, defaults to 8")
+    parser.add_argument("--spares", type=int, default=8, help="Number of spares kept by the cache, defaults to 8")
+
+    return parser.parse_args()
+
+def join(make) -> tuple:
+    """
+        function to time an agent joining, with the experiences of the robot maze (3 observations and 4 actions) stored
+        until the agent can train
+
+        make is a function returning the agent
+
+        returns a tuple of the seconds taken to make the agent, for its first action and for its first training step
+    """
+    start_time = time.perf_counter()
+    agent = make()
+    make_time = time.perf_counter() - start_time
+
+    obv = np.random.uniform(size=3)
+    start_time = time.perf_counter()
+    agent.get_action(obv)
+    action_time = time.perf_counter() - start_time
+
+    agent.remember(0.0, obv)
+    while not agent.can_train:
+        agent.get_action(obv)
+        agent.remember(0.0, obv)
+
+    start_time = time.perf_counter()
+    agent.train()
+    train_time = time.perf_counter() - start_time
+
+    return make_time, action_time, train_time
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    args = get_args()
+    kwargs = {"n_obvs": 3, "n_actions": 4}
+
+    #tensorflow is imported and initialised before timing
+    join(lambda: make_algorithm(args.algorithm, **kwargs))
+
+    results = {"registry": [join(lambda: make_algorithm(args.algorithm, **kwargs)) for i in range(args.joins)]}
+
+    with AgentCache(n_spares=args.spares) as cache:
+        cache.prepare(args.algorithm, **kwargs)
+        #spares are built while the master waits for robots to join
+        cache.wait_ready()
+
+        results["cache"] = [join(lambda: cache.get(args.algorithm, **kwargs)[0]) for i in range(args.joins)]
+
+    print(f'{args.algorithm}, {args.joins} joins, mean (max) seconds')
+    print(f'{"case":>10}{"make":>18}{"first action":>18}{"first train":>18}{"join":>18}')
+
+    for name, times in results.items():
+        times = np.array(times)
+        joins = times.sum(axis=1)
+        columns = "".join(f'{np.mean(column):>9.4f} ({np.max(column):.4f})' for column in times.T)
+
+        print(f'{name:>10}{columns}{np.mean(joins):>9.4f} ({np.max(joins):.4f})')
+
+    sys.exit(0)
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the hot methods (get_action, train, send_comm, receive_comm and update_target_net) of every
+#algorithm across observation sizes, hidden sizes, batch sizes and replay memory fill levels, reporting the calls per second
+#and python memory allocated per call and saving the results as json so the results of two commits can be compared
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys, subprocess
+import argparse
+import itertools
+import json
+import platform
+import time
+import tracemalloc
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.registry import make_algorithm
+
+#-----------------------------------------------------------------------------------------------------------
+# Variables
+#-----------------------------------------------------------------------------------------------------------
+
+#number of actions of the discrete action algorithms, as the robot maze
+N_ACTIONS = 4
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--algorithms", nargs="+", default=list(SUITES), choices=list(SUITES), help="Algorithms to benchmark, defaults to all")
+    parser.add_argument("--obvs", type=int, nargs="+", default=[3, 32], help="Observation sizes, defaults to 3 32")
+    parser.add_argument("--hidden", type=int, nargs="+", default=[128], help="Hidden layer sizes, defaults to 128")
+    parser.add_argument("--batch", type=int, nargs="+", default=[32], help="Batch sizes of the replay memory algorithms, defaults to 32")
+    parser.add_argument("--fill", type=float, nargs="+", default=[0.1, 1.0], help="Fractions of the memory filled (replay memory, or the episode length of episodic algorithms), defaults to 0.1 1.0")
+    parser.add_argument("--states", type=int, nargs="+", default=[1000, 100000], help="Numbers of states of q-learning, defaults to 1000 100000")
+    parser.add_argument("--mem-size", type=int, default=10000, help="Size of the memory a fill level is a fraction of, defaults to 10000")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum number of seconds each method is timed for, defaults to 0.2")
+    parser.add_argument("--max-calls", type=int, default=10000, help="Maximum number of calls of each method timed, defaults to 10000")
+    parser.add_argument("--alloc-calls", type=int, default=20, help="Number of calls of each method traced to measure allocations, defaults to 20")
+    parser.add_argument("--output", "-o", type=str, default=None, help="Path of the json file the results are saved to")
+    parser.add_argument("--baseline", "-b", type=str, default=None, help="Path of the json file of earlier results to compare against")
+
+    return parser.parse_args()
+
+def grid(**dims) -> list:
+    """
+        function to get every combination of the values of each dimension
+
+        returns a list of dicts of the value of each dimension
+    """
+    return [dict(zip(dims, values)) for values in itertools.product(*dims.values())]
+
+def trim(agent, n: int, names: tuple=("obv_mem", "action_mem", "reward_mem", "next_obv_mem")):
+    """
+        function to cut the lists of the replay memory of agent back to n entries (e.g. after get_action appended to them)
+    """
+    for name in names:
+        del getattr(agent, name)[n:]
+
+def time_method(setup, call, min_time: float, max_calls: int) -> tuple:
+    """
+        function to time a method, setup is called before every call and not timed
+
+        returns a tuple of the number of calls and the total seconds they took
+    """
+    #first call is not timed in case it traces or allocates memory that later calls reuse
+    if setup is not None:
+        setup()
+    call()
+
+    calls = 0
+    total = 0.0
+    while total < min_time and calls < max_calls:
+        if setup is not None:
+            setup()
+
+        start_time = time.perf_counter()
+        call()
+        total += time.perf_counter() - start_time
+        calls += 1
+
+    return calls, total
+
+def trace_method(setup, call, n_calls: int) -> tuple:
+    """
+        function to measure the python memory allocated by calls of a method with tracemalloc, memory allocated by
+        tensorflow outside of python is not included
+
+        returns a tuple of the mean peak bytes allocated during a call and the mean bytes still allocated after the
+        setup and call, which is 0 unless memory grows with every call (e.g. a leak or growing replay memory)
+    """
+    peaks = []
+    retained = []
+
+    tracemalloc.start()
+    for i in range(n_calls):
+        before, _ = tracemalloc.get_traced_memory()
+
+        if setup is not None:
+            setup()
+
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        call()
+        current, peak = tracemalloc.get_traced_memory()
+
+        peaks.append(peak - start)
+        retained.append(current - before)
+    tracemalloc.stop()
+
+    return float(np.mean(peaks)), float(np.mean(retained))
+
+def q_learning_suite(args) -> list:
+    """
+        function to get the methods of q-learning to benchmark
+
+        returns a list of tuples (params, methods) where methods is a dict of (setup, call) of each method
+    """
+    suites = []
+
+    for params in grid(n_states=args.states):
+        agent = make_algorithm("q_learning", n_states=params["n_states"], n_actions=N_ACTIONS)
+        agent.epsilon = agent.epsilon_min
+        obv_i, next_obv_i = np.random.randint(params["n_states"], size=2)
+
+        methods = {
+            "get_action": (None, lambda agent=agent, obv_i=obv_i: agent.get_action(obv_i)),
+            "train": (None, lambda agent=agent, obv_i=obv_i, next_obv_i=next_obv_i: agent.train(obv_i, 1, 1.0, next_obv_i)),
+        }
+        suites.append((params, methods))
+
+    return suites
+
+def dqn_suite(args, name: str="dqn", recurrent: bool=False) -> list:
+    """
+        function to get the methods of dqn, drqn (recurrent) or ddrqn (name) to benchmark, the replay memory is filled with
+        random experiences
+
+        returns a list of tuples (params, methods) where methods is a dict of (setup, call) of each method
+    """
+    suites = []
+
+    for params in grid(n_obvs=args.obvs, hidden_size=args.hidden, batch_size=args.batch, fill=args.fill):
+        kwargs = {"n_obvs": params["n_obvs"], "n_actions": N_ACTIONS, "hidden_size": params["hidden_size"], "batch_size": params["batch_size"], "mem_size": args.mem_size}
+        agent = make_algorithm(name, **kwargs, DRQN=True) if recurrent else make_algorithm(name, **kwargs)
+        #compiled steps are traced before timing as they would be by an AgentCache
+        agent.warm_up()
+        #greedy actions so the network is called on every get_action
+        agent.epsilon = 0.0
+
+        n_inputs = params["n_obvs"] + (name == "ddrqn")
+        n = max(int(params["fill"] * args.mem_size), agent.replay.window_len if agent.DRQN else params["batch_size"] + 1)
+        obvs = np.random.uniform(size=(n, n_inputs)).astype(np.float32)
+        actions = np.random.randint(N_ACTIONS, size=n)
+        rewards = np.random.uniform(size=n)
+        obv = obvs[0, :params["n_obvs"]]
+
+        if agent.DRQN:
+            #episodes of 100 time steps
+            for i in range(n):
+                agent.replay.add(obvs[i], actions[i], rewards[i], obvs[(i + 1) % n], (i + 1) % 100 == 0)
+            setup = None
+        else:
+            agent.obv_mem.extend(obvs)
+            agent.action_mem.extend(actions.tolist())
+            agent.reward_mem.extend(rewards.tolist())
+            agent.next_obv_mem.extend(obvs[::-1])
+            setup = lambda agent=agent, n=n: trim(agent, n)
+
+        methods = {
+            "get_action": (setup, lambda agent=agent, obv=obv: agent.get_action(obv)),
+            "train": (setup, agent.train),
+            "update_target_net": (None, agent.update_target_net),
+        }
+
+        if name == "ddrqn":
+            comm = agent.send_comm()
+            methods["send_comm"] = (None, agent.send_comm)
+            methods["receive_comm"] = (None, lambda agent=agent, comm=comm: agent.receive_comm(comm))
+
+        suites.append((params, methods))
+
+    return suites
+
+def episodic_suite(args, name: str) -> list:
+    """
+        function to get the methods of policy gradient or actor critic (name) to benchmark, trained on an episode of
+        fill times the memory size time steps
+
+        returns a list of tuples (params, methods) where methods is a dict of (setup, call) of each method
+    """
+    suites = []
+
+    for params in grid(n_obvs=args.obvs, hidden_size=args.hidden, fill=args.fill):
+        agent = make_algorithm(name, n_obvs=params["n_obvs"], n_actions=N_ACTIONS, hidden_size=params["hidden_size"])
+
+        n = max(int(params["fill"] * args.mem_size), 1)
+        obvs = list(np.random.uniform(size=(n, params["n_obvs"])).astype(np.float32))
+        actions = np.random.randint(N_ACTIONS, size=n).tolist()
+        rewards = np.random.uniform(size=n).tolist()
+        names = ("obv_mem", "action_mem", "rewards_mem") + (("next_obv_mem",) if name == "actor_critic" else ())
+
+        def fill(agent=agent, obvs=obvs, actions=actions, rewards=rewards, names=names):
+            #memory of an episode is cleared by train so it is filled again before every call
+            trim(agent, 0, names)
+            agent.obv_mem.extend(obvs)
+            agent.action_mem.extend(actions)
+            agent.rewards_mem.extend(rewards)
+            if "next_obv_mem" in names:
+                agent.next_obv_mem.extend(obvs)
+
+        methods = {
+            "get_action": (lambda agent=agent, names=names: trim(agent, 0, names), lambda agent=agent, obv=obvs[0]: agent.get_action(obv)),
+            "train": (fill, agent.train),
+        }
+        suites.append((params, methods))
+
+    return suites
+
+def ddpg_suite(args) -> list:
+    """
+        function to get the methods of ddpg to benchmark with 2 continuous actions, the replay memory is filled with
+        random experiences
+
+        returns a list of tuples (params, methods) where methods is a dict of (setup, call) of each method
+    """
+    suites = []
+    n_actions = 2
+
+    for params in grid(n_obvs=args.obvs, hidden_size=args.hidden, batch_size=args.batch, fill=args.fill):
+        agent = make_algorithm("ddpg", n_obvs=params["n_obvs"], n_actions=n_actions, action_high=np.ones(n_actions), action_low=-np.ones(n_actions), hidden_size=params["hidden_size"], batch_size=params["batch_size"], mem_size=args.mem_size)
+
+        n = max(int(params["fill"] * args.mem_size), params["batch_size"])
+        obvs = np.random.uniform(size=(n, params["n_obvs"])).astype(np.float32)
+
+        agent.obv_mem.extend(obvs)
+        agent.action_mem.extend(np.random.uniform(-1, 1, size=(n, n_actions)))
+        agent.rewards_mem.extend(np.random.uniform(size=n).tolist())
+        agent.next_obv_mem.extend(obvs[::-1])
+        setup = lambda agent=agent, n=n: trim(agent, n, ("obv_mem", "action_mem", "rewards_mem", "next_obv_mem"))
+
+        methods = {
+            "get_action": (setup, lambda agent=agent, obv=obvs[0]: agent.get_action(obv)),
+            "train": (setup, agent.train),
+            "update_target_net": (None, agent.update_target_net),
+        }
+        suites.append((params, methods))
+
+    return suites
+
+def ma_actor_critic_suite(args) -> list:
+    """
+        function to get the methods of a master and another agent of the multi-agent actor critic to benchmark, the
+        master is trained on an episode of fill times the memory size time steps of both agents
+
+        returns a list of tuples (params, methods) where methods is a dict of (setup, call) of each method
+    """
+    suites = []
+
+    for params in grid(n_obvs=args.obvs, hidden_size=args.hidden, fill=args.fill):
+        kwargs = {"n_obvs": params["n_obvs"], "n_actions": N_ACTIONS, "hidden_size": params["hidden_size"], "n_agents": 2}
+        master = make_algorithm("ma_actor_critic", master=True, **kwargs)
+        agent = make_algorithm("ma_actor_critic", **kwargs)
+
+        n = max(int(params["fill"] * args.mem_size), 1)
+        obvs = np.random.uniform(size=(n, params["n_obvs"])).astype(np.float32)
+        actions = np.random.randint(N_ACTIONS, size=n).tolist()
+        rewards = np.random.uniform(size=n).tolist()
+
+        def fill(master=master, obvs=obvs, actions=actions, rewards=rewards):
+            #master holds the time steps of both agents, its memory is cleared by train so it is filled before every call
+            trim(master, 0)
+            master.obv_mem.extend([obv, obv] for obv in obvs)
+            master.action_mem.extend([action, action] for action in actions)
+            master.reward_mem.extend([reward, reward] for reward in rewards)
+            master.next_obv_mem.extend([obv, obv] for obv in obvs)
+
+        agent.obv_mem.append(obvs[0])
+        agent.action_mem.append(actions[0])
+        agent.reward_mem.append(rewards[0])
+        comm = agent.send_comm()
+
+        def receive_setup(master=master, obv=obvs[0]):
+            #communication is appended to the latest time step of the master
+            trim(master, 0)
+            master.obv_mem.append([obv])
+            master.action_mem.append([0])
+            master.reward_mem.append([0.0])
+
+        methods = {
+            "get_action": (lambda master=master: trim(master, 0), lambda master=master, obv=obvs[0]: master.get_action(obv)),
+            "train": (fill, master.train),
+            "send_comm": (None, agent.send_comm),
+            "receive_comm": (receive_setup, lambda master=master, comm=comm: master.receive_comm(comm)),
+        }
+        suites.append((params, methods))
+
+    return suites
+
+def get_metadata(args) -> dict:
+    """
+        function to get the metadata of a run, identifying the commit and environment the results were measured in
+
+        returns a dict of metadata
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    versions = {"python": platform.python_version(), "numpy": np.__version__}
+    if "tensorflow" in sys.modules:
+        versions["tensorflow"] = sys.modules["tensorflow"].__version__
+
+    return {"commit": commit, "time": time.time(), "platform": platform.platform(), "cpu_count": os.cpu_count(), "versions": versions, "args": vars(args)}
+
+def result_key(result: dict) -> str:
+    """
+        function to get the key identifying the benchmark of a result, the same in the results of different runs
+    """
+    return f'{result["algorithm"]}.{result["method"]}{json.dumps(result["params"], sort_keys=True)}'
+
+#suite of each algorithm benchmarked
+SUITES = {
+    "q_learning": q_learning_suite,
+    "dqn": dqn_suite,
+    "drqn": lambda args: dqn_suite(args, recurrent=True),
+    "ddrqn": lambda args: dqn_suite(args, name="ddrqn"),
+    "policy_grad": lambda args: episodic_suite(args, "policy_grad"),
+    "actor_critic": lambda args: episodic_suite(args, "actor_critic"),
+    "ddpg": ddpg_suite,
+    "ma_actor_critic": ma_actor_critic_suite,
+}
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    args = get_args()
+
+    np.random.seed(0)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r") as handle:
+            baseline = {result_key(result): result for result in json.load(handle)["results"]}
+
+    results = []
+
+    print(f'{"algorithm":>16}{"method":>18}  {"params":<56}{"ops/s":>12}{"mean (ms)":>11}{"peak (B)":>11}{"kept (B)":>10}{"speedup" if baseline else "":>9}')
+
+    for algorithm in args.algorithms:
+        for params, methods in SUITES[algorithm](args):
+            for method, (setup, call) in methods.items():
+                calls, total = time_method(setup, call, args.min_time, args.max_calls)
+                peak_bytes, retained_bytes = trace_method(setup, call, args.alloc_calls)
+
+                result = {"algorithm": algorithm, "method": method, "params": params, "calls": calls, "ops_per_sec": calls / total, "mean_s": total / calls, "peak_bytes": peak_bytes, "retained_bytes": retained_bytes}
+                results.append(result)
+
+                #speedup is the ratio of the calls per second to those of the baseline
+                previous = baseline.get(result_key(result))
+                speedup = f'{result["ops_per_sec"] / previous["ops_per_sec"]:>8.2f}x' if previous else ""
+                params_str = " ".join(f'{name}={value}' for name, value in params.items())
+
+                print(f'{algorithm:>16}{method:>18}  {params_str:<56}{result["ops_per_sec"]:>12.1f}{result["mean_s"] * 1e3:>11.3f}{peak_bytes:>11.0f}{retained_bytes:>10.0f}{speedup}')
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump({"metadata": get_metadata(args), "results": results}, handle, indent=4)
+
+        print(f'Results saved to {args.output}')
+
+    sys.exit(0)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+#python script to benchmark how long training is blocked by saving (and loading) a q-table with pickle, a synchronous
+#checkpoint and a checkpoint written in the background by a CheckpointWriter
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import pickle
+import shutil
+import tempfile
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.qlearning import QLearning
+from algorithms.checkpoint import CheckpointWriter
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--states", "-s", type=int, nargs="+", default=[10000, 1000000, 10000000], help="Numbers of states to benchmark, defaults to 10000 1000000 10000000")
+    parser.add_argument("--actions", type=int, default=4, help="Number of actions, defaults to 4")
+
+    return parser.parse_args()
+
+def timed(fn) -> float:
+    """
+        function to time a call of fn
+
+        returns the time taken in milliseconds
+    """
+    start_time = time.perf_counter()
+    fn()
+
+    return (time.perf_counter() - start_time) * 1e3
+
+def save_pickle(agent: QLearning, path: str):
+    """
+        function to save the q-table with pickle as done before checkpoints were added
+    """
+    with open(path, "wb") as handle:
+        pickle.dump(agent.q_table, handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    args = get_args()
+    tmp_dir = tempfile.mkdtemp()
+
+    print(f'{"states":>10}{"pickle save (ms)":>18}{"sync save (ms)":>16}{"async save (ms)":>17}{"pickle load (ms)":>18}{"mmap load (ms)":>16}')
+
+    try:
+        for n_states in args.states:
+            agent = QLearning(n_states, args.actions)
+            agent.q_table[:] = np.random.uniform(-1, 1, size=agent.q_table.shape)
+
+            pickle_path = os.path.join(tmp_dir, f'q_table_{n_states}.pkl')
+            checkpoint_path = os.path.join(tmp_dir, f'q_table_{n_states}')
+
+            pickle_save = timed(lambda: save_pickle(agent, pickle_path))
+            sync_save = timed(lambda: agent.save_model(checkpoint_path))
+
+            #time training is blocked is only the snapshot of the q-table, writing is timed separately by flush
+            with CheckpointWriter() as writer:
+                async_save = timed(lambda: agent.save_model(checkpoint_path, step=1, writer=writer))
+                writer.flush()
+
+            pickle_load = timed(lambda: QLearning(n_states, args.actions, saved_path=pickle_path))
+            mmap_load = timed(lambda: QLearning(n_states, args.actions, saved_path=checkpoint_path))
+
+            print(f'{n_states:>10}{pickle_save:>18.1f}{sync_save:>16.1f}{async_save:>17.1f}{pickle_load:>18.1f}{mmap_load:>16.1f}')
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    sys.exit(0)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the cold start of the master, the time a new python process takes to import the algorithms
+#package and make an algorithm from the registry, against importing every algorithm as the package did before it
+#imported its modules lazily
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys, subprocess
+import argparse
+import time
+import numpy as np
+
+#-----------------------------------------------------------------------------------------------------------
+# Variables
+#-----------------------------------------------------------------------------------------------------------
+
+#algorithms package is located in the master directory
+MASTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+#code run by each new process
+CASES = {
+    "package": "import algorithms",
+    "every algorithm": "from algorithms import *",
+    "q_learning": "from algorithms.registry import make_algorithm; make_algorithm('q_learning', n_states=1000, n_actions=4)",
+    "dqn": "from algorithms.registry import make_algorithm; make_algorithm('dqn', n_obvs=3, n_actions=4)",
+}
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--repeats", "-r", type=int, default=5, help="Number of processes started per case, defaults to 5")
+
+    return parser.parse_args()
+
+def cold_start(code: str) -> tuple:
+    """
+        function to time a new python process running code, including the start up of the interpreter
+
+        returns a tuple of the time taken in seconds and whether tensorflow was imported
+    """
+    start_time = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", f'{code}; import sys; print("tensorflow" in sys.modules)'], cwd=MASTER_PATH, capture_output=True, text=True, check=True).stdout
+
+    return time.perf_counter() - start_time, out.strip().splitlines()[-1] == "True"
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    args = get_args()
+
+    #baseline of starting the interpreter alone
+    interpreter = np.median([cold_start("pass")[0] for i in range(args.repeats)])
+
+    print(f'{"case":>16}{"median (s)":>13}{"min (s)":>10}{"tensorflow":>13}')
+    print(f'{"interpreter":>16}{interpreter:>13.3f}')
+
+    for name, code in CASES.items():
+        times, tensorflow = zip(*(cold_start(code) for i in range(args.repeats)))
+
+        print(f'{name:>16}{np.median(times):>13.3f}{np.min(times):>10.3f}{str(tensorflow[0]):>13}')
+
+    sys.exit(0)
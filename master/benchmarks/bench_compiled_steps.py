@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the per-call latency of the eager and graph compiled act and train steps of each algorithm
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms import DQN, DDRQN, PolicyGradient, ActorCritic, DDPG, MAActorCritic
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--iterations", "-i", type=int, default=200, help="Number of timed calls of each step, defaults to 200")
+    parser.add_argument("--obvs", type=int, default=3, help="Size of the observation space, defaults to 3")
+    parser.add_argument("--actions", type=int, default=4, help="Size of the action space, defaults to 4")
+    parser.add_argument("--batch-size", "-b", type=int, default=32, help="Batch size (or episode length) of train steps, defaults to 32")
+
+    return parser.parse_args()
+
+def time_calls(fn, fn_args: tuple, iterations: int) -> float:
+    """
+        function to time calls of a function
+
+        fn is the function to be timed
+
+        fn_args is a tuple of the arguments to call fn with
+
+        iterations is the number of timed calls
+
+        returns the mean latency of a call in microseconds
+    """
+    #untimed warm up call, includes graph tracing for compiled functions
+    fn(*fn_args)
+
+    start_time = time.perf_counter()
+    for i in range(iterations):
+        fn(*fn_args)
+
+    return (time.perf_counter() - start_time) / iterations * 1e6
+
+def get_steps(n_obvs: int, n_actions: int, batch_size: int) -> list:
+    """
+        function to get the compiled steps of each algorithm and the arguments to benchmark them with
+
+        n_obvs is the size of the observation space
+
+        n_actions is the size of the action space
+
+        batch_size is the batch size (or episode length) of the train steps
+
+        returns a list of tuples (name, step, args)
+    """
+    obv = np.random.uniform(size=(1, n_obvs)).astype(np.float32)
+    obvs = np.random.uniform(size=(batch_size, n_obvs)).astype(np.float32)
+    actions = np.random.randint(n_actions, size=batch_size).astype(np.int32)
+    rewards = np.random.uniform(size=batch_size).astype(np.float32)
+    next_obvs = np.random.uniform(size=(batch_size, n_obvs)).astype(np.float32)
+    tau = np.float32(0.01)
+
+    dqn = DQN(n_obvs, n_actions)
+    drqn = DQN(n_obvs, n_actions, DRQN=True)
+    ddrqn = DDRQN(n_obvs - 1, n_actions)
+    pg = PolicyGradient(n_obvs, n_actions)
+    ac = ActorCritic(n_obvs, n_actions)
+    ddpg = DDPG(n_obvs, 1, np.ones(1), -np.ones(1))
+    maac = MAActorCritic(n_obvs, n_actions, master=True)
+
+    return [
+        ("DQN act", dqn.act_step, (obv,)),
+        ("DQN train", dqn.train_step, (obvs, actions, rewards, next_obvs)),
+        ("DQN target", dqn.target_update_step, (tau,)),
+        ("DRQN act", drqn.act_step, (obv,)),
+        ("DRQN train", drqn.train_step, (obvs, actions, rewards, next_obvs)),
+        ("DDRQN act", ddrqn.act_step, (obv,)),
+        ("DDRQN train", ddrqn.train_step, (obv, actions[:1], rewards[:1], next_obvs[:1])),
+        ("PG act", pg.act_step, (obv,)),
+        ("PG train", pg.train_step, (obvs, actions, rewards)),
+        ("A2C act", ac.act_step, (obv,)),
+        ("A2C train", ac.train_step, (obvs, actions, rewards)),
+        ("DDPG act", ddpg.act_step, (obv,)),
+        ("DDPG train", ddpg.train_step, (obvs, np.expand_dims(rewards, axis=1), rewards, next_obvs)),
+        ("DDPG target", ddpg.target_update_step, (tau,)),
+        ("MAAC act", maac.act_step, (obv,)),
+        ("MAAC critic", maac.critic_step, (obvs, rewards)),
+        ("MAAC train", maac.train_step, (obvs, actions, rewards, rewards)),
+    ]
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    args = get_args()
+
+    steps = get_steps(args.obvs, args.actions, args.batch_size)
+
+    print(f'{"step":<14}{"eager (us)":>14}{"compiled (us)":>16}{"speedup":>10}')
+
+    for name, step, step_args in steps:
+        #python_function is the original method run eagerly, i.e. the behaviour before compilation
+        eager = time_calls(step.python_function, step_args, args.iterations)
+        compiled = time_calls(step, step_args, args.iterations)
+        
+        print(f'{name:<14}{eager:>14.1f}{compiled:>16.1f}{eager / compiled:>9.1f}x')
+
+        #compiled steps have a fixed input signature so must only ever have been traced once
+        if step.experimental_get_tracing_count() > 1:
+            logging.warning("%s was retraced %i times", name, step.experimental_get_tracing_count())
+
+    sys.exit(0)
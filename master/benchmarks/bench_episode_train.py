@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the batched whole-episode train steps of policy gradient and actor critic against
+#the previous per time step implementation
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import time
+import numpy as np
+import tensorflow as tf
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms import PolicyGradient, ActorCritic
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--lengths", "-l", type=int, nargs="+", default=[100, 1000, 10000], help="Episode lengths to benchmark, defaults to 100 1000 10000")
+    parser.add_argument("--obvs", type=int, default=3, help="Size of the observation space, defaults to 3")
+    parser.add_argument("--actions", type=int, default=4, help="Size of the action space, defaults to 4")
+
+    return parser.parse_args()
+
+def per_step_returns(rewards: list, gamma: float, eps: float) -> np.ndarray:
+    """
+        function to calculate the normalised discounted returns as previously done by the algorithms
+
+        returns an array of the normalised returns
+    """
+    returns = []
+    discounted_sum = 0
+
+    for reward in rewards[::-1]:
+        discounted_sum = reward + gamma * discounted_sum
+        returns.insert(0, discounted_sum)
+
+    return (returns - np.mean(returns)) / (np.std(returns) + eps)
+
+def per_step_pg_loss(agent: PolicyGradient, obvs: np.ndarray, actions: np.ndarray, rewards: np.ndarray) -> float:
+    """
+        function to calculate the policy gradient loss and gradients calling the network once per time step
+
+        returns the loss
+    """
+    returns = per_step_returns(list(rewards), agent.gamma, agent.eps)
+
+    with tf.GradientTape() as tape:
+        loss = 0
+        for i in range(np.shape(obvs)[0]):
+            action_probs = agent.policy_net(np.expand_dims(obvs[i], axis=0))
+            action_log_prob = tf.math.log(action_probs[0, actions[i]])
+            loss += -action_log_prob * returns[i]
+
+    tape.gradient(loss, agent.policy_net.trainable_variables)
+
+    return float(loss)
+
+def per_step_ac_loss(agent: ActorCritic, obvs: np.ndarray, actions: np.ndarray, rewards: np.ndarray) -> float:
+    """
+        function to calculate the actor critic loss and gradients calling the network once per time step
+
+        returns the loss
+    """
+    returns = per_step_returns(list(rewards), agent.gamma, agent.eps)
+    huber = tf.keras.losses.Huber()
+
+    with tf.GradientTape() as tape:
+        actor_loss = 0
+        critic_loss = 0
+        for i in range(np.shape(obvs)[0]):
+            action_probs, critic_val = agent.ac_net(np.expand_dims(obvs[i], axis=0))
+            action_log_prob = tf.math.log(action_probs[0, actions[i]])
+            advantage = returns[i] - critic_val
+            actor_loss += -action_log_prob * advantage
+            critic_loss += huber(critic_val, np.expand_dims(returns[i], axis=0))
+
+        loss = actor_loss + critic_loss
+
+    tape.gradient(loss, agent.ac_net.trainable_variables)
+
+    return float(np.squeeze(loss))
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    args = get_args()
+
+    print(f'{"algorithm":<10}{"length":>8}{"per step (s)":>14}{"batched (s)":>13}{"speedup":>10}{"loss diff":>12}')
+
+    for name, alg, per_step_loss in (("PG", PolicyGradient, per_step_pg_loss), ("A2C", ActorCritic, per_step_ac_loss)):
+        agent = alg(args.obvs, args.actions)
+
+        for length in args.lengths:
+            obvs = np.random.uniform(size=(length, args.obvs)).astype(np.float32)
+            actions = np.random.randint(args.actions, size=length).astype(np.int32)
+            rewards = np.random.uniform(-1, 1, size=length).astype(np.float32)
+
+            #untimed warm up call so graph tracing and optimisation are not timed
+            agent.train_step(obvs, actions, rewards)
+
+            start_time = time.perf_counter()
+            ref_loss = per_step_loss(agent, obvs, actions, rewards)
+            per_step_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            loss = float(agent.train_step(obvs, actions, rewards))
+            batched_time = time.perf_counter() - start_time
+
+            print(f'{name:<10}{length:>8}{per_step_time:>14.4f}{batched_time:>13.4f}{per_step_time / batched_time:>9.0f}x{abs(ref_loss - loss) / max(abs(ref_loss), 1):>12.2e}')
+
+    sys.exit(0)
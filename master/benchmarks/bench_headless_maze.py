@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the per step cost of the (patched) gym-maze env with rendering disabled against the
+#HeadlessMaze env on the same maze, for a range of numbers of robots
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+import numpy as np
+
+from gym_maze.envs.maze_env import MazeEnv
+from gym_maze.envs.maze_view_2d import Maze
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.headless_maze import HeadlessMaze
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--robots", "-r", type=int, nargs="+", default=[1, 16, 256], help="Numbers of robots to benchmark, defaults to 1 16 256")
+    parser.add_argument("--size", "-s", type=int, default=10, help="Width and height of the maze, defaults to 10")
+    parser.add_argument("--iterations", "-i", type=int, default=1000, help="Number of timed steps, defaults to 1000")
+
+    return parser.parse_args()
+
+def timed(env, n_robots: int, iterations: int) -> float:
+    """
+        function to time steps of env with random actions, resetting the env whenever it is done
+
+        returns the mean time per step in microseconds
+    """
+    actions = np.random.randint(4, size=(iterations, n_robots))
+    env.reset()
+
+    start_time = time.perf_counter()
+    for i in range(iterations):
+        _, _, done, _ = env.step(actions[i] if n_robots > 1 else int(actions[i, 0]))
+
+        if done:
+            env.reset()
+
+    return (time.perf_counter() - start_time) / iterations * 1e6
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    args = get_args()
+    tmp_dir = tempfile.mkdtemp()
+
+    print(f'{"robots":>7}{"gym-maze (us/step)":>21}{"headless (us/step)":>21}{"speedup":>10}')
+
+    try:
+        #both envs load the same randomly generated maze
+        maze_path = os.path.join(tmp_dir, "maze.npy")
+        Maze(maze_size=(args.size, args.size)).save_maze(maze_path)
+
+        for n_robots in args.robots:
+            gym_maze = timed(MazeEnv(maze_file=maze_path, enable_render=False, n_robots=n_robots), n_robots, args.iterations)
+            headless = timed(HeadlessMaze(load_maze_path=maze_path, n_agents=n_robots), n_robots, args.iterations)
+
+            print(f'{n_robots:>7}{gym_maze:>21.1f}{headless:>21.1f}{gym_maze / headless:>9.1f}x')
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    sys.exit(0)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the latency of each agent joining the master in a burst of more agents than the spares of an
+#AgentCache, for a first burst (the pool runs out and joins wait for agents to be built) and a second burst of the same
+#size once the grown pool is ready again
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.agent_cache import AgentCache
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--algorithm", "-a", type=str, choices=["dqn", "ddrqn"], default="ddrqn", help="Algorithm of the agents, defaults to ddrqn")
+    parser.add_argument("--burst", "-b", type=int, default=8, help="Number of agents joining in each burst, defaults to 8")
+    parser.add_argument("--spares", type=int, default=4, help="Number of spares kept by the cache before the first burst, defaults to 4")
+
+    return parser.parse_args()
+
+def burst(cache: AgentCache, algorithm: str, n_joins: int, kwargs: dict) -> np.ndarray:
+    """
+        function to time agents joining one after another, as the master takes them from the cache
+
+        returns an array of the seconds taken for each agent to join and take its first action
+    """
+    obv = np.random.uniform(size=kwargs["n_obvs"])
+    times = []
+
+    for i in range(n_joins):
+        start_time = time.perf_counter()
+        agent, _ = cache.get(algorithm, **kwargs)
+        agent.get_action(obv)
+        times.append(time.perf_counter() - start_time)
+
+    return np.array(times)
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    args = get_args()
+    kwargs = {"n_obvs": 3, "n_actions": 4}
+
+    with AgentCache(n_spares=args.spares) as cache:
+        cache.prepare(args.algorithm, **kwargs)
+        #spares are built before the master accepts joins
+        cache.wait_ready()
+
+        first = burst(cache, args.algorithm, args.burst, kwargs)
+
+        #pool is grown by the joins which found no spare ready and refilled between bursts
+        cache.wait_ready()
+        spares = cache.ready(args.algorithm, **kwargs)
+
+        second = burst(cache, args.algorithm, args.burst, kwargs)
+
+    print(f'{args.algorithm}, bursts of {args.burst} joins, {args.spares} spares before the first burst and {spares} before the second')
+    print(f'{"join":>6}{"first burst (s)":>18}{"second burst (s)":>18}')
+
+    for i, (first_time, second_time) in enumerate(zip(first, second)):
+        print(f'{i:>6}{first_time:>18.4f}{second_time:>18.4f}')
+
+    print(f'{"mean":>6}{np.mean(first):>18.4f}{np.mean(second):>18.4f}')
+    print(f'{"max":>6}{np.max(first):>18.4f}{np.max(second):>18.4f}')
+
+    sys.exit(0)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the per step cost of independent q-learning agents held as a list of QLearning objects 
+#against the vectorised MultiAgentQLearning engine
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.qlearning import QLearning, MultiAgentQLearning
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--agents", "-a", type=int, nargs="+", default=[1, 10, 100, 1000], help="Numbers of agents to benchmark, defaults to 1 10 100 1000")
+    parser.add_argument("--steps", "-t", type=int, default=1000, help="Number of timed steps, defaults to 1000")
+    parser.add_argument("--states", type=int, default=100, help="Number of states, defaults to 100")
+    parser.add_argument("--actions", type=int, default=4, help="Number of actions, defaults to 4")
+
+    return parser.parse_args()
+
+def step_list(agents: list, states: np.ndarray, rewards: np.ndarray, next_states: np.ndarray):
+    """
+        function to perform one step of action selection and training for a list of QLearning agents
+    """
+    actions = np.zeros(len(agents), dtype=int)
+
+    for i in range(len(agents)):
+        actions[i] = agents[i].get_action(states[i])
+
+    for i in range(len(agents)):
+        agents[i].train(states[i], actions[i], rewards[i], next_states[i])
+
+def step_vectorised(agents: MultiAgentQLearning, states: np.ndarray, rewards: np.ndarray, next_states: np.ndarray):
+    """
+        function to perform one step of action selection and training for all agents of a MultiAgentQLearning engine
+    """
+    actions = agents.get_action(states)
+    agents.train(states, actions, rewards, next_states)
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    args = get_args()
+
+    print(f'{"agents":>8}{"list (us/step)":>17}{"vectorised (us/step)":>23}{"speedup":>10}')
+
+    for n_agents in args.agents:
+        list_agents = [QLearning(args.states, args.actions, epsilon_max=0.5) for i in range(n_agents)]
+        vec_agents = MultiAgentQLearning(n_agents, args.states, args.actions, epsilon_max=0.5)
+
+        states = np.random.randint(args.states, size=(args.steps + 1, n_agents))
+        rewards = np.random.uniform(-1, 1, size=(args.steps, n_agents))
+
+        times = []
+        for step, agents in ((step_list, list_agents), (step_vectorised, vec_agents)):
+            start_time = time.perf_counter()
+            for t in range(args.steps):
+                step(agents, states[t], rewards[t], states[t + 1])
+
+            times.append((time.perf_counter() - start_time) / args.steps * 1e6)
+
+        print(f'{n_agents:>8}{times[0]:>17.1f}{times[1]:>23.1f}{times[0] / times[1]:>9.1f}x')
+
+    sys.exit(0)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the number of agent experiences per second collected and trained on by the independent
+#q-learning and dqn multi-agent runners with the agents trained serially in one process against the agents split
+#between a range of numbers of worker processes
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.headless_maze import HeadlessMaze
+from algorithms.qlearning import run_gym_q_learning_multi_agent
+from algorithms.dqn import run_gym_dqn_multi_agent
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--agents", "-a", type=int, default=8, help="Number of agents, defaults to 8")
+    parser.add_argument("--workers", "-w", type=int, nargs="+", default=[2, 4, 8], help="Numbers of worker processes to benchmark, defaults to 2 4 8")
+    parser.add_argument("--episodes", type=int, default=4, help="Number of episodes per run, defaults to 4")
+    parser.add_argument("--time-steps", "-t", type=int, default=200, help="Maximum number of time steps per episode, defaults to 200")
+    parser.add_argument("--size", "-s", type=int, default=10, help="Width and height of the maze, defaults to 10")
+
+    return parser.parse_args()
+
+def timed(run, env, n_agents: int, n_workers: int, episodes: int, time_steps: int) -> float:
+    """
+        function to time a run of a multi-agent runner on env
+
+        returns the number of agent experiences collected per second
+    """
+    start_time = time.perf_counter()
+    all_actions = run(env, n_agents=n_agents, episodes=episodes, time_steps=time_steps, n_workers=n_workers)[1]
+
+    return n_agents * sum(len(ep_actions) for ep_actions in all_actions) / (time.perf_counter() - start_time)
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging, runners log every episode so only warnings are shown
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.WARNING)
+
+    args = get_args()
+
+    #every run uses the same randomly generated maze
+    env = HeadlessMaze(maze_cells=np.random.randint(16, size=(args.size, args.size)), n_agents=args.agents)
+
+    print(f'{"runner":>12}{"workers":>9}{"serial (exp/s)":>17}{"parallel (exp/s)":>19}{"speedup":>10}')
+
+    for name, run in (("q-learning", run_gym_q_learning_multi_agent), ("dqn", run_gym_dqn_multi_agent)):
+        serial = timed(run, env, args.agents, 0, args.episodes, args.time_steps)
+
+        for n_workers in args.workers:
+            parallel = timed(run, env, args.agents, n_workers, args.episodes, args.time_steps)
+
+            print(f'{name:>12}{n_workers:>9}{serial:>17.0f}{parallel:>19.0f}{parallel / serial:>9.1f}x')
+
+    sys.exit(0)
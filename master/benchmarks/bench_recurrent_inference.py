@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the per step cost of DDRQN action selection by re-running the Q-network over the whole
+#episode history (the stateless alternative) against stepping the stored LSTM state of every agent by one time step
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import time
+import numpy as np
+import tensorflow as tf
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.ddrqn import DDRQN
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--agents", "-a", type=int, nargs="+", default=[1, 8, 64], help="Numbers of agents to benchmark, defaults to 1 8 64")
+    parser.add_argument("--history", type=int, nargs="+", default=[10, 100, 1000], help="Lengths of episode history to benchmark, defaults to 10 100 1000")
+    parser.add_argument("--iterations", "-i", type=int, default=50, help="Number of timed steps, defaults to 50")
+    parser.add_argument("--obvs", type=int, default=8, help="Size of the observation space, defaults to 8")
+    parser.add_argument("--actions", type=int, default=4, help="Number of actions, defaults to 4")
+
+    return parser.parse_args()
+
+def timed(fn, iterations: int) -> float:
+    """
+        function to time calls of fn after an untimed warm up call
+
+        returns the mean time per call in microseconds
+    """
+    fn()
+
+    start_time = time.perf_counter()
+    for i in range(iterations):
+        fn()
+
+    return (time.perf_counter() - start_time) / iterations * 1e6
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    args = get_args()
+
+    print(f'{"agents":>7}{"history":>9}{"full unroll (us/step)":>24}{"stateful (us/step)":>21}{"speedup":>10}')
+
+    for n_agents in args.agents:
+        agents = [DDRQN(args.obvs, args.actions) for i in range(n_agents)]
+        for i in range(1, n_agents):
+            agents[i].receive_comm(agents[0].send_comm())
+
+        obvs = np.random.uniform(size=(n_agents, args.obvs))
+        zeros = np.zeros((n_agents, agents[0].hidden_size), dtype=np.float32)
+        unroll = tf.function(lambda seqs: agents[0].q_net([seqs, zeros, zeros], training=False)[0][:, -1])
+
+        stateful = timed(lambda: DDRQN.get_actions(agents, obvs), args.iterations)
+
+        for history in args.history:
+            seqs = np.random.uniform(size=(n_agents, history, args.obvs + 1)).astype(np.float32)
+            full = timed(lambda: unroll(seqs), args.iterations)
+
+            print(f'{n_agents:>7}{history:>9}{full:>24.1f}{stateful:>21.1f}{full / stateful:>9.1f}x')
+
+    sys.exit(0)
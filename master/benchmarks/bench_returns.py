@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the vectorised return and advantage functions against per element python loops
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.returns import discounted_returns, gae
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--agents", "-a", type=int, nargs="+", default=[1, 16], help="Numbers of agents to benchmark, defaults to 1 16")
+    parser.add_argument("--lengths", "-l", type=int, nargs="+", default=[100, 1000, 10000], help="Episode lengths to benchmark, defaults to 100 1000 10000")
+    parser.add_argument("--gamma", "-g", type=float, default=0.99, help="Discount factor, defaults to 0.99")
+
+    return parser.parse_args()
+
+def loop_returns(rewards: np.ndarray, gamma: float) -> np.ndarray:
+    """
+        function to calculate discounted returns for each agent as previously done by the algorithms
+
+        returns an array of returns with shape [agents, time]
+    """
+    all_returns = []
+
+    for agent_rewards in rewards:
+        returns = []
+        discounted_sum = 0
+
+        for reward in agent_rewards[::-1]:
+            discounted_sum = reward + gamma * discounted_sum
+            returns.insert(0, discounted_sum)
+
+        all_returns.append(returns)
+
+    return np.array(all_returns)
+
+def loop_gae(rewards: np.ndarray, values: np.ndarray, gamma: float, lam: float) -> np.ndarray:
+    """
+        function to calculate generalised advantage estimates for each agent with a loop over every element
+
+        returns an array of advantages with shape [agents, time]
+    """
+    advantages = np.zeros_like(rewards)
+
+    for i in range(np.shape(rewards)[0]):
+        advantage = 0
+
+        for t in range(np.shape(rewards)[1] - 1, -1, -1):
+            next_value = values[i, t + 1] if t + 1 < np.shape(rewards)[1] else 0
+            delta = rewards[i, t] + gamma * next_value - values[i, t]
+            advantage = delta + gamma * lam * advantage
+            advantages[i, t] = advantage
+
+    return advantages
+
+def time_call(fn, fn_args: tuple) -> tuple:
+    """
+        function to time a single call of a function
+
+        returns a tuple (result, time in seconds)
+    """
+    start_time = time.perf_counter()
+    result = fn(*fn_args)
+
+    return result, time.perf_counter() - start_time
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    args = get_args()
+
+    print(f'{"function":<10}{"agents":>8}{"length":>8}{"loop (ms)":>12}{"vectorised (ms)":>17}{"speedup":>10}{"max error":>12}')
+
+    for n_agents in args.agents:
+        for length in args.lengths:
+            rewards = np.random.uniform(-1, 1, size=(n_agents, length))
+            values = np.random.uniform(-1, 1, size=(n_agents, length))
+
+            ref, loop_time = time_call(loop_returns, (rewards, args.gamma))
+            result, vec_time = time_call(discounted_returns, (rewards, args.gamma))
+            print(f'{"returns":<10}{n_agents:>8}{length:>8}{loop_time * 1e3:>12.2f}{vec_time * 1e3:>17.2f}{loop_time / vec_time:>9.1f}x{np.max(np.abs(ref - result)):>12.2e}')
+
+            ref, loop_time = time_call(loop_gae, (rewards, values, args.gamma, 0.95))
+            (result, _), vec_time = time_call(gae, (rewards, values, args.gamma, 0.95))
+            print(f'{"gae":<10}{n_agents:>8}{length:>8}{loop_time * 1e3:>12.2f}{vec_time * 1e3:>17.2f}{loop_time / vec_time:>9.1f}x{np.max(np.abs(ref - result)):>12.2e}')
+
+    sys.exit(0)
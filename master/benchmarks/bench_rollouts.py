@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the number of time steps per second collected and trained on by the single agent policy
+#gradient and actor critic runners stepping one env in the training process against a range of numbers of rollout
+#worker processes
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import functools
+import logging
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.headless_maze import HeadlessMaze
+from algorithms.rollouts import RolloutWorkers
+from algorithms.policy_grad import run_gym_policy_grad_single_agent
+from algorithms.actor_critic import run_gym_actor_critic_single_agent
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--workers", "-w", type=int, nargs="+", default=[2, 4, 8], help="Numbers of rollout workers to benchmark, defaults to 2 4 8")
+    parser.add_argument("--episodes", type=int, default=16, help="Number of episodes per run, defaults to 16")
+    parser.add_argument("--time-steps", "-t", type=int, default=200, help="Maximum number of time steps per episode, defaults to 200")
+    parser.add_argument("--size", "-s", type=int, default=10, help="Width and height of the maze, defaults to 10")
+
+    return parser.parse_args()
+
+def timed(run, env, episodes: int, time_steps: int) -> float:
+    """
+        function to time a run of a single agent runner on env
+
+        returns the number of time steps collected per second
+    """
+    start_time = time.perf_counter()
+    all_actions = run(env, episodes=episodes, time_steps=time_steps)[1]
+
+    return sum(len(ep_actions) for ep_actions in all_actions) / (time.perf_counter() - start_time)
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging, runners log every episode so only warnings are shown
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.WARNING)
+
+    args = get_args()
+
+    #every run uses the same randomly generated maze
+    env_fn = functools.partial(HeadlessMaze, maze_cells=np.random.randint(16, size=(args.size, args.size)), n_agents=1)
+
+    print(f'{"runner":>16}{"workers":>9}{"serial (steps/s)":>19}{"parallel (steps/s)":>21}{"speedup":>10}')
+
+    for name, run in (("policy gradient", run_gym_policy_grad_single_agent), ("actor critic", run_gym_actor_critic_single_agent)):
+        serial = timed(run, env_fn(), args.episodes, args.time_steps)
+
+        for n_workers in args.workers:
+            #start up of the workers is not timed
+            with RolloutWorkers([env_fn] * n_workers) as workers:
+                parallel = timed(run, workers, args.episodes, args.time_steps)
+
+            print(f'{name:>16}{n_workers:>9}{serial:>19.0f}{parallel:>21.0f}{parallel / serial:>9.1f}x')
+
+    sys.exit(0)
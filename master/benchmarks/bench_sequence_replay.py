@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the cost per trained transition of DDRQN trained online on single transitions (as before
+#sequence replay) against training on batches of windows from sequence replay with back propagation through time
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.ddrqn import DDRQN
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--batch-sizes", "-b", type=int, nargs="+", default=[1, 8, 32], help="Numbers of windows per batch to benchmark, defaults to 1 8 32")
+    parser.add_argument("--seq-len", type=int, default=16, help="Number of trained time steps per window, defaults to 16")
+    parser.add_argument("--burn-in", type=int, default=8, help="Number of burn in time steps per window, defaults to 8")
+    parser.add_argument("--iterations", "-i", type=int, default=50, help="Number of timed training steps, defaults to 50")
+    parser.add_argument("--obvs", type=int, default=8, help="Size of the observation space, defaults to 8")
+    parser.add_argument("--actions", type=int, default=4, help="Number of actions, defaults to 4")
+
+    return parser.parse_args()
+
+def fill(agent: DDRQN, n_obvs: int, n_steps: int):
+    """
+        function to fill the replay memory of an agent with random experiences
+    """
+    for t in range(n_steps):
+        agent.get_action(np.random.uniform(size=n_obvs))
+        agent.remember(np.random.uniform(-1, 1), np.random.uniform(size=n_obvs), t % 50 == 49)
+
+def timed(fn, iterations: int) -> float:
+    """
+        function to time calls of fn after an untimed warm up call
+
+        returns the mean time per call in microseconds
+    """
+    fn()
+
+    start_time = time.perf_counter()
+    for i in range(iterations):
+        fn()
+
+    return (time.perf_counter() - start_time) / iterations * 1e6
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    args = get_args()
+
+    #online training on a single transition, as DDRQN was trained before sequence replay
+    agent = DDRQN(args.obvs, args.actions)
+    obv = np.random.uniform(size=(1, args.obvs + 1)).astype(np.float32)
+    action = np.zeros(1, dtype=np.int32)
+    reward = np.ones(1, dtype=np.float32)
+    online = timed(lambda: agent.train_step(obv, action, reward, obv), args.iterations)
+
+    print(f'{"batch":>6}{"transitions":>13}{"us/step":>10}{"us/transition":>15}{"vs online":>11}')
+    print(f'{"online":>6}{1:>13}{online:>10.1f}{online:>15.1f}{1.0:>10.1f}x')
+
+    for batch_size in args.batch_sizes:
+        agent = DDRQN(args.obvs, args.actions, batch_size=batch_size, seq_len=args.seq_len, burn_in=args.burn_in)
+        fill(agent, args.obvs, 1000)
+
+        step = timed(agent.train, args.iterations)
+        transitions = batch_size * args.seq_len
+        print(f'{batch_size:>6}{transitions:>13}{step:>10.1f}{step / transitions:>15.1f}{online / (step / transitions):>10.1f}x')
+
+    sys.exit(0)
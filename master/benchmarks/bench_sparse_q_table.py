@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the per step cost and memory of q-learning with a dense q-table against a SparseQTable
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import time
+import numpy as np
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.qlearning import QLearning
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--states", "-s", type=int, nargs="+", default=[1000, 100000, 10000000], help="Numbers of states to benchmark, defaults to 1000 100000 10000000")
+    parser.add_argument("--visited", "-v", type=int, default=1000, help="Number of distinct states visited, defaults to 1000")
+    parser.add_argument("--steps", "-t", type=int, default=10000, help="Number of timed steps, defaults to 10000")
+    parser.add_argument("--actions", type=int, default=4, help="Number of actions, defaults to 4")
+
+    return parser.parse_args()
+
+def run(agent: QLearning, states: np.ndarray, rewards: np.ndarray) -> float:
+    """
+        function to time steps of action selection and training
+
+        returns the mean time per step in microseconds
+    """
+    start_time = time.perf_counter()
+    for t in range(np.size(rewards)):
+        action = agent.get_action(states[t])
+        agent.train(states[t], action, rewards[t], states[t + 1])
+
+    return (time.perf_counter() - start_time) / np.size(rewards) * 1e6
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO)
+
+    args = get_args()
+
+    print(f'{"states":>10}{"dense (us/step)":>17}{"dense (MB)":>12}{"sparse (us/step)":>18}{"sparse (MB)":>13}')
+
+    for n_states in args.states:
+        #agent only visits a fixed subset of the states, spread over the whole state space
+        visited = np.random.choice(n_states, size=min(args.visited, n_states), replace=False)
+        states = np.random.choice(visited, size=args.steps + 1)
+        rewards = np.random.uniform(-1, 1, size=args.steps)
+
+        results = []
+        for sparse in (False, True):
+            agent = QLearning(n_states, args.actions, epsilon_max=0.5, sparse=sparse)
+            step_time = run(agent, states, rewards)
+            results += [step_time, agent.q_table.nbytes / 1e6]
+
+        print(f'{n_states:>10}{results[0]:>17.1f}{results[1]:>12.2f}{results[2]:>18.1f}{results[3]:>13.2f}')
+
+    sys.exit(0)
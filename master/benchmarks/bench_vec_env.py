@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+#python script to benchmark the number of experiences per second collected and trained on by the q-learning and dqn
+#runners with a single env against a VecEnv and a SubprocVecEnv of a range of numbers of envs
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import os, sys
+import argparse
+import logging
+import time
+import numpy as np
+
+from types import SimpleNamespace
+
+#algorithms package is located in the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from algorithms.vec_env import VecEnv, SubprocVecEnv
+from algorithms.qlearning import run_gym_q_learning_single_agent
+from algorithms.dqn import run_gym_dqn_single_agent
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("--envs", "-e", type=int, nargs="+", default=[1, 8, 32], help="Numbers of envs of the VecEnv to benchmark, defaults to 1 8 32")
+    parser.add_argument("--episodes", type=int, default=64, help="Number of episodes per run, defaults to 64")
+    parser.add_argument("--length", "-l", type=int, default=50, help="Length of the corridor env, defaults to 50")
+    parser.add_argument("--delay", "-d", type=float, default=0.0, help="Time each step of the corridor env sleeps for in seconds, to simulate a slower env, defaults to 0")
+
+    return parser.parse_args()
+
+def timed(run, env, episodes: int) -> float:
+    """
+        function to time a run of a runner on env
+
+        returns the number of experiences collected per second
+    """
+    start_time = time.perf_counter()
+    all_actions = run(env, episodes=episodes, time_steps=1000)[1]
+
+    return sum(len(ep_actions) for ep_actions in all_actions) / (time.perf_counter() - start_time)
+
+#-----------------------------------------------------------------------------------------------------------
+# Classes
+#-----------------------------------------------------------------------------------------------------------
+
+class Corridor():
+    """
+        Class of a minimal gym-like env, a corridor the agent moves along (action 1 moves forward and action 0 backwards)
+        until it reaches the end, so the cost of the env is negligible next to the cost of the runner
+    """
+    def __init__(self, length: int, delay: float=0.0):
+        self.length = length
+        self.delay = delay
+        self.observation_space = SimpleNamespace(shape=(1,), low=np.zeros(1), high=np.full(1, length - 1))
+        self.action_space = SimpleNamespace(n=2)
+        self.spec = SimpleNamespace(id="corridor-v0")
+        self.unwrapped = self
+        self.position = 0
+
+    def reset(self) -> np.ndarray:
+        self.position = 0
+
+        return np.array([self.position], dtype=np.float32)
+
+    def step(self, action: int) -> tuple:
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+        self.position = min(max(self.position + (1 if action == 1 else -1), 0), self.length - 1)
+        done = self.position == self.length - 1
+
+        return np.array([self.position], dtype=np.float32), 1.0 if done else -0.01, done, {}
+
+    def render(self):
+        pass
+
+    def close(self):
+        pass
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    #init logging, runners log every episode so only warnings are shown
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.WARNING)
+
+    args = get_args()
+
+    print(f'{"runner":>12}{"envs":>6}{"single env (exp/s)":>21}{"VecEnv (exp/s)":>17}{"SubprocVecEnv (exp/s)":>24}{"speedup":>10}')
+
+    for name, run in (("q-learning", run_gym_q_learning_single_agent), ("dqn", run_gym_dqn_single_agent)):
+        single = timed(run, Corridor(args.length, args.delay), args.episodes)
+
+        for n_envs in args.envs:
+            env_fns = [lambda: Corridor(args.length, args.delay)] * n_envs
+            vec = timed(run, VecEnv(env_fns), args.episodes)
+
+            with SubprocVecEnv(env_fns) as subproc_env:
+                subproc = timed(run, subproc_env, args.episodes)
+
+            print(f'{name:>12}{n_envs:>6}{single:>21.0f}{vec:>17.0f}{subproc:>24.0f}{max(vec, subproc) / single:>9.1f}x')
+
+    sys.exit(0)
@@ -15,8 +15,9 @@ import logging
 from dotenv import load_dotenv
 from contextlib import AsyncExitStack, asynccontextmanager
 from asyncio_mqtt import Client, Will, MqttError
-from gym_robot_maze import Maze
 from agent_interface import AgentInterface
+from algorithms.agent_cache import AgentCache
+from algorithms.tracing import Tracer
 
 #-----------------------------------------------------------------------------------------------------------
 # Functions
@@ -31,6 +32,17 @@ def get_args():
     parser = argparse.ArgumentParser()
 
     parser.add_argument("--simulation", "-s", action="store_true", help="Flag to set if agent is simulated")
+    parser.add_argument("--algorithm", "-a", type=str, choices=["dqn", "ddrqn"], default="ddrqn", help="Algorithm of the agents, defaults to ddrqn")
+    parser.add_argument("--headless", action="store_true", help="Flag to track real robots with the headless robot maze env (no pygame)")
+    parser.add_argument("--spare-agents", type=int, default=4, help="Number of agents built before the master goes online so robots join without waiting for networks to be built, should be at least the number of robots joining at once, defaults to 4")
+    parser.add_argument("--team-agent", type=int, default=0, help="Index of the agent whose weights are kept as the team weights joining agents start from, defaults to 0")
+    parser.add_argument("--join-epsilon", type=float, default=0.1, help="Exploration rate of agents starting from the team weights, defaults to 0.1")
+    parser.add_argument("--profile", action="store_true", help="Flag to count and time the get_action and train calls of every agent, written to saved_data/<algorithm>/agent_<n>.prom")
+    parser.add_argument("--profile-sample", type=int, default=0, help="Number of calls between calls sampled by the profile sampler, defaults to 0 (no sampling)")
+    parser.add_argument("--profile-sampler", type=str, choices=["cprofile", "tracemalloc"], default="cprofile", help="Sampler of the profiled calls, defaults to cprofile")
+    parser.add_argument("--trace", type=str, default=None, help="Path to write Chrome trace events of a sample of the time steps of every agent to, defaults to None (no tracing)")
+    parser.add_argument("--trace-rate", type=float, default=0.01, help="Fraction of time steps traced, defaults to 0.01")
+    parser.add_argument("--log-steps", action="store_true", help="Flag to write the metrics of every time step to the training logs, not only of every episode")
     parser.add_argument("--verbose", "-v", action="count", default=0, help="Increase verbosity level")
 
     return parser.parse_args()
@@ -52,7 +64,7 @@ async def post_to_topic(client, topic, msg, retain=False):
     await client.publish(topic, msg, qos=1, retain=retain)
     await asyncio.sleep(2)
 
-async def n_agents_manager(stack, tasks, client, msgs, done_flag, reset_flag, agents):
+async def n_agents_manager(stack, tasks, client, msgs, done_flag, reset_flag, agents, cache, tracer):
     """
         coroutine to manage the number of agents connected to the client
 
@@ -63,6 +75,10 @@ async def n_agents_manager(stack, tasks, client, msgs, done_flag, reset_flag, ag
         client is the mqtt client object
 
         msgs is an async constructor of messages
+
+        cache is the AgentCache the algorithms of joining agents are taken from
+
+        tracer is the Tracer the sampled time steps of the agents are recorded to, None if not tracing
     """
     #init agent index to 0
     agents_i = 0
@@ -77,13 +93,7 @@ async def n_agents_manager(stack, tasks, client, msgs, done_flag, reset_flag, ag
             await post_to_topic(client, "/agents/index", agents_i)
 
             #init agent n
-            agent = AgentInterface(client, agents_i, "ddrqn", sim=args.simulation)
-            agents.append(agent)
-
-            if agents_i == 0:
-                agents[agents_i].train_flag.set()
-            else:
-                agents[agents_i].train_flag.clear()
+            agent = AgentInterface(client, agents_i, args.algorithm, sim=args.simulation, headless=args.headless, log_steps=args.log_steps, cache=cache, publish=agents_i == args.team_agent, epsilon=args.join_epsilon, profile={"sample_every": args.profile_sample, "sampler": args.profile_sampler} if args.profile else None, tracer=tracer)
 
             receive_topics = (f'/agents/{agents_i}/obv', f'/agents/{agents_i}/reward', f'/agents/{agents_i}/done')
             #start tasks to process messages received from agent n
@@ -101,6 +111,16 @@ async def n_agents_manager(stack, tasks, client, msgs, done_flag, reset_flag, ag
             #subscribe to agent n's topics
             await client.subscribe(f'/agents/{agents_i}/#')
 
+            #agents already running are not paused while the algorithm of agent n is taken from the cache, its
+            #messages are queued as it is already subscribed
+            await agent.init_algorithm()
+            agents.append(agent)
+
+            if agents_i == 0:
+                agents[agents_i].train_flag.set()
+            else:
+                agents[agents_i].train_flag.clear()
+
             task = asyncio.create_task(agent.run(done_flag, reset_flag, agents))
             tasks.add(task)
 
@@ -159,6 +179,17 @@ async def main():
         reset_flag = asyncio.Event()
         agents = []
 
+        #agents are built and warmed up before the master goes online so a burst of up to --spare-agents robots joins
+        #without waiting for them, the spares taken are replaced in the background
+        cache = stack.enter_context(AgentCache(n_spares=args.spare_agents))
+        cache.prepare(args.algorithm, **AgentInterface.ALGORITHM_KWARGS)
+
+        logging.info("Building %i spare agents", args.spare_agents)
+        await asyncio.to_thread(cache.wait_ready)
+
+        #trace is closed on exit so the last buffered events are written
+        tracer = stack.enter_context(Tracer(args.trace, rate=args.trace_rate, process_name="master")) if args.trace is not None else None
+
         #post to init topics
         task = asyncio.create_task(post_to_topic(client, "/master/status", 1, retain=True))
         tasks.add(task)
@@ -166,7 +197,7 @@ async def main():
         #start logger for adding/removing agents from system
         manager = client.filtered_messages(("/agents/add"))
         msgs = await stack.enter_async_context(manager)
-        task = asyncio.create_task(n_agents_manager(stack, tasks, client, msgs, done_flag, reset_flag, agents))
+        task = asyncio.create_task(n_agents_manager(stack, tasks, client, msgs, done_flag, reset_flag, agents, cache, tracer))
         tasks.add(task)
 
         #subscribe to topic for adding/removing agents from system
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+#python script to run a hyperparameter sweep of one of the algorithms on a gym env in a pool of worker processes,
+#streaming the result of each trial to a results file
+
+#-----------------------------------------------------------------------------------------------------------
+# Imports
+#-----------------------------------------------------------------------------------------------------------
+
+import sys
+import argparse
+import json
+import functools
+import logging
+import gym
+
+import algorithms
+
+from algorithms.sweep import grid_search, random_search, run_sweep
+
+#-----------------------------------------------------------------------------------------------------------
+# Functions
+#-----------------------------------------------------------------------------------------------------------
+
+def get_args():
+    """
+        function to get the command line arguments
+
+        returns a namespace of arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("runner", type=str, help="Name of the run_gym_* function of the algorithm, e.g. run_gym_dqn_single_agent")
+    parser.add_argument("env", type=str, help="Id of the gym env, e.g. CartPole-v1")
+    parser.add_argument("spec", type=str, help="Path to a json file of the values of each hyperparameter, a list of values or a range {\"low\": ..., \"high\": ..., \"log\": true} (random search only)")
+    parser.add_argument("--env-kwargs", type=json.loads, default={}, help="Json dict of keyword arguments of the env, defaults to {}")
+    parser.add_argument("--search", type=str, choices=["grid", "random"], default="grid", help="Search of the hyperparameters, defaults to grid")
+    parser.add_argument("--trials", type=int, default=100, help="Number of trials of a random search, defaults to 100")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of a random search, defaults to 0")
+    parser.add_argument("--episodes", type=int, default=100, help="Number of episodes of each trial, defaults to 100")
+    parser.add_argument("--time-steps", type=int, default=10000, help="Maximum number of time steps per episode, defaults to 10000")
+    parser.add_argument("--agents", "-a", type=int, default=None, help="Number of agents of a multi-agent runner")
+    parser.add_argument("--results", "-o", type=str, default="sweep_results.jsonl", help="Path to the results file, defaults to sweep_results.jsonl")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="Number of worker processes, defaults to one per core")
+    parser.add_argument("--threads", type=int, default=None, help="Number of tensorflow threads of each worker, defaults to the cores divided between the workers")
+    parser.add_argument("--grace", type=int, default=10, help="Number of episodes before a trial can be stopped early, defaults to 10")
+    parser.add_argument("--no-early-stopping", action="store_true", help="Flag to run every trial for every episode")
+    parser.add_argument("--verbose", "-v", action="count", default=0, help="Increase verbosity level")
+
+    return parser.parse_args()
+
+#-----------------------------------------------------------------------------------------------------------
+# main
+#-----------------------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    args = get_args()
+
+    #init logging, only the sweep logs at info level as runners log every episode
+    logging.basicConfig(format="%(asctime)s.%(msecs)03d: [%(levelname)s] %(message)s", datefmt='%Y-%m-%d %H:%M:%S', level=logging.INFO if args.verbose > 0 else logging.WARNING)
+
+    if not args.runner.startswith("run_gym_") or not hasattr(algorithms, args.runner):
+        logging.error("Unknown runner %s", args.runner)
+        sys.exit(1)
+
+    with open(args.spec, "r") as handle:
+        #ranges are given as dicts in json and as tuples to random_search
+        space = {name: (values["low"], values["high"]) + (("log",) if values.get("log") else ()) if isinstance(values, dict) else values for name, values in json.load(handle).items()}
+
+    if args.search == "grid":
+        if not all(isinstance(values, list) for values in space.values()):
+            logging.error("Grid search can only sweep lists of values")
+            sys.exit(1)
+
+        trials = grid_search(space)
+    else:
+        trials = random_search(space, args.trials, seed=args.seed)
+
+    fixed = {"episodes": args.episodes, "time_steps": args.time_steps}
+    if args.agents is not None:
+        fixed["n_agents"] = args.agents
+
+    trials = [{**fixed, **params} for params in trials]
+
+    logging.info("Running %u trials of %s on %s", len(trials), args.runner, args.env)
+
+    results = run_sweep(getattr(algorithms, args.runner), functools.partial(gym.make, args.env, **args.env_kwargs), trials, args.results, n_workers=args.workers, n_threads=args.threads, early_stopping=not args.no_early_stopping, grace=args.grace)
+
+    finished = [result for result in results if result["status"] != "failed" and result["score"] is not None]
+
+    if finished:
+        best = max(finished, key=lambda result: result["score"])
+        print(f'Best trial {best["trial"]} with score {best["score"]:.3f}: {json.dumps(best["params"])}')
+
+    sys.exit(0)
@@ -11,10 +11,13 @@ import ssl
 import asyncio
 import logging
 
-from contextlib import AsyncExitStack, asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
 from asyncio_mqtt import Client, Will, MqttError
 from dotenv import load_dotenv
 
+#tracing is part of the algorithms package of the master directory (added to the path by env_wrapper)
+from algorithms.tracing import attach_step, split_step
+
 #-----------------------------------------------------------------------------------------------------------
 # Classes
 #-----------------------------------------------------------------------------------------------------------
@@ -23,9 +26,11 @@ class sim_agent():
     """
         class for simulated agent, contains client and all methods required by MQTT and agent
     """
-    def __init__(self):
+    def __init__(self, tracer=None):
         """
             function to init simulated agent class
+
+            tracer is a Tracer the spans of the time steps traced by the master are recorded to, None if not tracing
         """
         #MQTT credentials stored in .env file
         load_dotenv()
@@ -37,6 +42,7 @@ class sim_agent():
         self.client = Client(MQTT_HOST, port=8883, username=MQTT_USERNAME, password=MQTT_PASSWORD, tls_context=ssl.create_default_context())
         self.msg_q = asyncio.Queue()
         self.start_flag = asyncio.Event()
+        self.tracer = tracer
 
     async def post_to_topic(self, topic, msg, retain=False):
         """
@@ -82,6 +88,23 @@ class sim_agent():
             elif not status:
                 self.start_flag.clear()
 
+    def span(self, name, step, n):
+        """
+            function to record a span of a time step to the tracer, shown on the thread of agent n
+
+            name is the name of the span
+
+            step is the id of the time step sent by the master, if None (not traced) nothing is recorded
+
+            n is the index of the agent
+
+            returns a context manager
+        """
+        if self.tracer is None:
+            return nullcontext()
+
+        return self.tracer.span(name, step, tid=n)
+
     async def get_item(self, desired_topic):
         """
             coroutine to get an item from a queue with a specific topic
@@ -193,30 +216,34 @@ class sim_agent():
             await self.post_to_topic((f'/agents/{n}/obv'), (f'{obv}'))
     
             for t in range(10000):
-                #get action from mqtt and put into env queue
-                action = int(await self.get_item(f'/agents/{n}/action')) 
-                await env_q.put(action)
-                action_flag.set()
+                #get action from mqtt and put into env queue, with the step id if the master traces the step
+                action, step = split_step(await self.get_item(f'/agents/{n}/action'))
+                action = int(action)
+
+                with self.span("env_step", step, n):
+                    await env_q.put(action)
+                    action_flag.set()
     
-                #get obv, reward and done from env queue
-                await obv_flag.wait()
-                obv = await env_q.get()
-                obv_flag.clear()
+                    #get obv, reward and done from env queue
+                    await obv_flag.wait()
+                    obv = await env_q.get()
+                    obv_flag.clear()
 
-                await reward_flag.wait()
-                reward = await env_q.get()
-                reward_flag.clear()
+                    await reward_flag.wait()
+                    reward = await env_q.get()
+                    reward_flag.clear()
 
-                await done_flag.wait()
-                done = await env_q.get()
-                done_flag.clear()
+                    await done_flag.wait()
+                    done = await env_q.get()
+                    done_flag.clear()
     
                 #post to relevant topics
                 agent_topics = (f'/agents/{n}/obv', f'/agents/{n}/reward', f'/agents/{n}/done')
-                agent_msgs = [f'{obv}', f'{reward}', f'{done}']
+                agent_msgs = [attach_step(f'{obv}', step), attach_step(f'{reward}', step), attach_step(f'{done}', step)]
 
-                for topic, msg in zip(agent_topics, agent_msgs):
-                    await self.post_to_topic(topic, msg)
+                with self.span("publish_results", step, n):
+                    for topic, msg in zip(agent_topics, agent_msgs):
+                        await self.post_to_topic(topic, msg)
     
                 if done:
                     break
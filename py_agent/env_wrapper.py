@@ -18,7 +18,12 @@ import numpy as np
 from contextlib import AsyncExitStack, asynccontextmanager
 from gym_robot_maze import Maze
 
+#headless maze env and tracing are located in the algorithms package of the master directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "master"))
+
 from agent import sim_agent
+from algorithms.headless_maze import HeadlessRobotMaze
+from algorithms.tracing import Tracer
 
 #-----------------------------------------------------------------------------------------------------------
 # Functions
@@ -34,6 +39,8 @@ def get_args():
 
     parser.add_argument("--agents", "-a", type=int, default=1, help="Number of agents to simulate, defaults to 1")
     parser.add_argument("--render", "-r", action="store_true", help="Flag to render the simulated environment")
+    parser.add_argument("--headless", action="store_true", help="Flag to simulate the environment with the headless robot maze env (no pygame)")
+    parser.add_argument("--trace", type=str, default=None, help="Path to write Chrome trace events of the time steps traced by the master to, defaults to None (no tracing)")
     parser.add_argument("--verbose", "-v", action="count", default=0, help="Increase verbosity level")
 
     return parser.parse_args()
@@ -209,7 +216,10 @@ async def main():
     maze_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "4x4_maze")
 
     #init env
-    env = gym.make("gym_robot_maze:RobotMaze-v1", is_render=args.render, n_agents=args.agents, load_maze_path=maze_path)
+    if args.headless:
+        env = HeadlessRobotMaze(load_maze_path=maze_path, n_agents=args.agents)
+    else:
+        env = gym.make("gym_robot_maze:RobotMaze-v1", is_render=args.render, n_agents=args.agents, load_maze_path=maze_path)
     
     async with AsyncExitStack() as stack:
         #init index flag to prevent agents getting same index
@@ -237,11 +247,14 @@ async def main():
         tasks = set()
         stack.push_async_callback(cancel_tasks, tasks)
 
+        #steps are sampled by the master, so every step the master sends a step id with is traced
+        tracer = stack.enter_context(Tracer(args.trace, rate=0.0, process_name="sim agents")) if args.trace is not None else None
+
         #init agent
         if args.agents > 1:
-            agent = [sim_agent() for i in range(args.agents)]
+            agent = [sim_agent(tracer=tracer) for i in range(args.agents)]
         else:
-            agent = sim_agent()
+            agent = sim_agent(tracer=tracer)
 
         #start agent tasks
         if args.agents > 1:
@@ -301,6 +314,9 @@ if __name__ == "__main__":
     if args.agents < 1:
         raise ValueError(f'Number of agents must be >= 1.')
 
+    if args.headless and args.render:
+        raise ValueError('Headless environment cannot be rendered.')
+
     #set more verbose logging level, default is info (verbose == 0)
     if args.verbose == 1:
         logging.getLogger().setLevel(logging.DEBUG)